@@ -1,71 +1,41 @@
-import os
-import pandas as pd
-from google.cloud import bigquery
-import db_dtypes
-from datetime import datetime, timedelta
+import argparse
 
-# Constants for BigQuery Project
-PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
-DATASET_ID = "pokemon_data"
-TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.pokemon_prices"
+OUTPUT_FILE = "data/set_pull_values.csv"
+# The same statistics as set_screener.STATS; set_screener (pandas, pyarrow, numpy) is imported only
+# once the values are calculated, so --help stays fast
+STATS = ("median", "trimmed", "mean")
 
-# Initialize the BigQuery client
-client = bigquery.Client()
 
-# Load the sets from the CSV file
-pack_set_df = pd.read_csv("data/pack_set_dictionary.csv")
-sets = pack_set_df["set"].tolist()
+# Function: Calculate the expected pull value of each set
+def calculate_set_values(client=None, stat="mean"):
+    """
+    Computes the expected pull value per pack of every set in data/pull_rates.csv from yesterday's
+    prices with set_screener.py, and writes it to data/set_pull_values.csv along with the pack
+    price, value/price ratio and chase card share.
 
-# Calculate yesterday's date
-yesterday_date = (datetime.now() - timedelta(days=1)).date()
+    `value` keeps its name but is no longer the mean over every price row of a rarity: each card
+    counts once, at its mean across the conditions it is listed in. It is unchanged for sets whose
+    cards have one row each, and otherwise no longer weighs a card by how many conditions it is
+    listed in. The sets are now those in data/pull_rates.csv rather than pack_set_dictionary.csv.
 
-# Format the SQL query
-set_list_sql = "', '".join(sets)  # Join sets with quotes and commas
-sql_query = f"""
-SELECT *
-FROM `{TABLE_ID}`
-WHERE scrape_date = '{yesterday_date}'
-  AND source IN ('{set_list_sql}');
-"""
+    Args:
+        client (bigquery.Client): Client to query with; a new one is created if omitted.
+        stat (str): Price of a rarity across its cards; one of STATS.
+    """
+    import set_screener
 
-# Execute the query and convert the result to a DataFrame
-query_job = client.query(sql_query)
-result_df = query_job.to_dataframe()
+    results = set_screener.screen_sets(days=1, stat=stat, client=client)
 
-# Ensure 'source' column is named 'set' in result_df if necessary
-result_df = result_df.rename(columns={"source": "set"})
+    # Keep the 'value' column readers of set_pull_values.csv expect
+    set_values = results.drop(columns=["scrape_date"]).rename(columns={"ev": "value"})
+    set_values.to_csv(OUTPUT_FILE, index=False)
+    print(f"CSV file written to {OUTPUT_FILE}")
 
-# Remove the dollar sign and convert 'Market Price' to numeric
-result_df["Market Price"] = result_df["Market Price"].replace('[\$,]', '', regex=True).astype(float)
-
-result_df["Market Price"] = pd.to_numeric(result_df["Market Price"], errors='coerce')
-
-
-# Group by 'Rarity' and 'set', and calculate the mean for 'Market Price'
-grouped_df = result_df.groupby(["set", "Rarity"])["Market Price"].mean().reset_index()
-
-print(grouped_df.head())
-
-# Load the pull rates data
-pull_rates_df = pd.read_csv("data/pull_rates.csv")
-
-print(pull_rates_df.head())
-
-# Ensure "Probability" is numeric, handling any conversion errors
-pull_rates_df["Probability"] = pd.to_numeric(pull_rates_df["Probability"], errors='coerce')
-
-# Perform the inner join on 'set' column
-merged_df = pd.merge(grouped_df, pull_rates_df, on=["set","Rarity"], how="inner")
-
-print(merged_df.head())
-
-# Calculate the 'value' column by multiplying 'Probability' with 'Market Price'
-merged_df["value"] = merged_df["Probability"] * merged_df["Market Price"]
-
-# Group by 'set' and sum the 'value'
-set_value_sum = merged_df.groupby("set")["value"].sum().reset_index()
-
-set_value_sum.to_csv("data/set_pull_values.csv", index=False)
-print("CSV file written to data/set_pull_values.csv")
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute the expected pull value per pack of each set.")
+    parser.add_argument("--stat", choices=STATS, default="mean",
+                        help="Price of a rarity across its cards.")
+    args = parser.parse_args()
 
+    calculate_set_values(stat=args.stat)
@@ -0,0 +1,461 @@
+"""
+Script Name: set_screener.py
+Description:
+    Screens every set in data/pull_rates.csv for the expected value of opening a booster pack,
+    over any number of scrape days.
+
+    For each (day, set) it reports:
+        - ev: Expected card value per pack, the sum over rarities of pull rate x the rarity's price.
+          The rarity price is the median, trimmed mean or mean of its cards' Market Prices (--stat),
+          where a card listed in several conditions that day counts once, at its mean price.
+        - pack_price: Cheapest booster pack listing for the set in pokemon_packs that day.
+        - ev_ratio: ev / pack_price; above 1 means a pack is worth more opened than sealed.
+        - chase_share: Share of the pack's card value held by its --top-n most valuable pulls,
+          where each card is worth its rarity's pull rate / cards in the rarity x its price. A high
+          share means the value rests on a few chase cards rather than the whole rarity.
+        - cards, rarities: Priced cards and rarities behind the numbers.
+
+    Counting each card once differs from the mean over rows best_value_set.py used to take, where
+    a card listed in three conditions weighed three times as much as one listed once. The two
+    agree when every card has one row per day; otherwise the rarity price moves toward the cards
+    listed in fewer conditions.
+
+    All days and sets are computed in one vectorized pass: prices are sorted once by (day, set,
+    rarity) group and every group statistic and chase card is read from group offsets and
+    cumulative sums with numpy, rather than looping over days or sets.
+
+    Each finished day is cached under data/set_screener/ as one Arrow IPC file per statistic,
+    tagged with the other settings, the pull rates and a fingerprint of the day's rows in
+    pokemon_prices and pokemon_packs. One small query reads the fingerprints of every requested
+    day (query_fingerprints), and only days whose cache is missing or no longer matches, e.g.
+    because the day was republished or its pack prices landed after it was screened, have their
+    prices queried. Days with no rows and today (still being scraped) are never cached.
+    test/bench_set_screener.py times a synthetic year of history.
+
+Components:
+    - sort_groups: Orders values by group, then value, with one argsort.
+    - group_statistic: Median, trimmed mean or mean of sorted values per group.
+    - screen: Computes the screener rows from card prices, pack prices and pull rates.
+    - query_history: Loads the card and pack prices of the given days from BigQuery.
+    - query_fingerprints: Fingerprints the rows of the given days in BigQuery.
+    - screen_sets: Main function combining the cache, BigQuery and `screen`.
+
+Environment Variables:
+    - BIGQUERY_PROJECT_ID: Google Cloud Project ID for BigQuery access.
+
+Dependencies:
+    - numpy
+    - pandas
+    - pyarrow
+    - google.cloud.bigquery
+
+Usage:
+    python code/analytics/set_screener.py --stat median --top-n 3
+    python code/analytics/set_screener.py --days 365 --output data/set_screener.csv
+"""
+
+# Modules
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from datetime import date, datetime, timedelta
+
+# Constants for BigQuery Project
+PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
+DATASET_ID = "pokemon_data"
+PRICES_TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.pokemon_prices"
+PACKS_TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.pokemon_packs"
+
+PULL_RATES_FILE = "data/pull_rates.csv"
+CACHE_DIR = "data/set_screener"
+OUTPUT_FILE = "data/set_screener.csv"
+STATS = ("median", "trimmed", "mean")
+# Booster pack listings that are not a pack of cards
+NOT_A_PACK = r"code card"
+COLUMNS = ["scrape_date", "set", "ev", "pack_price", "ev_ratio", "chase_share", "cards", "rarities"]
+
+
+# Function: Convert scraped price strings to floats
+def parse_prices(values):
+    """
+    Args:
+        values (pd.Series): Scraped Market Prices such as "$1,234.56".
+
+    Returns:
+        pd.Series: Float prices; NaN where the text is not a price (e.g. "-").
+    """
+    return pd.to_numeric(values.astype(str).str.replace(r"[$,]", "", regex=True), errors="coerce")
+
+
+# Function: Load the pull rates
+def load_pull_rates(path=PULL_RATES_FILE):
+    """
+    Returns:
+        pd.DataFrame: One row per (set, Rarity) with its Probability per pack.
+    """
+    pull_rates = pd.read_csv(path)
+    pull_rates["Probability"] = pd.to_numeric(pull_rates["Probability"], errors="coerce")
+    return pull_rates.dropna(subset=["Probability"])[["set", "Rarity", "Probability"]]
+
+
+# Function: Order values by group, then value
+def sort_groups(codes, values):
+    """
+    Sorts by (group, value) with a single argsort of one float key, group * span + value, where
+    span exceeds the range of the values, which is several times faster than np.lexsort. The
+    key is exact enough as long as groups * span stays well below 2**52.
+
+    Args:
+        codes (np.ndarray): Group number of each value.
+        values (np.ndarray): Values to order within each group.
+
+    Returns:
+        np.ndarray: Indices that sort `values` by group, then value.
+    """
+    low = values.min()
+    span = values.max() - low + 1
+    return np.argsort(codes * span + (values - low))
+
+
+# Function: Per-group statistic of sorted values
+def group_statistic(ordered, counts, stat="median", trim=0.1):
+    """
+    Computes one statistic per group without looping over groups: each group's median or
+    (trimmed) sum is read from its offset into the sorted values and a running sum.
+
+    Args:
+        ordered (np.ndarray): Values sorted by group, then value (see sort_groups).
+        counts (np.ndarray): Number of values in each group, every group non-empty.
+        stat (str): "median", "trimmed" (mean without the `trim` fraction at each end) or "mean".
+        trim (float): Fraction cut from each end for "trimmed", in [0, 0.5).
+
+    Returns:
+        np.ndarray: The statistic of each group, indexed by group number.
+    """
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    if stat == "median":
+        return (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+    if stat not in STATS:
+        raise ValueError(f"stat must be one of {STATS}")
+    if not 0 <= trim < 0.5:
+        raise ValueError("trim must be in [0, 0.5)")
+    cut = np.floor(counts * trim).astype(np.int64) if stat == "trimmed" else np.zeros_like(counts)
+    running = np.concatenate(([0.0], np.cumsum(ordered)))
+    return (running[starts + counts - cut] - running[starts + cut]) / (counts - 2 * cut)
+
+
+# Function: Number the distinct values of a column
+def _codes(values, categories=None):
+    """
+    Returns:
+        tuple[np.ndarray, pd.Index]: Code of each value and the distinct values; with
+        `categories`, codes index into them and values not among them get -1.
+    """
+    if categories is not None:
+        return pd.Index(categories).get_indexer(values), pd.Index(categories)
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Index(uniques)
+
+
+# Function: Compute the screener
+def screen(cards, packs, pull_rates, stat="median", top_n=3, trim=0.1):
+    """
+    Every (day, set, rarity) group and every (day, set) is numbered densely, so the groupings
+    below are integer arithmetic and bincounts over flat arrays. Card prices are sorted once by
+    group, which gives both the rarity statistic and, since a card's value within its rarity
+    follows its price, each rarity's chase card candidates.
+
+    Args:
+        cards (pd.DataFrame): Card prices with scrape_date, source, Rarity, card_key and price;
+            rows without a card_key are skipped.
+        packs (pd.DataFrame): Pack prices with scrape_date, source, Product Name and price.
+        pull_rates (pd.DataFrame): Rows returned by load_pull_rates.
+        stat (str): Rarity price statistic; one of STATS.
+        top_n (int): Chase cards counted in chase_share.
+        trim (float): Fraction cut from each end for the "trimmed" statistic.
+
+    Returns:
+        pd.DataFrame: One row per (scrape_date, set) with the COLUMNS above, sorted by day and set.
+    """
+    # Pull rate of every (set, rarity), with sets and rarities numbered in sorted order
+    set_names = np.sort(pull_rates["set"].unique())
+    rarity_names = np.sort(pull_rates["Rarity"].unique())
+    rates = np.full((len(set_names), len(rarity_names)), np.nan)
+    rates[_codes(pull_rates["set"], set_names)[0], _codes(pull_rates["Rarity"], rarity_names)[0]] = \
+        pull_rates["Probability"].to_numpy()
+
+    # Card rows with a price, a pull rate and a key
+    day_codes, days = _codes(cards["scrape_date"])
+    set_codes = _codes(cards["source"], set_names)[0]
+    rarity_codes = _codes(cards["Rarity"], rarity_names)[0]
+    prices = cards["price"].to_numpy(dtype=np.float64)
+    probability = rates[set_codes, rarity_codes]
+    keep = (set_codes >= 0) & (rarity_codes >= 0) & ~np.isnan(probability) & ~np.isnan(prices)
+    # A null key would be numbered -1 by _card_days and collide with other (day, card) pairs
+    keep &= cards["card_key"].notna().to_numpy()
+    if not keep.any():
+        return pd.DataFrame(columns=COLUMNS)
+
+    # One price per card and day: the mean over the conditions it is listed in
+    card_days, first_rows = _card_days(day_codes[keep], cards["card_key"].to_numpy()[keep])
+    card_prices = np.bincount(card_days, weights=prices[keep]) / np.bincount(card_days)
+    rows = np.flatnonzero(keep)[first_rows]
+    day_codes, set_codes, rarity_codes = day_codes[rows], set_codes[rows], rarity_codes[rows]
+    probability = probability[rows]
+
+    # Rarity price per (day, set, rarity), numbered densely and compacted to the groups present
+    set_days = day_codes * len(set_names) + set_codes
+    dense = set_days * len(rarity_names) + rarity_codes
+    dense_counts = np.bincount(dense, minlength=len(days) * len(set_names) * len(rarity_names))
+    present = np.flatnonzero(dense_counts)
+    group_codes = np.cumsum(dense_counts > 0)[dense] - 1
+    group_counts = dense_counts[present]
+    group_rates = rates[(present // len(rarity_names)) % len(set_names), present % len(rarity_names)]
+    order = sort_groups(group_codes, card_prices)
+    group_values = group_rates * group_statistic(card_prices[order], group_counts, stat, trim)
+
+    # Expected value of each card per pack; a (day, set)'s top_n cards are among the top_n of
+    # each of its rarities, so only those candidates are ranked
+    n_set_days = len(days) * len(set_names)
+    card_values = probability / group_counts[group_codes] * card_prices
+    group_ends = np.cumsum(group_counts)
+    candidates = order[group_ends[group_codes[order]] - np.arange(len(order)) <= top_n]
+    candidates = candidates[np.lexsort((-card_values[candidates], set_days[candidates]))]
+    candidate_counts = np.bincount(set_days[candidates], minlength=n_set_days)
+    candidate_starts = np.concatenate(([0], np.cumsum(candidate_counts)[:-1]))
+    chase = candidates[np.arange(len(candidates)) - candidate_starts[set_days[candidates]] < top_n]
+    chase_values = np.bincount(set_days[chase], weights=card_values[chase], minlength=n_set_days)
+    total_values = np.bincount(set_days, weights=card_values, minlength=n_set_days)
+    set_day_counts = np.bincount(set_days, minlength=n_set_days)
+
+    group_set_days = present // len(rarity_names)
+    results = pd.DataFrame({
+        "set_day": np.arange(n_set_days),
+        "ev": np.bincount(group_set_days, weights=group_values, minlength=n_set_days),
+        "cards": set_day_counts,
+        "rarities": np.bincount(group_set_days, minlength=n_set_days),
+        "chase_share": chase_values / np.where(total_values > 0, total_values, np.nan),
+    })
+    results = results[results["cards"] > 0]
+    results.insert(0, "scrape_date", [pd.Timestamp(day).date() for day in days[results["set_day"] // len(set_names)]])
+    results.insert(1, "set", set_names[results["set_day"] % len(set_names)])
+
+    # Cheapest booster pack listing per (day, set)
+    pack_day_codes = _codes(packs["scrape_date"], days)[0]
+    pack_set_codes = _codes(packs["source"], set_names)[0]
+    pack_prices = packs["price"].to_numpy(dtype=np.float64)
+    is_pack = ~packs["Product Name"].str.contains(NOT_A_PACK, case=False, na=False).to_numpy()
+    keep = is_pack & (pack_day_codes >= 0) & (pack_set_codes >= 0) & ~np.isnan(pack_prices)
+    cheapest = np.full(n_set_days, np.inf)
+    np.minimum.at(cheapest, pack_day_codes[keep] * len(set_names) + pack_set_codes[keep], pack_prices[keep])
+    results["pack_price"] = np.where(np.isinf(cheapest), np.nan, cheapest)[results["set_day"]]
+
+    results["ev_ratio"] = results["ev"] / results["pack_price"]
+    return results[COLUMNS].sort_values(["scrape_date", "set"], ignore_index=True)
+
+
+# Function: Number each (day, card) pair
+def _card_days(day_codes, card_keys):
+    """
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Code of each row's (day, card) pair, and one row of each pair.
+    """
+    card_codes = pd.factorize(card_keys)[0].astype(np.int64)
+    pair_codes, _ = pd.factorize(day_codes.astype(np.int64) * (card_codes.max() + 1) + card_codes)
+    first_rows = np.empty(pair_codes.max() + 1, dtype=np.int64)
+    # Rows of one pair share their day, set and rarity, so whichever row is written last is fine
+    first_rows[pair_codes] = np.arange(len(pair_codes))
+    return pair_codes, first_rows
+
+
+# Function: Load card and pack prices from BigQuery
+def query_history(days, sets, client):
+    """
+    Loads the given days of pokemon_prices and pokemon_packs for `sets` with one query each.
+    Rows scraped before card keys existed are keyed by a fingerprint of the same identity columns,
+    with a missing Product Name fingerprinted as empty, since FARM_FINGERPRINT of NULL is NULL.
+
+    Args:
+        days (list[date]): Scrape days to load.
+        sets (list[str]): Set URL extensions to load.
+        client (bigquery.Client): Client to query with.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Card and pack prices in the shape `screen` expects.
+    """
+    day_list = ", ".join(f"'{day}'" for day in days)
+    set_list = ", ".join(f"'{s}'" for s in sets)
+    cards_query = f"""
+        SELECT DATE(scrape_date) AS scrape_date, source, Rarity, `Market Price`,
+               COALESCE(card_key, FARM_FINGERPRINT(CONCAT(source, '|', IFNULL(Number, ''), '|',
+                        IFNULL(Printing, ''), '|', IFNULL(`Product Name`, '')))) AS card_key
+        FROM `{PRICES_TABLE_ID}`
+        WHERE DATE(scrape_date) IN ({day_list}) AND source IN ({set_list})
+    """
+    packs_query = f"""
+        SELECT DATE(scrape_date) AS scrape_date, source, `Product Name`, `Market Price`
+        FROM `{PACKS_TABLE_ID}`
+        WHERE DATE(scrape_date) IN ({day_list}) AND source IN ({set_list})
+    """
+    frames = []
+    for query in (cards_query, packs_query):
+        # Categorical strings and datetime64 days keep the arrays `screen` numbers cheap to hash
+        df = client.query(query).result().to_arrow().to_pandas(strings_to_categorical=True, date_as_object=False)
+        df["price"] = parse_prices(df.pop("Market Price"))
+        frames.append(df)
+    return tuple(frames)
+
+
+# Function: Fingerprint the rows of each day
+def query_fingerprints(days, sets, client):
+    """
+    Reads, in one query, the row count and an order-independent hash of every day's rows for
+    `sets`. Card rows are hashed by card_key alone, which is cheap to scan; pack rows, a few per
+    set, are hashed with their prices, since those are used as they are.
+
+    Args:
+        days (list[date]): Scrape days to fingerprint.
+        sets (list[str]): Set URL extensions to include.
+        client (bigquery.Client): Client to query with.
+
+    Returns:
+        dict[date, str]: Fingerprint of each day that has rows in either table.
+    """
+    day_list = ", ".join(f"'{day}'" for day in days)
+    set_list = ", ".join(f"'{s}'" for s in sets)
+    query = f"""
+        SELECT 'prices' AS source_table, DATE(scrape_date) AS scrape_date, COUNT(*) AS row_count,
+               BIT_XOR(card_key) AS digest
+        FROM `{PRICES_TABLE_ID}`
+        WHERE DATE(scrape_date) IN ({day_list}) AND source IN ({set_list})
+        GROUP BY 2
+        UNION ALL
+        SELECT 'packs', DATE(scrape_date), COUNT(*),
+               BIT_XOR(FARM_FINGERPRINT(CONCAT(source, '|', IFNULL(`Product Name`, ''), '|',
+                                               IFNULL(`Market Price`, ''))))
+        FROM `{PACKS_TABLE_ID}`
+        WHERE DATE(scrape_date) IN ({day_list}) AND source IN ({set_list})
+        GROUP BY 2
+    """
+    parts = {}
+    for row in client.query(query).result().to_arrow().to_pylist():
+        parts.setdefault(row["scrape_date"], []).append(f"{row['source_table']}:{row['row_count']}:{row['digest']}")
+    return {day: ",".join(sorted(entries)) for day, entries in parts.items()}
+
+
+# Function: Identify the settings a cached day was computed with
+def cache_tag(pull_rates_path, stat, top_n, trim):
+    with open(pull_rates_path, "rb") as f:
+        pull_rates_digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    return json.dumps({"stat": stat, "top_n": top_n, "trim": trim if stat == "trimmed" else None,
+                       "pull_rates": pull_rates_digest}, sort_keys=True)
+
+
+# Function: Cache file of one day
+def cache_path(cache_dir, day, stat):
+    return os.path.join(cache_dir, f"{day}_{stat}.arrow")
+
+
+# Function: Read one cached day
+def read_cached_day(path, tag):
+    """
+    Returns:
+        pd.DataFrame: The day's screener rows, or None if the day is not cached with these settings.
+    """
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    if (table.schema.metadata or {}).get(b"tag", b"").decode("utf-8") != tag:
+        return None
+    return table.to_pandas()
+
+
+# Function: Write one cached day atomically
+def write_cached_day(path, rows, tag):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(rows, preserve_index=False).replace_schema_metadata({"tag": tag})
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+# Main Function: Screen every set over a range of days
+def screen_sets(days=1, end=None, stat="median", top_n=3, trim=0.1, client=None,
+                pull_rates_path=PULL_RATES_FILE, cache_dir=CACHE_DIR):
+    """
+    Returns the screener rows for the `days` scrape days ending at `end`. Every day's rows are
+    fingerprinted first; cached days whose fingerprint still matches are read from the cache and
+    the prices of the rest are queried from BigQuery at once.
+
+    Args:
+        days (int): Number of days to screen.
+        end (date): Last day; defaults to yesterday, the latest fully scraped day.
+        stat (str): Rarity price statistic; one of STATS.
+        top_n (int): Chase cards counted in chase_share.
+        trim (float): Fraction cut from each end for the "trimmed" statistic.
+        client (bigquery.Client): Client to query with; a new one is created if omitted.
+        pull_rates_path (str): Pull rate file.
+        cache_dir (str): Directory of the per-day cache.
+
+    Returns:
+        pd.DataFrame: One row per (scrape_date, set) with the COLUMNS above.
+    """
+    if stat not in STATS:
+        raise ValueError(f"stat must be one of {STATS}")
+    end = end or (datetime.now() - timedelta(days=1)).date()
+    day_range = [end - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    tag = cache_tag(pull_rates_path, stat, top_n, trim)
+    if client is None:
+        from google.cloud import bigquery
+        client = bigquery.Client()
+    pull_rates = load_pull_rates(pull_rates_path)
+    sets = sorted(pull_rates["set"].unique())
+
+    # A day's cache is only used while the day's rows are still the ones it was computed from
+    fingerprints = query_fingerprints(day_range, sets, client)
+    day_tags = {day: f"{tag}|{fingerprints.get(day, '')}" for day in day_range}
+    cached = {day: read_cached_day(cache_path(cache_dir, day, stat), day_tags[day]) for day in day_range}
+    missing = [day for day, rows in cached.items() if rows is None and day in fingerprints]
+    frames = [rows for rows in cached.values() if rows is not None]
+    print(f"Screening {days} day(s) up to {end}: {len(frames)} cached, {len(missing)} to query.")
+
+    if missing:
+        cards, packs = query_history(missing, sets, client)
+        computed = screen(cards, packs, pull_rates, stat, top_n, trim)
+        frames.append(computed)
+
+        today = datetime.now().date()
+        for day, rows in computed.groupby("scrape_date", sort=False):
+            if day < today:
+                write_cached_day(cache_path(cache_dir, day, stat), rows, day_tags[day])
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values(["scrape_date", "set"], ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen every set's booster pack expected value.")
+    parser.add_argument("--days", type=int, default=1, help="Number of scrape days to screen.")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD); defaults to yesterday.")
+    parser.add_argument("--stat", choices=STATS, default="median", help="Price of a rarity across its cards.")
+    parser.add_argument("--trim", type=float, default=0.1, help="Fraction cut from each end for --stat trimmed.")
+    parser.add_argument("--top-n", type=int, default=3, help="Chase cards counted in chase_share.")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="CSV file for every screened day.")
+    args = parser.parse_args()
+
+    results = screen_sets(args.days, args.end, args.stat, args.top_n, args.trim)
+    results.to_csv(args.output, index=False)
+    print(f"CSV file written to {args.output}")
+
+    if not results.empty:
+        latest = results[results["scrape_date"] == results["scrape_date"].max()]
+        print(latest.sort_values("ev_ratio", ascending=False).to_string(index=False, float_format="%.3f"))
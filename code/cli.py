@@ -0,0 +1,195 @@
+"""
+Script Name: cli.py
+Description:
+    Single command line entry point for every job in the repository.
+
+    `python code/cli.py <command> [options]` runs the matching script exactly as
+    `python <script> [options]` would, so each command keeps its script's own options and --help.
+    Nothing is imported until a command is chosen, and then only that script is loaded; the
+    scripts themselves load google.cloud and Playwright only when a job actually needs them (see
+    clients.py and browser_session.py), so `--help` and `--dry-run` need neither the libraries'
+    import time nor credentials.
+
+    `--dry-run`, given before or after the command, checks a command without running it: that
+    its script's dependencies are installed, its environment variables are set and its input
+    files exist, and, for the scrapers, how many sets the given --shard-index/--num-shards would
+    scrape. It exits non-zero if anything is missing. test/bench_cli_startup.py tracks the
+    startup time of these paths.
+
+Components:
+    - Command: One subcommand and what it needs.
+    - COMMANDS: Every available subcommand.
+    - parse_args: Splits the command line into the command, --dry-run and the script's options.
+    - dry_run: Prints what a command would do and whether it can run here.
+    - run: Runs a command's script in this process.
+
+Usage:
+    python code/cli.py --help
+    python code/cli.py cards --num-shards 4 --shard-index 1 --warm-browser
+    python code/cli.py --dry-run cards --num-shards 4 --shard-index 1
+    python code/cli.py cards --dry-run --num-shards 4 --shard-index 1
+"""
+
+# Modules
+import os
+import sys
+import csv
+import runpy
+import argparse
+import importlib.util
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPER_MODULES = ("pandas", "pyarrow", "playwright", "google.cloud.bigquery")
+SCREENER_MODULES = ("numpy", "pandas", "pyarrow", "google.cloud.bigquery")
+
+
+class Command:
+    """
+    One subcommand of the CLI.
+
+    Args:
+        name (str): Subcommand name.
+        script (str): Script path relative to the code directory.
+        help (str): One line description.
+        modules (tuple[str]): Modules the script needs at run time.
+        env (tuple[str]): Environment variables the script needs.
+        inputs (tuple[str]): Files the script reads.
+        sets_file (str): Set list the script shards over, if any.
+    """
+
+    def __init__(self, name, script, help, modules=(), env=(), inputs=(), sets_file=None):
+        self.name = name
+        self.script = os.path.join(CODE_DIR, script)
+        self.help = help
+        self.modules = tuple(modules)
+        self.env = tuple(env)
+        self.inputs = tuple(inputs) + ((sets_file,) if sets_file else ())
+        self.sets_file = sets_file
+
+
+COMMANDS = [
+    Command("sets", "scraping/tcg_set_scraping.py", "Discover sets and update the set files in data/.",
+            modules=("playwright",)),
+    Command("cards", "scraping/tcg_card_scraping.py", "Scrape card prices into pokemon_prices.",
+            modules=SCRAPER_MODULES + ("numpy",), env=("BIGQUERY_PROJECT_ID",),
+            sets_file="data/card_set_dictionary.csv"),
+    Command("images", "scraping/tcg_card_image_scraping.py", "Scrape card images into pokemon_images.",
+            modules=SCRAPER_MODULES, env=("BIGQUERY_PROJECT_ID",), sets_file="data/card_set_dictionary.csv"),
+    Command("packs", "scraping/tcg_pack_scraping.py", "Scrape booster pack prices into pokemon_packs.",
+            modules=SCRAPER_MODULES, env=("BIGQUERY_PROJECT_ID",), sets_file="data/pack_set_dictionary.csv"),
+    Command("merge", "scraping/merge_shards.py", "Publish a day of sharded scraper output.",
+            modules=("pyarrow", "numpy", "google.cloud.bigquery"), env=("BIGQUERY_PROJECT_ID",)),
+    Command("image-upload", "scraping/tcg_card_image_upload.py", "Mirror card images into Cloud Storage.",
+            modules=("requests", "pyarrow", "google.cloud.bigquery", "google.cloud.storage"),
+            env=("BIGQUERY_PROJECT_ID", "GCS_BUCKET_NAME")),
+    Command("keys", "scraping/card_keys.py", "Backfill card keys and the pokemon_cards dimension.",
+            modules=("numpy", "pyarrow", "google.cloud.bigquery"), env=("BIGQUERY_PROJECT_ID",)),
+    Command("movers", "scraping/movers_index.py", "Query or rebuild the top movers index.",
+            modules=("numpy", "pyarrow")),
+    Command("set-values", "analytics/best_value_set.py", "Compute the expected pull value per set.",
+            modules=SCREENER_MODULES, env=("BIGQUERY_PROJECT_ID",), inputs=("data/pull_rates.csv",)),
+    Command("screener", "analytics/set_screener.py", "Screen every set's pack value over a range of days.",
+            modules=SCREENER_MODULES, env=("BIGQUERY_PROJECT_ID",), inputs=("data/pull_rates.csv",)),
+    Command("serve", "serving/price_service.py", "Serve prices from a local snapshot, or --export one.",
+            modules=("numpy", "pyarrow")),
+    Command("search", "serving/name_index.py", "Fuzzy search card names in a price snapshot.",
+            modules=("numpy", "pyarrow")),
+    Command("pipeline", "pipeline.py", "Run the daily refresh as one dependency graph.",
+            modules=SCRAPER_MODULES + ("numpy", "requests", "google.cloud.storage"),
+            env=("BIGQUERY_PROJECT_ID", "GCS_BUCKET_NAME"),
+            inputs=("data/card_set_dictionary.csv", "data/pack_set_dictionary.csv", "data/pull_rates.csv")),
+]
+
+
+# Function: Whether a module can be imported, without importing it
+def module_available(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+# Function: Count the sets a scraper would scrape
+def shard_summary(command, args):
+    """
+    Returns:
+        str: How many of the sets in the command's set list the given shard options select.
+    """
+    sys.path.insert(0, os.path.join(CODE_DIR, "scraping"))
+    from sharding import add_shard_arguments, shard_for
+
+    shard_args, _ = add_shard_arguments(argparse.ArgumentParser(add_help=False)).parse_known_args(args)
+    with open(command.sets_file, newline="") as f:
+        sets = [row["set"] for row in csv.DictReader(f)]
+    selected = [s for s in sets if shard_for(s, shard_args.num_shards) == shard_args.shard_index]
+    if shard_args.num_shards <= 1:
+        return f"{len(sets)} sets"
+    return (f"{len(selected)} of {len(sets)} sets in shard {shard_args.shard_index} of {shard_args.num_shards}, "
+            f"written under {shard_args.shard_dir}/")
+
+
+# Function: Check a command without running it
+def dry_run(command, args):
+    """
+    Prints what `command` would run and whether its modules, environment variables and input
+    files are available.
+
+    Returns:
+        int: 0 if the command could run here, 1 otherwise.
+    """
+    missing_modules = [name for name in command.modules if not module_available(name)]
+    missing_env = [name for name in command.env if not os.getenv(name)]
+    missing_inputs = [path for path in command.inputs if not os.path.exists(path)]
+
+    print(f"{command.name}: {command.help}")
+    print(f"  would run  python {os.path.relpath(command.script)} {' '.join(args)}".rstrip())
+    print(f"  modules    {'ok' if not missing_modules else 'missing ' + ', '.join(missing_modules)}")
+    print(f"  env        {'ok' if not missing_env else 'not set: ' + ', '.join(missing_env)}")
+    print(f"  inputs     {'ok' if not missing_inputs else 'missing ' + ', '.join(missing_inputs)}")
+    if command.sets_file and command.sets_file not in missing_inputs:
+        print(f"  sets       {shard_summary(command, args)}")
+    return 1 if missing_modules or missing_env or missing_inputs else 0
+
+
+# Function: Run a command's script
+def run(command, args):
+    """
+    Runs the command's script in this process as if it had been started directly.
+    """
+    sys.argv = [command.script] + list(args)
+    sys.path.insert(0, os.path.dirname(command.script))
+    runpy.run_path(command.script, run_name="__main__")
+    return 0
+
+
+# Function: Parse the command line
+def parse_args(argv=None):
+    """
+    Args:
+        argv (list[str]): Arguments after the program name; defaults to sys.argv[1:].
+
+    Returns:
+        tuple[Command, bool, list[str]]: The chosen command, whether --dry-run was given before or
+        after it, and the options to pass to its script.
+    """
+    commands = {command.name: command for command in COMMANDS}
+    parser = argparse.ArgumentParser(
+        description="Run a PokemonPriceTracker job.",
+        epilog="Options after the command are passed to its script; use `<command> --help` to list them.",
+    )
+    dry_run_help = "Check the command's dependencies, environment and inputs without running it."
+    parser.add_argument("--dry-run", action="store_true", help=dry_run_help)
+    subparsers = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for command in COMMANDS:
+        # add_help=False passes --help through to the script; allow_abbrev=False keeps script
+        # options that happen to prefix --dry-run going to the script
+        subparser = subparsers.add_parser(command.name, help=command.help, add_help=False, allow_abbrev=False)
+        # SUPPRESS leaves a --dry-run given before the command in place when it is not repeated here
+        subparser.add_argument("--dry-run", action="store_true", default=argparse.SUPPRESS, help=dry_run_help)
+    args, script_args = parser.parse_known_args(argv)
+    return commands[args.command], args.dry_run, script_args
+
+
+if __name__ == "__main__":
+    command, check_only, script_args = parse_args()
+    sys.exit(dry_run(command, script_args) if check_only else run(command, script_args))
@@ -0,0 +1,254 @@
+"""
+Script Name: pipeline.py
+Description:
+    Runs the daily refresh (set discovery, card/image/pack scraping, image mirroring, set value
+    analytics and the price service snapshot) as one dependency graph in a single process.
+
+    Steps start as soon as the steps they depend on have finished, so independent steps run
+    concurrently: set discovery and the card, image and pack scrapers share one browser session,
+    and every step shares the process-wide BigQuery/Cloud Storage clients from clients.py.
+    Blocking steps (image mirroring, analytics, the snapshot export) run in worker threads.
+
+    A step whose inputs are unchanged since its last successful run is skipped. A step's
+    fingerprint covers the contents of its input files and, for daily steps, the run's scrape date
+    (SCRAPE_DATE or today, the day the scrapers stamp their rows with), so each scraper runs once
+    per scrape day and re-running the pipeline only retries what failed. A step that
+    returns 0 (a scraper that got no rows) succeeds without recording its fingerprint, so it runs
+    again next time. Fingerprints are kept in .pipeline_state.json. Steps downstream of a failed
+    step are skipped.
+
+    Graph (step: dependencies):
+        sets
+        cards, images, packs: sets
+        image_upload: images
+        set_values (screens yesterday's prices, so it does not wait for today's scrape)
+        snapshot: cards, images
+
+Components:
+    - Step: One node of the graph.
+    - STEPS: The daily refresh graph.
+    - run_pipeline: Runs a graph, skipping unchanged steps.
+
+Environment Variables:
+    - BIGQUERY_PROJECT_ID: Google Cloud Project ID for BigQuery access.
+    - GCS_BUCKET_NAME: Bucket the image_upload step mirrors images into.
+
+Usage:
+    python code/pipeline.py [--force] [--only cards packs] [--warm-browser]
+"""
+
+# Modules
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import inspect
+import importlib
+from datetime import datetime
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(CODE_DIR, folder) for folder in ("scraping", "analytics", "serving")]
+
+import tcg_set_scraping
+import tcg_card_scraping
+import tcg_card_image_scraping
+import tcg_pack_scraping
+from clients import get_bigquery_client
+from sharding import run_scrape_date
+from browser_session import open_browser_session, add_browser_arguments
+
+STATE_FILE = ".pipeline_state.json"
+
+
+class Step:
+    """
+    One node of the pipeline graph.
+
+    Args:
+        name (str): Unique step name.
+        run (callable): Called with the shared context dict; may return a coroutine. A result of
+            0 means the step produced nothing and its fingerprint is not recorded.
+        deps (tuple[str]): Names of steps that must succeed first.
+        inputs (tuple[str]): Files whose contents decide whether the step needs to run again.
+        daily (bool): Include the scrape date in the fingerprint, so the step runs once per scrape day.
+        blocking (bool): Run `run` in a worker thread instead of on the event loop.
+    """
+
+    def __init__(self, name, run, deps=(), inputs=(), daily=True, blocking=False):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.daily = daily
+        self.blocking = blocking
+
+    def fingerprint(self, scrape_date=None):
+        """
+        Args:
+            scrape_date (date): Day the run scrapes; defaults to today.
+
+        Returns:
+            str: Hash of the step's inputs, or None if the step has no inputs and must always run.
+        """
+        if not self.inputs and not self.daily:
+            return None
+        digest = hashlib.sha256()
+        if self.daily:
+            digest.update((scrape_date or datetime.now().date()).isoformat().encode("utf-8"))
+        for path in self.inputs:
+            digest.update(path.encode("utf-8"))
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()
+
+
+# Function: Step runner for a scraper sharing the pipeline's browser and scrape date
+def run_scraper(module):
+    return lambda ctx: module.scrape_and_store_data(browser=ctx["browser"], scrape_date=ctx["scrape_date"])
+
+
+# Function: Import a step's module when the step runs, keeping pandas and pyarrow out of --help
+def step_module(name):
+    return importlib.import_module(name)
+
+
+STEPS = [
+    Step("sets", lambda ctx: tcg_set_scraping.update_set_catalog(browser=ctx["browser"])),
+    Step("cards", run_scraper(tcg_card_scraping),
+         deps=("sets",), inputs=("data/card_set_dictionary.csv",)),
+    Step("images", run_scraper(tcg_card_image_scraping),
+         deps=("sets",), inputs=("data/card_set_dictionary.csv",)),
+    Step("packs", run_scraper(tcg_pack_scraping),
+         deps=("sets",), inputs=("data/pack_set_dictionary.csv",)),
+    # Always runs: its real input is whichever pokemon_images rows still lack a gcs_uri
+    Step("image_upload", lambda ctx: step_module("tcg_card_image_upload").process_images(),
+         deps=("images",), daily=False, blocking=True),
+    Step("set_values", lambda ctx: step_module("best_value_set").calculate_set_values(ctx["bigquery"]),
+         inputs=("data/pull_rates.csv",), blocking=True),
+    Step("snapshot", lambda ctx: step_module("price_service").export_snapshot(), deps=("cards", "images"),
+         blocking=True),
+]
+
+
+# Function: Order steps so every step follows its dependencies
+def topological_order(steps):
+    """
+    Args:
+        steps (list[Step]): Steps to order.
+
+    Returns:
+        list[Step]: Steps in dependency order.
+
+    Raises:
+        ValueError: If a dependency is unknown or the graph has a cycle.
+    """
+    by_name = {step.name: step for step in steps}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(step):
+        if step.name in done:
+            return
+        if step.name in visiting:
+            raise ValueError(f"Pipeline has a cycle through '{step.name}'")
+        visiting.add(step.name)
+        for dep in step.deps:
+            if dep not in by_name:
+                raise ValueError(f"Step '{step.name}' depends on unknown step '{dep}'")
+            visit(by_name[dep])
+        visiting.discard(step.name)
+        done.add(step.name)
+        ordered.append(step)
+
+    for step in steps:
+        visit(step)
+    return ordered
+
+
+# Function: Run a pipeline graph
+async def run_pipeline(steps, context, force=False, only=None, state_path=STATE_FILE):
+    """
+    Runs every step once its dependencies have succeeded, skipping steps whose fingerprint matches
+    their last successful run.
+
+    Args:
+        steps (list[Step]): Graph to run.
+        context (dict): Shared objects passed to each step (browser session, clients, scrape date).
+        force (bool): Run steps even if their inputs are unchanged.
+        only (list[str]): If given, run only these steps; other steps count as already satisfied.
+        state_path (str): File the step fingerprints are stored in.
+
+    Returns:
+        dict[str, str]: Outcome per step: "done", "unchanged", "failed", "blocked" or "not selected".
+    """
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+
+    loop = asyncio.get_running_loop()
+    tasks = {}
+
+    async def run_step(step):
+        outcomes = await asyncio.gather(*(tasks[dep] for dep in step.deps))
+        if only is not None and step.name not in only:
+            return "not selected"
+        if any(outcome in ("failed", "blocked") for outcome in outcomes):
+            print(f"[{step.name}] Skipped: a dependency failed.")
+            return "blocked"
+
+        fingerprint = step.fingerprint(context.get("scrape_date"))
+        if not force and fingerprint is not None and state.get(step.name) == fingerprint:
+            print(f"[{step.name}] Skipped: inputs unchanged since the last successful run.")
+            return "unchanged"
+
+        print(f"[{step.name}] Starting...")
+        started = time.perf_counter()
+        try:
+            if step.blocking:
+                result = await loop.run_in_executor(None, step.run, context)
+            else:
+                result = step.run(context)
+                if inspect.isawaitable(result):
+                    result = await result
+        except Exception as e:
+            print(f"[{step.name}] Failed after {time.perf_counter() - started:.1f}s: {e}")
+            return "failed"
+
+        print(f"[{step.name}] Finished in {time.perf_counter() - started:.1f}s.")
+        if result == 0:
+            print(f"[{step.name}] No rows; it will run again next time.")
+        elif fingerprint is not None:
+            state[step.name] = fingerprint
+        return "done"
+
+    for step in topological_order(steps):
+        tasks[step.name] = asyncio.ensure_future(run_step(step))
+    outcomes = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=2)
+    return outcomes
+
+
+async def main(args):
+    async with open_browser_session(args.warm_browser, args.browser_cache_dir) as browser:
+        context = {"browser": browser, "bigquery": get_bigquery_client(), "scrape_date": run_scrape_date()}
+        outcomes = await run_pipeline(STEPS, context, force=args.force, only=args.only)
+
+    for name, outcome in outcomes.items():
+        print(f"{name:<14} {outcome}")
+    return 1 if any(outcome in ("failed", "blocked") for outcome in outcomes.values()) else 0
+
+
+# Entry point: Run the daily refresh
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the daily refresh as one dependency graph.")
+    parser.add_argument("--force", action="store_true", help="Run steps even if their inputs are unchanged.")
+    parser.add_argument("--only", nargs="+", choices=[step.name for step in STEPS],
+                        help="Run only these steps.")
+    args = add_browser_arguments(parser).parse_args()
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,185 @@
+"""
+Script Name: browser_session.py
+Description:
+    Chromium session shared by the Playwright scrapers, with an optional warm mode.
+
+    Cold mode matches the original behaviour: `chromium.launch()` and a fresh browser context for
+    every page, so every set re-downloads the price guide's JS bundles, CSS and fonts.
+    Warm mode launches one persistent context whose profile and HTTP disk cache live under a
+    cache directory. Every page for every set is opened in that context, so static assets are
+    served from cache after the first set, and the cache directory can be restored between CI
+    runs (see card_scraping.yml).
+
+    Both modes record the browser startup time and the bytes transferred by each page, and print
+    a summary when the session closes so cold and warm runs can be compared.
+
+Components:
+    - BrowserSession: Drop-in replacement for the Playwright browser passed to the scrape functions.
+    - open_browser_session: Starts Playwright and a BrowserSession, or reuses a session shared by the caller.
+    - add_browser_arguments: Adds the --warm-browser / --browser-cache-dir options to a parser.
+
+Environment Variables:
+    - WARM_BROWSER: Set to 1 to default to warm mode.
+    - BROWSER_CACHE_DIR: Default for --browser-cache-dir (defaults to ".browser_cache").
+
+Dependencies:
+    - playwright.async_api (imported when a session is opened)
+"""
+
+# Modules
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class BrowserSession:
+    """
+    Opens pages in either a fresh context per page (cold) or one persistent, disk-cached context (warm).
+
+    Args:
+        playwright (Playwright): Running Playwright instance from async_playwright().
+        warm (bool): Use a persistent context with a disk cache.
+        cache_dir (str): Directory holding the warm profile and HTTP cache.
+    """
+
+    def __init__(self, playwright, warm=False, cache_dir=".browser_cache"):
+        self.playwright = playwright
+        self.warm = warm
+        self.cache_dir = cache_dir
+        self.startup_seconds = None
+        self.page_bytes = []
+        self.unsized_requests = 0
+        self._browser = None
+        self._context = None
+
+    async def start(self):
+        """
+        Launches Chromium and records how long the launch took.
+
+        Returns:
+            BrowserSession: The started session, for chaining.
+        """
+        started = time.perf_counter()
+        if self.warm:
+            profile_dir = os.path.join(self.cache_dir, "profile")
+            http_cache_dir = os.path.join(self.cache_dir, "http")
+            os.makedirs(http_cache_dir, exist_ok=True)
+            self._context = await self.playwright.chromium.launch_persistent_context(
+                profile_dir, headless=True, args=[f"--disk-cache-dir={os.path.abspath(http_cache_dir)}"]
+            )
+        else:
+            self._browser = await self.playwright.chromium.launch(headless=True)
+        self.startup_seconds = time.perf_counter() - started
+        return self
+
+    async def new_page(self):
+        """
+        Opens a page and starts counting the bytes it transfers over the network.
+        Responses served from the disk cache report no encoded body, so they count as zero.
+
+        A request's sizes can only be read while its page is open, so the page's `close` first
+        waits for every size lookup still in flight.
+
+        Returns:
+            Page: Playwright page.
+        """
+        page = await (self._context.new_page() if self.warm else self._browser.new_page())
+        index = len(self.page_bytes)
+        self.page_bytes.append(0)
+        pending = set()
+
+        def on_request_finished(request):
+            task = asyncio.ensure_future(self._record_sizes(index, request))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        page.on("requestfinished", on_request_finished)
+
+        close = page.close
+
+        async def close_after_sizes(*args, **kwargs):
+            if pending:
+                await asyncio.gather(*pending)
+            await close(*args, **kwargs)
+
+        page.close = close_after_sizes
+        return page
+
+    async def _record_sizes(self, index, request):
+        from playwright.async_api import Error
+
+        try:
+            sizes = await request.sizes()
+        except Error:
+            # Counted rather than guessed, so the report says how complete its totals are
+            self.unsized_requests += 1
+            return
+        self.page_bytes[index] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+
+    def report(self):
+        """
+        Prints the startup time and bytes transferred per page for this session.
+        """
+        mode = "warm" if self.warm else "cold"
+        pages = len(self.page_bytes)
+        total = sum(self.page_bytes)
+        average = total / pages if pages else 0
+        print(f"Browser ({mode}): startup {self.startup_seconds:.2f}s, {pages} pages, "
+              f"{total / 2**20:.1f} MiB transferred, {average / 2**10:.0f} KiB per page"
+              + (f", {self.unsized_requests} requests without sizes" if self.unsized_requests else ""))
+
+    async def close(self):
+        """
+        Closes the browser or persistent context (flushing the disk cache) and prints the report.
+        """
+        if self._context is not None:
+            await self._context.close()
+        if self._browser is not None:
+            await self._browser.close()
+        self.report()
+
+
+# Function: Open a browser session, or reuse a shared one
+@asynccontextmanager
+async def open_browser_session(warm=False, cache_dir=".browser_cache", shared=None):
+    """
+    Yields a started BrowserSession. When `shared` is given (e.g. by pipeline.py, which runs several
+    scrapers against one browser) it is yielded as-is and left open for its owner to close.
+
+    Args:
+        warm (bool): Use a persistent context with a disk cache.
+        cache_dir (str): Directory holding the warm profile and HTTP cache.
+        shared (BrowserSession): Already started session to reuse.
+
+    Yields:
+        BrowserSession: Session to open pages from.
+    """
+    if shared is not None:
+        yield shared
+        return
+    from playwright.async_api import async_playwright
+    async with async_playwright() as p:
+        session = await BrowserSession(p, warm, cache_dir).start()
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+# Function: Register the browser command line options
+def add_browser_arguments(parser):
+    """
+    Adds the warm browser options to an argparse parser, defaulting to the environment variables.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend.
+
+    Returns:
+        argparse.ArgumentParser: The same parser, for chaining.
+    """
+    parser.add_argument("--warm-browser", action="store_true", default=os.getenv("WARM_BROWSER") == "1",
+                        help="Reuse one persistent browser context with an HTTP disk cache.")
+    parser.add_argument("--browser-cache-dir", default=os.getenv("BROWSER_CACHE_DIR", ".browser_cache"),
+                        help="Directory for the warm browser profile and HTTP cache.")
+    return parser
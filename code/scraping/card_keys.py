@@ -0,0 +1,266 @@
+"""
+Script Name: card_keys.py
+Description:
+    Stable integer identity keys for cards and sealed products, and the pokemon_cards dimension
+    table that maps each key to its attributes.
+
+    A card_key is the first 8 bytes of a BLAKE2b hash of (set slug, Number, Printing, normalized
+    Product Name), read as a signed INT64. It depends only on those values, so every scraper,
+    shard and rerun assigns the same key to the same card, and prices, images and packs can be
+    joined and de-duplicated on one INT64 column instead of four strings. Condition is not part
+    of the key: it is an attribute of a price, not of the card. Sealed products have no Number or
+    Printing and are keyed by set and name alone.
+
+    Names are normalized before hashing (accents folded, lower-cased, punctuation collapsed to
+    single spaces), so "Pokémon Center" and "Pokemon center" get the same key.
+
+    The scrapers call `add_card_keys` on their Arrow table before writing or uploading it, and
+    `update_card_dimension` once it has been published. The dimension keeps the latest name and
+    rarity seen for a key along with its first_seen/last_seen scrape dates, stored as DATETIME
+    like the scrape_date columns they come from.
+
+Components:
+    - card_key: Computes the key for one card.
+    - add_card_keys: Appends a card_key column to a scraped Arrow table.
+    - update_card_dimension: Merges a table's keys into pokemon_cards.
+    - assign_card_keys: Adds card_key to an existing table if needed and fills it for rows without one.
+    - backfill_card_keys: assign_card_keys, then loads the table's keys into pokemon_cards
+      (one-time migration, `--backfill`).
+
+Environment Variables:
+    - BIGQUERY_PROJECT_ID: Google Cloud Project ID for BigQuery access.
+
+Dependencies:
+    - numpy
+    - pyarrow
+    - google.cloud.bigquery (for BigQuery integration)
+
+Usage:
+    python code/scraping/card_keys.py --backfill pokemon_prices pokemon_images pokemon_packs
+"""
+
+# Modules
+import os
+import re
+import hashlib
+import argparse
+import unicodedata
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from clients import get_bigquery_client
+from row_buffer import WRITE_TRUNCATE, upload_arrow_table
+
+# Constants for BigQuery Project
+PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
+DATASET_ID = "pokemon_data"
+DIMENSION_TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.pokemon_cards"
+
+KEY_COLUMN = "card_key"
+IDENTITY_COLUMNS = ["source", "Number", "Printing", "Product Name"]
+DIMENSION_COLUMNS = IDENTITY_COLUMNS + ["Rarity"]
+NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+# Function: Normalize a Product Name for keying
+def normalize_name(name):
+    """
+    Args:
+        name (str): Scraped Product Name, e.g. "Flabébé - 083/182".
+
+    Returns:
+        str: Accent-folded, lower-cased words separated by single spaces, e.g. "flabebe 083 182".
+    """
+    folded = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii")
+    return NON_WORD.sub(" ", folded.lower()).strip()
+
+
+# Function: Compute one card key
+def card_key(source, number, printing, name):
+    """
+    Args:
+        source (str): Set URL extension, e.g. "base-set".
+        number (str): Card number, e.g. "4/102"; None for sealed products.
+        printing (str): Printing, e.g. "Holofoil"; None for sealed products.
+        name (str): Product Name.
+
+    Returns:
+        int: Signed 64-bit key, stable across runs and processes.
+    """
+    identity = "|".join([(source or "").strip(), (number or "").strip(), (printing or "").strip().lower(),
+                         normalize_name(name)])
+    digest = hashlib.blake2b(identity.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+# Function: Key every row of a table
+def add_card_keys(table):
+    """
+    Appends (or replaces) the card_key column. Identity columns the table lacks, such as Number
+    and Printing for sealed products, are treated as empty.
+
+    Args:
+        table (pa.Table): Scraped rows with at least source and Product Name.
+
+    Returns:
+        pa.Table: The table with a card_key INT64 column.
+    """
+    if KEY_COLUMN in table.column_names:
+        table = table.drop([KEY_COLUMN])
+    columns = [table.column(column).to_pylist() if column in table.column_names else [None] * table.num_rows
+               for column in IDENTITY_COLUMNS]
+
+    # Each card appears once per Condition, so hash each identity once
+    keys_by_identity = {}
+    keys = []
+    for identity in zip(*columns):
+        key = keys_by_identity.get(identity)
+        if key is None:
+            key = keys_by_identity[identity] = card_key(*identity)
+        keys.append(key)
+    return table.append_column(KEY_COLUMN, pa.array(keys, pa.int64()))
+
+
+# Function: Merge rows into the dimension table
+def _merge_dimension(source_query, client):
+    """
+    Upserts pokemon_cards from `source_query`, which must return card_key, the dimension
+    columns, first_seen and last_seen. first_seen and last_seen are cast to DATETIME, whatever
+    type the query returns them as.
+    """
+    columns = ", ".join(f"`{column}`" for column in DIMENSION_COLUMNS)
+    values = ", ".join(f"s.`{column}`" for column in DIMENSION_COLUMNS)
+    merge_query = f"""
+        CREATE TABLE IF NOT EXISTS `{DIMENSION_TABLE_ID}` (
+            card_key INT64 NOT NULL, source STRING, Number STRING, Printing STRING,
+            `Product Name` STRING, Rarity STRING, first_seen DATETIME, last_seen DATETIME
+        );
+        MERGE `{DIMENSION_TABLE_ID}` d
+        USING (
+            SELECT * REPLACE (CAST(first_seen AS DATETIME) AS first_seen, CAST(last_seen AS DATETIME) AS last_seen)
+            FROM ({source_query})
+        ) s
+        ON d.card_key = s.card_key
+        WHEN MATCHED THEN UPDATE SET
+            `Product Name` = IF(s.last_seen >= d.last_seen, s.`Product Name`, d.`Product Name`),
+            Rarity = IF(s.last_seen >= d.last_seen, COALESCE(s.Rarity, d.Rarity), d.Rarity),
+            first_seen = LEAST(d.first_seen, s.first_seen),
+            last_seen = GREATEST(d.last_seen, s.last_seen)
+        WHEN NOT MATCHED THEN
+            INSERT (card_key, {columns}, first_seen, last_seen)
+            VALUES (s.card_key, {values}, s.first_seen, s.last_seen);
+    """
+    client.query(merge_query).result()
+
+
+# Function: Record a published table's keys in the dimension table
+def update_card_dimension(table, table_name, client=None):
+    """
+    Merges the distinct keys of a keyed table into pokemon_cards.
+
+    Args:
+        table (pa.Table): Rows returned by add_card_keys, with a naive timestamp scrape_date
+            column (loaded as DATETIME).
+        table_name (str): Table the rows were published to; names the staging table, so
+            scrapers running at the same time don't overwrite each other's staging rows.
+        client (bigquery.Client): Client to use; defaults to the shared client.
+    """
+    client = client or get_bigquery_client()
+    keys = table.column(KEY_COLUMN).to_numpy()
+    _, first_rows = np.unique(keys, return_index=True)
+    first = table.take(pa.array(first_rows))
+
+    arrays = {KEY_COLUMN: first.column(KEY_COLUMN)}
+    for column in DIMENSION_COLUMNS:
+        if column in first.column_names:
+            arrays[column] = pc.cast(first.column(column), pa.string())
+        else:
+            arrays[column] = pa.nulls(first.num_rows, pa.string())
+    arrays["first_seen"] = arrays["last_seen"] = first.column("scrape_date")
+    dimension_rows = pa.table(arrays)
+
+    staging_id = f"{DIMENSION_TABLE_ID}_staging_{table_name}"
+    upload_arrow_table(dimension_rows, staging_id, WRITE_TRUNCATE, client=client)
+    try:
+        _merge_dimension(f"SELECT * FROM `{staging_id}`", client)
+        print(f"Recorded {dimension_rows.num_rows} card keys from {table_name} in {DIMENSION_TABLE_ID}.")
+    finally:
+        client.delete_table(staging_id, not_found_ok=True)
+
+
+# Function: Key the rows of an existing table that have no key
+def assign_card_keys(table_name, client=None):
+    """
+    Adds a card_key column to an existing table if it lacks one and fills it for rows without a
+    key, e.g. rows written before the column existed. Safe to re-run: only rows without a key
+    are touched, and a table whose rows all have keys only needs the ALTER and one SELECT.
+
+    Args:
+        table_name (str): Table name, e.g. pokemon_images.
+        client (bigquery.Client): Client to use; defaults to the shared client.
+
+    Returns:
+        int: Number of distinct identities that were assigned a key.
+    """
+    client = client or get_bigquery_client()
+    table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
+    client.query(f"ALTER TABLE `{table_id}` ADD COLUMN IF NOT EXISTS {KEY_COLUMN} INT64").result()
+
+    present = {field.name for field in client.get_table(table_id).schema}
+    identity = [column for column in IDENTITY_COLUMNS if column in present]
+    selected = ", ".join(f"`{column}`" for column in identity)
+    missing = client.query(f"SELECT DISTINCT {selected} FROM `{table_id}` WHERE card_key IS NULL").result().to_arrow()
+
+    if missing.num_rows:
+        mapping = add_card_keys(missing)
+        staging_id = f"{table_id}_card_keys"
+        upload_arrow_table(mapping, staging_id, WRITE_TRUNCATE, client=client)
+        matches = " AND ".join(f"t.`{column}` IS NOT DISTINCT FROM m.`{column}`" for column in identity)
+        try:
+            client.query(f"""
+                UPDATE `{table_id}` t SET card_key = m.card_key
+                FROM `{staging_id}` m
+                WHERE t.card_key IS NULL AND {matches}
+            """).result()
+        finally:
+            client.delete_table(staging_id, not_found_ok=True)
+        print(f"Assigned {mapping.num_rows} card keys in {table_id}.")
+    return missing.num_rows
+
+
+# Function: One-time migration of an existing table
+def backfill_card_keys(table_name, client=None):
+    """
+    Keys every row of an existing table (see assign_card_keys) and merges the table's keys into
+    pokemon_cards. Safe to re-run.
+
+    Args:
+        table_name (str): Table name, e.g. pokemon_prices.
+        client (bigquery.Client): Client to use; defaults to the shared client.
+    """
+    client = client or get_bigquery_client()
+    table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
+    assign_card_keys(table_name, client)
+
+    present = {field.name for field in client.get_table(table_id).schema}
+    attributes = ", ".join(
+        f"ARRAY_AGG(`{column}` ORDER BY scrape_date DESC LIMIT 1)[OFFSET(0)] AS `{column}`"
+        if column in present else f"CAST(NULL AS STRING) AS `{column}`"
+        for column in DIMENSION_COLUMNS
+    )
+    _merge_dimension(f"""
+        SELECT card_key, {attributes}, MIN(scrape_date) AS first_seen, MAX(scrape_date) AS last_seen
+        FROM `{table_id}`
+        GROUP BY card_key
+    """, client)
+    print(f"Merged the keys of {table_id} into {DIMENSION_TABLE_ID}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill card keys and the pokemon_cards dimension.")
+    parser.add_argument("--backfill", nargs="+", required=True, metavar="TABLE",
+                        help="Tables to key, e.g. pokemon_prices pokemon_images pokemon_packs.")
+    args = parser.parse_args()
+
+    for table_name in args.backfill:
+        backfill_card_keys(table_name)
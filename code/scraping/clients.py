@@ -0,0 +1,43 @@
+"""
+Script Name: clients.py
+Description:
+    Shared Google Cloud clients for the scraping and upload scripts.
+
+    Each client is created on first use and then reused for the rest of the process, so a script
+    (or the pipeline running several scripts) authenticates once instead of once per call. The
+    google.cloud libraries are imported on first use too, so importing a script for --help,
+    --dry-run or tests needs neither the libraries' import time nor credentials.
+
+Components:
+    - get_bigquery_client: Returns the process-wide BigQuery client.
+    - get_storage_client: Returns the process-wide Cloud Storage client.
+
+Dependencies:
+    - google.cloud.bigquery (only when get_bigquery_client is used)
+    - google.cloud.storage (only when get_storage_client is used)
+"""
+
+# Modules
+from functools import lru_cache
+
+
+# Function: Shared BigQuery client
+@lru_cache(maxsize=None)
+def get_bigquery_client():
+    """
+    Returns:
+        bigquery.Client: Client shared by every caller in this process.
+    """
+    from google.cloud import bigquery
+    return bigquery.Client()
+
+
+# Function: Shared Cloud Storage client
+@lru_cache(maxsize=None)
+def get_storage_client():
+    """
+    Returns:
+        storage.Client: Client shared by every caller in this process.
+    """
+    from google.cloud import storage
+    return storage.Client()
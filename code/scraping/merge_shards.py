@@ -0,0 +1,139 @@
+"""
+Script Name: merge_shards.py
+Description:
+    This script publishes a day of sharded scraper output to Google BigQuery.
+
+    Sharded scrapers (see sharding.py) each write their prepared rows to
+    "<shard-dir>/<table>/<date>/shard-<i>-of-<n>.parquet" instead of uploading. Once every
+    shard for the day is present, this script combines them and swaps the day into BigQuery
+    in a single transaction: the rows are loaded into a staging table, then today's existing
+    rows are deleted and the staged rows inserted inside one BEGIN/COMMIT block. Readers never
+    see a half-published day, and a missing shard leaves the previous data untouched.
+
+Components:
+    - load_shards: Reads and combines all shard files for a table and day.
+    - publish_day: Atomically replaces one day of data in a BigQuery table.
+
+    After publishing, the day's card keys are merged into the pokemon_cards dimension
+    (card_keys.py), and pokemon_prices rows are also recorded in the top movers index
+    (movers_index.py), since sharded scrapers do not update either themselves.
+
+Environment Variables:
+    - BIGQUERY_PROJECT_ID: Google Cloud Project ID for BigQuery access.
+    - SCRAPE_DATE: Default for --date; set to the same day the shards were run with.
+
+Dependencies:
+    - pyarrow
+    - google.cloud.bigquery (for BigQuery integration)
+
+Usage:
+    python code/scraping/merge_shards.py --table pokemon_prices --num-shards 4
+"""
+
+# Modules
+import os
+import sys
+import argparse
+import pyarrow as pa
+import pyarrow.parquet as pq
+from clients import get_bigquery_client
+from sharding import shard_path, run_scrape_date
+from row_buffer import WRITE_TRUNCATE, upload_arrow_table
+from movers_index import MoversIndex, INDEX_FILE
+from card_keys import KEY_COLUMN, update_card_dimension
+
+# Constants for BigQuery Project
+PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
+DATASET_ID = "pokemon_data"
+
+
+# Function: Read every shard for a day
+def load_shards(shard_dir, table_name, scrape_date, num_shards):
+    """
+    Reads all shard files for a table and day and combines them.
+
+    Args:
+        shard_dir (str): Root shard directory.
+        table_name (str): BigQuery table name (without project and dataset).
+        scrape_date (date | str): Day being published.
+        num_shards (int): Number of shards expected.
+
+    Returns:
+        pa.Table: Combined rows, or None if any shard has not reported in yet.
+    """
+    paths = [shard_path(shard_dir, table_name, scrape_date, i, num_shards) for i in range(num_shards)]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        print(f"Waiting on {len(missing)} of {num_shards} shards: {', '.join(missing)}")
+        return None
+
+    return pa.concat_tables([pq.read_table(path) for path in paths])
+
+
+# Function: Replace one day of data in a single transaction
+def publish_day(table, table_id, scrape_date):
+    """
+    Loads `table` into a staging table, then deletes and re-inserts the day in `table_id`
+    inside one BigQuery transaction and drops the staging table. A card_key column the
+    destination lacks is added first; the staging load replaces its table, so the column would
+    not otherwise be added by the load.
+
+    Args:
+        table (pa.Table): Prepared rows for the day.
+        table_id (str): Fully qualified destination table.
+        scrape_date (date | str): Day being published.
+    """
+    client = get_bigquery_client()
+    staging_id = f"{table_id}_staging_{str(scrape_date).replace('-', '')}"
+
+    print(f"Staging {table.num_rows} rows in {staging_id}...")
+    upload_arrow_table(table, staging_id, WRITE_TRUNCATE, client=client)
+
+    columns = ", ".join(f"`{column}`" for column in table.column_names)
+    # DDL can't run inside the transaction; ADD COLUMN IF NOT EXISTS is a no-op once it exists
+    add_key = ""
+    if KEY_COLUMN in table.column_names:
+        add_key = f"ALTER TABLE `{table_id}` ADD COLUMN IF NOT EXISTS {KEY_COLUMN} INT64;"
+    publish_query = f"""
+        {add_key}
+        BEGIN TRANSACTION;
+        DELETE FROM `{table_id}` WHERE scrape_date = '{scrape_date}';
+        INSERT INTO `{table_id}` ({columns}) SELECT {columns} FROM `{staging_id}`;
+        COMMIT TRANSACTION;
+    """
+    try:
+        print(f"Publishing {scrape_date} to {table_id}...")
+        client.query(publish_query).result()
+        print(f"Published {table.num_rows} rows to {table_id}.")
+    finally:
+        client.delete_table(staging_id, not_found_ok=True)
+
+
+# Entry point: Merge and publish the shards for a table
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish a day of sharded scraper output to BigQuery.")
+    parser.add_argument("--table", required=True, help="Table name, e.g. pokemon_prices.")
+    parser.add_argument("--num-shards", type=int, required=True, help="Number of shards expected.")
+    parser.add_argument("--shard-dir", default=os.getenv("SHARD_DIR", "shards"), help="Root shard directory.")
+    parser.add_argument("--date", default=run_scrape_date().isoformat(),
+                        help="Day to publish (YYYY-MM-DD); defaults to SCRAPE_DATE or today.")
+    parser.add_argument("--movers-index", default=os.getenv("MOVERS_INDEX", INDEX_FILE),
+                        help="Top movers index to update when publishing pokemon_prices; empty to disable.")
+    args = parser.parse_args()
+
+    combined_data = load_shards(args.shard_dir, args.table, args.date, args.num_shards)
+    if combined_data is None:
+        sys.exit(1)
+    if combined_data.num_rows == 0:
+        print("No rows found across shards. Keeping the existing data.")
+        sys.exit(1)
+
+    print(f"Total rows across {args.num_shards} shards: {combined_data.num_rows}")
+    publish_day(combined_data, f"{PROJECT_ID}.{DATASET_ID}.{args.table}", args.date)
+    update_card_dimension(combined_data, args.table)
+
+    # Sharded card runs leave the top movers index to this step
+    if args.table == "pokemon_prices" and args.movers_index:
+        movers = MoversIndex.load_or_create(args.movers_index)
+        movers.update_table(combined_data)
+        movers.save(args.movers_index)
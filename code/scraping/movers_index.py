@@ -0,0 +1,386 @@
+"""
+Script Name: movers_index.py
+Description:
+    Incremental index of recent card prices for answering "top gainers / losers" questions without
+    diffing full pokemon_prices days.
+
+    Each card is keyed by (source, Number, Printing, Condition) and owns one row of a ring buffer
+    holding its Market Price for the last `history_days` scrape days. The card scraper calls
+    `update` after each set is scraped (merge_shards.py calls `update_table` for sharded runs),
+    which writes the day's prices and re-ranks that set's leaderboards. Rarity and catalog-wide
+    leaderboards are re-ranked in one vectorized pass when the index is saved. Queries then only
+    read a precomputed top-N list: gainers are cards whose price rose, losers cards whose price
+    fell. A key repeated within one set and day (e.g. rows with an empty Number) keeps its first
+    row, and the rest are reported and skipped.
+
+    The index is stored as a single Arrow IPC file: key columns dictionary-encoded, the prices as
+    one fixed-size list of float32 per card, and the scrape day of each slot and the leaderboards
+    in the schema metadata. The file is memory-mapped on load and the price matrix is a read-only
+    view of the mapping, so a query reads only the leaderboard rows. The key lookups are built,
+    and the prices copied, only when the loaded index is first updated.
+
+Components:
+    - MoversIndex: The in-memory index.
+    - parse_price: Converts a scraped Market Price string to a float.
+
+Environment Variables:
+    - BIGQUERY_PROJECT_ID: Google Cloud Project ID, used by --rebuild.
+
+Dependencies:
+    - numpy
+    - pyarrow
+    - google.cloud.bigquery (only for --rebuild)
+
+Usage:
+    python code/scraping/movers_index.py --window 7 --set base-set
+    python code/scraping/movers_index.py --window 30 --rarity "Special Illustration Rare" --losers
+    python code/scraping/movers_index.py --rebuild
+"""
+
+# Modules
+import os
+import json
+import argparse
+import numpy as np
+import pyarrow as pa
+from datetime import date, datetime, timedelta
+
+INDEX_FILE = "data/movers_index.arrow"
+KEY_COLUMNS = ["source", "Number", "Printing", "Condition"]
+ATTRIBUTE_COLUMNS = ["Product Name", "Rarity"]
+WINDOWS = (1, 7, 30)
+
+
+# Function: Parse a scraped price
+def parse_price(value):
+    """
+    Converts a scraped Market Price such as "$1,234.56" to a float.
+
+    Args:
+        value (str): Scraped price text.
+
+    Returns:
+        float: Parsed price, or NaN if the text is not a price (e.g. "-").
+    """
+    try:
+        return float(str(value).replace("$", "").replace(",", ""))
+    except ValueError:
+        return float("nan")
+
+
+class MoversIndex:
+    """
+    Ring buffer of the last `history_days` prices per card with precomputed top-N leaderboards.
+
+    Args:
+        history_days (int): Number of scrape days kept; must exceed the longest window.
+        top_n (int): Length of each leaderboard.
+    """
+
+    def __init__(self, history_days=31, top_n=25):
+        if history_days <= max(WINDOWS):
+            raise ValueError(f"history_days must exceed the longest window ({max(WINDOWS)})")
+        self.history_days = history_days
+        self.top_n = top_n
+        self.slot_days = np.full(history_days, -1, dtype=np.int32)
+        self.prices = np.full((0, history_days), np.nan, dtype=np.float32)
+        self.columns = {column: [] for column in KEY_COLUMNS + ATTRIBUTE_COLUMNS}
+        self.rows_by_key = {}
+        self.rows_by_source = {}
+        self.boards = {}
+        self._table = None
+
+    def __len__(self):
+        return self._table.num_rows if self._table is not None else len(self.rows_by_key)
+
+    @property
+    def latest_day(self):
+        """
+        Returns:
+            date: Most recent scrape day in the index, or None if empty.
+        """
+        latest = int(self.slot_days.max())
+        return date.fromordinal(latest) if latest >= 0 else None
+
+    def _unpack(self):
+        """
+        Builds the key lookups of an index read by `load` and copies its prices out of the
+        read-only mapping, before the index is first changed.
+        """
+        if self._table is None:
+            return
+        table, self._table = self._table, None
+        for column in KEY_COLUMNS + ATTRIBUTE_COLUMNS:
+            self.columns[column] = table.column(column).to_pylist()
+        for row, key in enumerate(zip(*(self.columns[column] for column in KEY_COLUMNS))):
+            self.rows_by_key[key] = row
+            self.rows_by_source.setdefault(key[0], []).append(row)
+        self.prices = np.array(self.prices)
+
+    def _attributes(self, rows):
+        """
+        Returns:
+            dict[str, list[str]]: Key and attribute columns of `rows`, in order.
+        """
+        if self._table is not None:
+            return self._table.select(KEY_COLUMNS + ATTRIBUTE_COLUMNS).take(pa.array(rows, pa.int64())).to_pydict()
+        return {column: [self.columns[column][row] for row in rows] for column in KEY_COLUMNS + ATTRIBUTE_COLUMNS}
+
+    def _row_for(self, key, name, rarity):
+        row = self.rows_by_key.get(key)
+        if row is None:
+            row = len(self.rows_by_key)
+            self.rows_by_key[key] = row
+            self.rows_by_source.setdefault(key[0], []).append(row)
+            for column, value in zip(KEY_COLUMNS, key):
+                self.columns[column].append(value)
+            self.columns["Product Name"].append(name)
+            self.columns["Rarity"].append(rarity)
+            if row >= len(self.prices):
+                grown = np.full((max(1024, 2 * len(self.prices)), self.history_days), np.nan, dtype=np.float32)
+                grown[:len(self.prices)] = self.prices
+                self.prices = grown
+        else:
+            # Names and rarities can be corrected on the site; keep the latest
+            self.columns["Product Name"][row] = name
+            self.columns["Rarity"][row] = rarity
+        return row
+
+    def _slot_for(self, day):
+        ordinal = day.toordinal()
+        slot = ordinal % self.history_days
+        if self.slot_days[slot] != ordinal:
+            if self.slot_days[slot] > ordinal:
+                raise ValueError(f"{day} is older than the {self.history_days} days kept in the index")
+            self.slot_days[slot] = ordinal
+            self.prices[:, slot] = np.nan
+        return slot
+
+    def _price_change(self, rows, window):
+        """
+        Returns the prices `window` days before the latest day, the latest prices, and their difference
+        for `rows`. Cards missing either price get a NaN change.
+        """
+        latest = int(self.slot_days.max())
+        now_slot = latest % self.history_days
+        then_slot = (latest - window) % self.history_days
+        now = self.prices[rows, now_slot]
+        if self.slot_days[then_slot] != latest - window:
+            then = np.full(len(rows), np.nan, dtype=np.float32)
+        else:
+            then = self.prices[rows, then_slot]
+        return then, now, now - then
+
+    def _rank(self, group, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        for window in WINDOWS:
+            _, _, change = self._price_change(rows, window)
+            # NaN changes sort last and fail both comparisons
+            order = np.argsort(change, kind="stable")
+            ranked, ranked_change = rows[order], change[order]
+            self.boards[(group, window)] = (
+                ranked[ranked_change > 0][::-1][:self.top_n],
+                ranked[ranked_change < 0][:self.top_n],
+            )
+
+    def update(self, source, headers, rows, scrape_date):
+        """
+        Records one scraped set's prices for `scrape_date` and re-ranks that set's leaderboards.
+        Rows whose key repeats an earlier row are skipped and reported.
+
+        Args:
+            source (str): Set URL extension.
+            headers (list[str]): Column headers of the scraped table.
+            rows (list[list[str]]): Scraped rows, positionally matching `headers`.
+            scrape_date (date): Day the rows were scraped.
+        """
+        self._unpack()
+        slot = self._slot_for(scrape_date)
+        index = {column: headers.index(column) for column in KEY_COLUMNS[1:] + ATTRIBUTE_COLUMNS + ["Market Price"]}
+        width = max(index.values()) + 1
+        seen, duplicates = set(), []
+        for row_data in rows:
+            if len(row_data) < width:
+                continue
+            key = (source,) + tuple(row_data[index[column]] for column in KEY_COLUMNS[1:])
+            if key in seen:
+                duplicates.append(key)
+                continue
+            seen.add(key)
+            row = self._row_for(key, row_data[index["Product Name"]], row_data[index["Rarity"]])
+            self.prices[row, slot] = parse_price(row_data[index["Market Price"]])
+        if duplicates:
+            print(f"{source} {scrape_date}: skipped {len(duplicates)} rows repeating the key of an earlier row, "
+                  f"e.g. Number {duplicates[0][1]!r}, {duplicates[0][2]}, {duplicates[0][3]}.")
+        self._rank(("source", source), self.rows_by_source.get(source, []))
+
+    def update_table(self, table):
+        """
+        Records every set in a pokemon_prices-shaped Arrow table (e.g. merged shards or a BigQuery
+        export), one set and day at a time, then re-ranks all leaderboards.
+
+        Args:
+            table (pa.Table): Table with the key, attribute, 'Market Price' and 'scrape_date' columns.
+        """
+        columns = KEY_COLUMNS + ATTRIBUTE_COLUMNS + ["Market Price"]
+        df = table.select(columns + ["scrape_date"]).to_pandas()
+        df[columns] = df[columns].astype(object)
+        # TIMESTAMP/DATETIME columns arrive as pandas Timestamps, DATE columns as dates
+        df["scrape_date"] = [day.date() if isinstance(day, datetime) else day for day in df["scrape_date"]]
+        for (scrape_date, source), group in df.sort_values("scrape_date").groupby(["scrape_date", "source"], sort=False):
+            self.update(source, columns, group[columns].values.tolist(), scrape_date)
+        self.refresh()
+
+    def refresh(self):
+        """
+        Re-ranks every leaderboard, including the rarity and catalog-wide ones.
+        """
+        self._unpack()
+        if not len(self):
+            return
+        for source, rows in self.rows_by_source.items():
+            self._rank(("source", source), rows)
+        rarities = np.array(self.columns["Rarity"], dtype=object)
+        for rarity in set(self.columns["Rarity"]):
+            self._rank(("rarity", rarity), np.flatnonzero(rarities == rarity))
+        self._rank(("all", None), np.arange(len(self)))
+
+    def top_movers(self, window=1, source=None, rarity=None, losers=False):
+        """
+        Returns the precomputed top movers for a set, a rarity, or the whole catalog.
+
+        Args:
+            window (int): Days to compare over; one of WINDOWS.
+            source (str): Restrict to one set.
+            rarity (str): Restrict to one rarity (ignored if `source` is given).
+            losers (bool): Return the largest price drops instead of the largest gains.
+
+        Returns:
+            list[dict]: Up to `top_n` cards with their key, name, rarity, old and new price and
+            change; only cards whose price rose (or fell, for `losers`).
+        """
+        if window not in WINDOWS:
+            raise ValueError(f"window must be one of {WINDOWS}")
+        group = ("source", source) if source else ("rarity", rarity) if rarity else ("all", None)
+        board = self.boards.get((group, window))
+        if board is None:
+            return []
+        rows = board[1] if losers else board[0]
+        then, now, change = self._price_change(rows, window)
+        attributes = self._attributes(rows)
+        return [
+            dict({column: values[i] for column, values in attributes.items()},
+                 price_then=float(then[i]), price_now=float(now[i]), change=float(change[i]))
+            for i in range(len(rows))
+        ]
+
+    def save(self, path=INDEX_FILE):
+        """
+        Re-ranks all leaderboards and writes the index and leaderboards to an Arrow IPC file.
+
+        Args:
+            path (str): Destination file.
+        """
+        self.refresh()
+        count = len(self)
+        arrays = [pa.array(self.columns[column], pa.string()).dictionary_encode()
+                  for column in KEY_COLUMNS + ATTRIBUTE_COLUMNS]
+        # Row-major, so load can view the values as the (cards, slots) matrix without copying
+        arrays.append(pa.FixedSizeListArray.from_arrays(
+            pa.array(np.ascontiguousarray(self.prices[:count]).ravel()), self.history_days))
+        boards = [[group[0], group[1], window, gainers.tolist(), losers.tolist()]
+                  for (group, window), (gainers, losers) in self.boards.items()]
+        metadata = {"slot_days": json.dumps(self.slot_days.tolist()), "top_n": str(self.top_n),
+                    "boards": json.dumps(boards)}
+        table = pa.Table.from_arrays(arrays, names=KEY_COLUMNS + ATTRIBUTE_COLUMNS + ["prices"])
+        table = table.replace_schema_metadata(metadata)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        print(f"Saved {count} cards over {self.history_days} days to {path}")
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        """
+        Loads an index written by `save`, memory-mapping the file. The price matrix and key
+        columns stay in the mapping and the saved leaderboards are used as they are.
+
+        Args:
+            path (str): Index file.
+
+        Returns:
+            MoversIndex: Loaded index.
+        """
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        metadata = table.schema.metadata
+        slot_days = json.loads(metadata[b"slot_days"])
+
+        index = cls(history_days=len(slot_days), top_n=int(metadata[b"top_n"]))
+        index.slot_days = np.array(slot_days, dtype=np.int32)
+        index._table = table.select(KEY_COLUMNS + ATTRIBUTE_COLUMNS)
+        prices = table.column("prices")
+        prices = prices.chunk(0) if prices.num_chunks == 1 else prices.combine_chunks()
+        index.prices = prices.flatten().to_numpy().reshape(-1, index.history_days)
+        index.boards = {
+            ((kind, name), window): (np.array(gainers, dtype=np.int64), np.array(losers, dtype=np.int64))
+            for kind, name, window, gainers, losers in json.loads(metadata[b"boards"])
+        }
+        return index
+
+    @classmethod
+    def load_or_create(cls, path=INDEX_FILE):
+        """
+        Returns:
+            MoversIndex: The index at `path`, or an empty index if the file does not exist.
+        """
+        return cls.load(path) if os.path.exists(path) else cls()
+
+
+# Function: Rebuild the index from BigQuery
+def rebuild_from_bigquery(history_days=31):
+    """
+    Builds a fresh index from the last `history_days` days of pokemon_prices.
+
+    Args:
+        history_days (int): Number of days to load.
+
+    Returns:
+        MoversIndex: The rebuilt index.
+    """
+    from clients import get_bigquery_client
+    table_id = f"{os.getenv('BIGQUERY_PROJECT_ID')}.pokemon_data.pokemon_prices"
+    start_date = (datetime.now() - timedelta(days=history_days - 1)).date()
+    query = f"""
+        SELECT source, Number, Printing, Condition, `Product Name`, Rarity, `Market Price`, scrape_date
+        FROM `{table_id}`
+        WHERE scrape_date >= '{start_date}'
+    """
+    table = get_bigquery_client().query(query).result().to_arrow()
+    index = MoversIndex(history_days=history_days)
+    index.update_table(table)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query or rebuild the top movers index.")
+    parser.add_argument("--path", default=INDEX_FILE, help="Index file.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from BigQuery.")
+    parser.add_argument("--window", type=int, default=1, choices=WINDOWS, help="Days to compare over.")
+    parser.add_argument("--set", dest="source", help="Restrict to one set.")
+    parser.add_argument("--rarity", help="Restrict to one rarity.")
+    parser.add_argument("--losers", action="store_true", help="Show the largest drops instead of gains.")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_from_bigquery().save(args.path)
+    else:
+        index = MoversIndex.load(args.path)
+        print(f"Top {'losers' if args.losers else 'gainers'} over {args.window} day(s) up to {index.latest_day}:")
+        for mover in index.top_movers(args.window, args.source, args.rarity, args.losers):
+            print(f"{mover['change']:+10.2f}  {mover['price_then']:>9.2f} -> {mover['price_now']:>9.2f}  "
+                  f"{mover['Product Name']} ({mover['source']} {mover['Number']}, {mover['Printing']}, {mover['Condition']})")
@@ -0,0 +1,210 @@
+"""
+Script Name: row_buffer.py
+Description:
+    Columnar row buffer the scrapers append scraped table rows into, plus the BigQuery sink that
+    loads the result.
+
+    Rows are stored column by column against a pyarrow schema. Columns declared with a dictionary
+    type (e.g. Printing, Condition, Rarity, source) keep one copy of each distinct value and a
+    packed int32 code per row, so a catalog-wide scrape holds a handful of strings for those
+    columns instead of one per row. Other columns are converted to Arrow arrays as each set is
+    appended, so Python strings are released per set. `to_arrow` hands the codes and chunks to
+    Arrow without copying them, and `upload_arrow_table` loads the table into BigQuery as
+    parquet, so no DataFrame is built between scraping and upload. The load passes a BigQuery
+    schema derived from the Arrow schema, so e.g. scrape_date always loads as DATETIME, as the
+    earlier DataFrame uploads did.
+
+Components:
+    - RowBuffer: Append-only columnar builder producing a pyarrow.Table.
+    - scrape_timestamp: The scrape_date value of a day.
+    - bigquery_schema: BigQuery schema matching an Arrow schema.
+    - upload_arrow_table: Loads a pyarrow.Table into a BigQuery table.
+
+Dependencies:
+    - pyarrow
+    - google.cloud.bigquery (for BigQuery integration, imported by upload_arrow_table)
+"""
+
+# Modules
+import io
+import array
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from clients import get_bigquery_client
+
+# BigQuery write dispositions, so callers can pick one without importing google.cloud.bigquery
+WRITE_APPEND = "WRITE_APPEND"
+WRITE_TRUNCATE = "WRITE_TRUNCATE"
+
+
+class RowBuffer:
+    """
+    Append-only columnar buffer for scraped rows.
+
+    Args:
+        schema (pa.Schema): Columns to keep and their Arrow types. Fields with a
+            pa.dictionary(pa.int32(), pa.string()) type are dictionary-encoded as rows arrive.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._num_rows = 0
+        self._chunks = {}
+        self._codes = {}
+        self._dictionaries = {}
+        for field in schema:
+            if pa.types.is_dictionary(field.type):
+                self._codes[field.name] = array.array("i")
+                self._dictionaries[field.name] = {}
+            else:
+                self._chunks[field.name] = []
+
+    def __len__(self):
+        return self._num_rows
+
+    def _append_column(self, field, values):
+        name = field.name
+        if name in self._codes:
+            codes = self._codes[name]
+            dictionary = self._dictionaries[name]
+            for value in values:
+                if value is None:
+                    # Nulls are kept out of the dictionary and masked in to_arrow
+                    codes.append(-1)
+                else:
+                    codes.append(dictionary.setdefault(value, len(dictionary)))
+        else:
+            self._chunks[name].append(pa.array(values, type=field.type))
+
+    def extend(self, headers, rows, **constants):
+        """
+        Appends scraped table rows.
+
+        Args:
+            headers (list[str]): Column headers of the scraped table.
+            rows (list[list]): Scraped rows, positionally matching `headers`. Short rows are padded
+                with nulls, and a schema column missing from `headers` is null for every row.
+            **constants: Values repeated on every appended row for columns not in `headers`,
+                e.g. source="base-set".
+        """
+        # Every column is located before any is written, so the columns always stay the same length
+        positions = {field.name: headers.index(field.name) if field.name in headers else None
+                     for field in self.schema if field.name not in constants}
+        for field in self.schema:
+            if field.name in constants:
+                values = [constants[field.name]] * len(rows)
+            elif positions[field.name] is None:
+                values = [None] * len(rows)
+            else:
+                index = positions[field.name]
+                values = [row[index] if index < len(row) else None for row in rows]
+            self._append_column(field, values)
+        self._num_rows += len(rows)
+
+    def to_arrow(self):
+        """
+        Builds a pyarrow.Table from the buffered rows. Dictionary codes are wrapped without copying,
+        so the buffer cannot be extended while the returned table is still referenced.
+
+        Returns:
+            pa.Table: Table matching the buffer's schema.
+        """
+        columns = []
+        for field in self.schema:
+            if field.name in self._codes:
+                codes = self._codes[field.name]
+                indices = pa.Array.from_buffers(pa.int32(), len(codes), [None, pa.py_buffer(codes)])
+                if -1 in codes:
+                    indices = pc.if_else(pc.equal(indices, -1), None, indices)
+                dictionary = pa.array(list(self._dictionaries[field.name]), type=field.type.value_type)
+                columns.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            else:
+                columns.append(pa.chunked_array(self._chunks[field.name], type=field.type))
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+
+# Function: The scrape_date value of a day
+def scrape_timestamp(scrape_date=None):
+    """
+    Returns midnight of the scrape date as a naive datetime, the value stored in the scrape_date
+    column. This matches what the previous pandas datetime64 upload produced from a date.
+
+    Args:
+        scrape_date (date): Day the rows belong to; defaults to today.
+
+    Returns:
+        datetime: Midnight of the scrape date.
+    """
+    return datetime.combine(scrape_date or datetime.now().date(), datetime.min.time())
+
+
+# Function: BigQuery schema of an Arrow schema
+def bigquery_schema(schema):
+    """
+    Maps each Arrow field to the BigQuery column type the scraped tables use. Dictionary columns
+    map to their value type, and naive timestamps to DATETIME (what pandas uploads of naive
+    datetimes created), so scrape_date keeps its type however a table is loaded.
+
+    Args:
+        schema (pa.Schema): Arrow schema of the rows to load.
+
+    Returns:
+        list[bigquery.SchemaField]: Nullable fields in schema order.
+
+    Raises:
+        TypeError: If a field has a type with no mapping.
+    """
+    from google.cloud import bigquery
+
+    fields = []
+    for field in schema:
+        arrow_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+        if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+            column_type = "STRING"
+        elif pa.types.is_timestamp(arrow_type):
+            column_type = "TIMESTAMP" if arrow_type.tz else "DATETIME"
+        elif pa.types.is_date(arrow_type):
+            column_type = "DATE"
+        elif pa.types.is_integer(arrow_type):
+            column_type = "INT64"
+        elif pa.types.is_floating(arrow_type):
+            column_type = "FLOAT64"
+        elif pa.types.is_boolean(arrow_type):
+            column_type = "BOOL"
+        else:
+            raise TypeError(f"No BigQuery type for column {field.name} ({field.type})")
+        fields.append(bigquery.SchemaField(field.name, column_type, mode="NULLABLE"))
+    return fields
+
+
+# Function: Load an Arrow table into BigQuery
+def upload_arrow_table(table, table_id, write_disposition=WRITE_APPEND, client=None):
+    """
+    Loads a pyarrow.Table into BigQuery by serialising it to parquet in memory, with the
+    destination schema given explicitly (see bigquery_schema). Dictionary columns are written as
+    dictionary-encoded parquet and load as STRING.
+
+    Args:
+        table (pa.Table): Rows to load.
+        table_id (str): Fully qualified destination table.
+        write_disposition (str): WRITE_APPEND or WRITE_TRUNCATE.
+        client (bigquery.Client): Client to use; defaults to the shared client.
+    """
+    from google.cloud import bigquery
+
+    client = client or get_bigquery_client()
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    buffer.seek(0)
+
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition=write_disposition,
+        schema=bigquery_schema(table.schema),
+    )
+    if write_disposition == WRITE_APPEND:
+        # Lets new columns (e.g. card_key) reach tables created before they were added
+        job_config.schema_update_options = [bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
+    client.load_table_from_file(buffer, table_id, job_config=job_config).result()
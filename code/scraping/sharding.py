@@ -0,0 +1,161 @@
+"""
+Script Name: sharding.py
+Description:
+    Helpers for splitting the set lists across several scraper processes or CI jobs.
+
+    Each set is hashed to a shard with a stable CRC32 of its name, so the same set always lands
+    on the same shard regardless of row order in the CSV, the machine, or the Python hash seed.
+    When a scraper runs as one shard of many it does not touch BigQuery; instead it writes its
+    prepared rows to a parquet file under the shard directory, and merge_shards.py publishes
+    the whole day once every shard has reported in.
+
+Components:
+    - shard_for: Returns the shard index a set belongs to.
+    - select_shard: Filters a set DataFrame down to the rows owned by one shard.
+    - run_scrape_date: Picks the day a run's rows are stamped with.
+    - add_shard_arguments: Adds the --shard-index / --num-shards / --shard-dir / --scrape-date
+      options to a parser.
+    - shard_path: Builds the parquet path a shard writes to for a given table and day.
+    - write_shard: Writes one shard's prepared rows to its parquet file.
+
+Environment Variables:
+    - SHARD_INDEX: Default for --shard-index (defaults to 0).
+    - NUM_SHARDS: Default for --num-shards (defaults to 1, i.e. no sharding).
+    - SHARD_DIR: Default for --shard-dir (defaults to "shards").
+    - SCRAPE_DATE: Default for --scrape-date (YYYY-MM-DD; defaults to the day the run starts).
+      CI sets it once for every shard and the merge, so a run crossing midnight stays one day.
+
+Dependencies:
+    - pyarrow (for parquet output, imported by write_shard)
+"""
+
+# Modules
+import os
+import zlib
+from datetime import date
+
+
+# Function: Map a set to its shard
+def shard_for(set_extension, num_shards):
+    """
+    Returns the shard index for a set using a CRC32 hash of its URL extension.
+
+    Args:
+        set_extension (str): Set URL extension, e.g. "base-set".
+        num_shards (int): Total number of shards.
+
+    Returns:
+        int: Shard index in the range [0, num_shards).
+    """
+    return zlib.crc32(str(set_extension).encode("utf-8")) % num_shards
+
+
+# Function: Keep only the sets owned by one shard
+def select_shard(set_df, shard_index, num_shards, column="set"):
+    """
+    Filters a set list down to the sets owned by `shard_index`.
+
+    Args:
+        set_df (pd.DataFrame): Set list as read from one of the data/*_dictionary.csv files.
+        shard_index (int): Index of the shard to keep.
+        num_shards (int): Total number of shards.
+        column (str): Column holding the set URL extension.
+
+    Returns:
+        pd.DataFrame: Rows of `set_df` belonging to the shard, in their original order.
+    """
+    if num_shards < 1 or not 0 <= shard_index < num_shards:
+        raise ValueError(f"Invalid shard {shard_index} of {num_shards}")
+    if num_shards == 1:
+        return set_df
+    mask = set_df[column].map(lambda s: shard_for(s, num_shards) == shard_index)
+    return set_df[mask]
+
+
+# Function: Pick the day a run's rows are stamped with
+def run_scrape_date(value=None):
+    """
+    Returns the scrape date for a run, chosen once when the run starts so every set, shard and
+    the merge step agree on it even if the run crosses midnight.
+
+    Args:
+        value (date | str): Explicit day; defaults to SCRAPE_DATE, then today.
+
+    Returns:
+        date: The run's scrape date.
+    """
+    value = value or os.getenv("SCRAPE_DATE")
+    if not value:
+        return date.today()
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+# Function: Register the sharding command line options
+def add_shard_arguments(parser):
+    """
+    Adds the sharding options to an argparse parser, defaulting to the SHARD_* environment variables.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend.
+
+    Returns:
+        argparse.ArgumentParser: The same parser, for chaining.
+    """
+    parser.add_argument("--shard-index", type=int, default=int(os.getenv("SHARD_INDEX", 0)),
+                        help="Index of the shard this process scrapes (0-based).")
+    parser.add_argument("--num-shards", type=int, default=int(os.getenv("NUM_SHARDS", 1)),
+                        help="Total number of shards. 1 scrapes every set and uploads directly.")
+    parser.add_argument("--shard-dir", default=os.getenv("SHARD_DIR", "shards"),
+                        help="Directory shard outputs are written to when --num-shards > 1.")
+    parser.add_argument("--scrape-date", type=date.fromisoformat, default=run_scrape_date(),
+                        help="Day the rows are stamped with (YYYY-MM-DD); defaults to SCRAPE_DATE or today.")
+    return parser
+
+
+# Function: Build the output path for one shard
+def shard_path(shard_dir, table_name, scrape_date, shard_index, num_shards):
+    """
+    Returns the parquet path a shard writes to, e.g. shards/pokemon_prices/2024-01-01/shard-0-of-4.parquet.
+
+    Args:
+        shard_dir (str): Root shard directory.
+        table_name (str): BigQuery table name (without project and dataset).
+        scrape_date (date | str): Day being scraped.
+        shard_index (int): Index of the shard.
+        num_shards (int): Total number of shards.
+
+    Returns:
+        str: Path of the shard's parquet file.
+    """
+    return os.path.join(shard_dir, table_name, str(scrape_date), f"shard-{shard_index}-of-{num_shards}.parquet")
+
+
+# Function: Write one shard's rows to disk
+def write_shard(table, shard_dir, table_name, scrape_date, shard_index, num_shards):
+    """
+    Writes a shard's prepared rows to parquet. An empty table is still written so the merge
+    step can tell a shard that found nothing apart from a shard that never finished.
+
+    The file is written under a temporary name and renamed into place, so a partially written
+    shard is never picked up by the merge step.
+
+    Args:
+        table (pa.Table): Rows prepared for upload.
+        shard_dir (str): Root shard directory.
+        table_name (str): BigQuery table name (without project and dataset).
+        scrape_date (date | str): Day being scraped.
+        shard_index (int): Index of the shard.
+        num_shards (int): Total number of shards.
+
+    Returns:
+        str: Path of the written parquet file.
+    """
+    import pyarrow.parquet as pq
+
+    path = shard_path(shard_dir, table_name, scrape_date, shard_index, num_shards)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    print(f"Wrote {table.num_rows} rows for shard {shard_index} of {num_shards} to {path}")
+    return path
@@ -1,7 +1,9 @@
+# requests, pyarrow, row_buffer.py and card_keys.py are imported by the functions that use them,
+# so --help stays fast
 import os
-import requests
+import argparse
 from io import BytesIO
-from google.cloud import storage, bigquery
+from clients import get_bigquery_client, get_storage_client
 from datetime import datetime
 
 # Constants
@@ -10,12 +12,10 @@ PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
 DATASET_ID = "pokemon_data"
 TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.pokemon_images"
 
-# Initialize Google Cloud clients
-storage_client = storage.Client()
-bigquery_client = bigquery.Client()
-
 # Function to download an image and upload it to GCS
 def download_and_upload_image(image_url, filename):
+    import requests
+
     try:
         # Download image into memory
         response = requests.get(image_url)
@@ -23,55 +23,75 @@ def download_and_upload_image(image_url, filename):
         image_bytes = BytesIO(response.content)
 
         # Upload the image to GCS directly from memory
-        bucket = storage_client.bucket(BUCKET_NAME)
+        bucket = get_storage_client().bucket(BUCKET_NAME)
         blob = bucket.blob(f"images/{filename}")
         blob.upload_from_file(image_bytes, content_type="image/jpeg")
 
         # Return the GCS URI of the uploaded image
         return f"gs://{BUCKET_NAME}/images/{filename}"
-    
+
     except Exception as e:
         print(f"Failed to download or upload {image_url}: {e}")
         return None
 
-# Function to update the GCS URI in BigQuery for each row
-def update_GCS_URI_in_bigquery(id, GCS_URI):
+# Function to set the GCS URIs of many cards with one keyed UPDATE
+def update_GCS_URIs_in_bigquery(uris_by_key):
+    import pyarrow as pa
+    from row_buffer import WRITE_TRUNCATE, upload_arrow_table
+
+    staging_id = f"{TABLE_ID}_gcs_uris"
+    staged = pa.table({
+        "card_key": pa.array(list(uris_by_key), pa.int64()),
+        "gcs_uri": pa.array(list(uris_by_key.values()), pa.string()),
+    })
+    upload_arrow_table(staged, staging_id, WRITE_TRUNCATE)
     update_query = f"""
-    UPDATE `{TABLE_ID}`
-    SET gcs_uri = @GCS_URI
-    WHERE id = @id
+    UPDATE `{TABLE_ID}` t
+    SET gcs_uri = s.gcs_uri
+    FROM `{staging_id}` s
+    WHERE t.card_key = s.card_key AND t.gcs_uri IS NULL
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("GCS_URI", "STRING", GCS_URI),
-            bigquery.ScalarQueryParameter("id", "INT64", id),  # Set id as INT64
-        ]
-    )
-    bigquery_client.query(update_query, job_config=job_config).result()
-    print(f"Updated GCS URI for row ID {id}")
+    try:
+        get_bigquery_client().query(update_query).result()
+    finally:
+        get_bigquery_client().delete_table(staging_id, not_found_ok=True)
+    print(f"Updated GCS URIs for {len(uris_by_key)} cards")
 
 # Main function to process images
 def process_images():
-    # Query BigQuery for rows where gcs_uri is NULL
+    from card_keys import assign_card_keys
+
+    # Key any rows written without one first, so they are mirrored too
+    assign_card_keys("pokemon_images")
+
+    # One row per card still missing a GCS URI; mirrored_uri is set if an earlier day's row
+    # of the same card was already mirrored, in which case there is nothing to download
     query = f"""
-    SELECT id, `Product Name`, Image
+    SELECT card_key, ANY_VALUE(Image) AS Image, MAX(gcs_uri) AS mirrored_uri
     FROM `{TABLE_ID}`
-    WHERE gcs_uri IS NULL
+    WHERE card_key IS NOT NULL
+    GROUP BY card_key
+    HAVING COUNTIF(gcs_uri IS NULL) > 0
     """
-    rows = bigquery_client.query(query).result()
+    rows = get_bigquery_client().query(query).result()
 
+    uris_by_key = {}
     for row in rows:
-        image_url = row["Image"]
-        id = row["id"]
-        filename = f"{row['Product Name'].replace(' ', '_')}_{id}.jpg"
+        GCS_URI = row["mirrored_uri"]
+        if GCS_URI is None:
+            # Keys are signed INT64; name files by the unsigned hex form
+            filename = f"{row['card_key'] & 0xFFFFFFFFFFFFFFFF:016x}.jpg"
+            GCS_URI = download_and_upload_image(row["Image"], filename)
 
-        # Download and upload the image
-        GCS_URI = download_and_upload_image(image_url, filename)
-
-        # Update BigQuery with the GCS URI if successful
+        # Record the GCS URI if the upload succeeded
         if GCS_URI:
-            update_GCS_URI_in_bigquery(id, GCS_URI)
+            uris_by_key[row["card_key"]] = GCS_URI
+
+    if uris_by_key:
+        update_GCS_URIs_in_bigquery(uris_by_key)
 
 # Run the script
 if __name__ == "__main__":
+    # No options yet; parsing still answers --help without starting the upload
+    argparse.ArgumentParser(description="Mirror card images into Cloud Storage.").parse_args()
     process_images()
@@ -15,38 +15,92 @@ Components:
     - scrape_and_store_data: Main function coordinating deletion, scraping, and upload.
     - upload_to_bigquery: Uploads scraped data to BigQuery.
 
+Storage:
+    Rows are appended into a RowBuffer (row_buffer.py) typed by upload_schema(). Low-cardinality
+    columns are dictionary-encoded as they arrive, and the resulting Arrow table is loaded into
+    BigQuery as parquet without building an intermediate DataFrame.
+Card Keys:
+    Every row gets a card_key (card_keys.py) before it is written or uploaded, and the keys of an
+    uploaded day are merged into the pokemon_cards dimension table.
+
+Browser:
+    Pass --warm-browser (or set WARM_BROWSER=1) to reuse one persistent browser context with an
+    HTTP disk cache under --browser-cache-dir for every set; see browser_session.py.
+
+Movers Index:
+    Each scraped set is also recorded in the top movers index (movers_index.py) at --movers-index,
+    which is saved once all sets are scraped. Pass --movers-index "" to disable it.
+
+Sharding:
+    Pass --shard-index i --num-shards N to scrape only the sets hashed to shard i. Sharded runs
+    skip the BigQuery delete/upload and write their rows under --shard-dir instead; run
+    merge_shards.py --table pokemon_prices --num-shards N once all shards finish.
+
 Environment Variables:
     - BIGQUERY_PROJECT_ID: Google Cloud Project ID for BigQuery access.
 
 Dependencies:
-    - pandas
+    - pandas (imported by scrape_and_store_data)
+    - pyarrow, numpy (imported with row_buffer.py, card_keys.py and movers_index.py by the
+      functions that build or upload rows, so --help stays fast)
     - asyncio
-    - playwright.async_api (for web scraping)
+    - playwright.async_api (via browser_session.py) (for web scraping)
     - google.cloud.bigquery (for BigQuery integration)
     
 """
 
 # Modules
 import os
-import pandas as pd
+import argparse
 import asyncio
 from datetime import datetime
-from playwright.async_api import async_playwright
-from google.cloud import bigquery
+from clients import get_bigquery_client
+from sharding import add_shard_arguments, select_shard, write_shard, run_scrape_date
+from browser_session import open_browser_session, add_browser_arguments
+from tcg_set_scraping import trusted_count, row_count_complete
 
 # Constants for BigQuery Project
 PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
 DATASET_ID = "pokemon_data"
-TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.pokemon_prices"
+TABLE_NAME = "pokemon_prices"
+TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_NAME}"
+
+# Default top movers index; the same file as movers_index.INDEX_FILE
+MOVERS_INDEX_FILE = "data/movers_index.arrow"
+
+# Function: Upload schema; low-cardinality columns are dictionary-encoded in the row buffer
+def upload_schema():
+    """
+    Imports pyarrow only when rows are buffered, so importing the script stays fast.
+
+    Returns:
+        pa.Schema: Columns of the pokemon_prices table as buffered by RowBuffer.
+    """
+    import pyarrow as pa
+
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("Product Name", pa.string()),
+        ("Printing", label),
+        ("Condition", label),
+        ("Rarity", label),
+        ("Number", pa.string()),
+        ("Market Price", pa.string()),
+        ("source", label),
+        ("scrape_date", pa.timestamp("us")),
+    ])
 
 # Function: Delete today's data from BigQuery
-def delete_today_data():
+def delete_today_data(scrape_date=None):
     """
     Deletes records in the BigQuery table that match today's date.
     Ensures that duplicate data is not stored if the script is run multiple times in a day.
+
+    Args:
+        scrape_date (date): Day to delete; defaults to today.
     """
-    client = bigquery.Client()
-    today_date = datetime.now().date().isoformat()
+    client = get_bigquery_client()
+    today_date = (scrape_date or datetime.now().date()).isoformat()
     delete_query = f"""
         DELETE FROM `{TABLE_ID}`
         WHERE scrape_date = '{today_date}'
@@ -56,19 +110,25 @@ def delete_today_data():
     print(f"Data with today's date ({today_date}) has been deleted from BigQuery.")
 
 # Function: Scrape data from a single URL
-async def scrape_table_data(url, browser, expected_rows):
+async def scrape_table_data(url, browser, expected_rows, buffer, movers=None, scrape_date=None):
     """
     Navigates to a specified URL and scrapes Pokémon card price data if the row count matches `expected_rows`.
     Will refresh the page up to 3 times if the row count is incorrect or if 'Product Type' has null values.
 
     Args:
         url (str): URL to scrape data from.
-        browser (Browser): Playwright browser instance.
-        expected_rows (int): Expected row count for data validation.
+        browser (BrowserSession): Browser session pages are opened from.
+        expected_rows (int): Expected row count for data validation, or None to take the first
+            table found (the set's count has not been confirmed; see tcg_set_scraping.py).
+        buffer (RowBuffer): Buffer the scraped rows are appended to.
+        movers (MoversIndex): Top movers index to record the set's prices in, if any.
+        scrape_date (date): Day the rows are stamped with; defaults to today.
 
     Returns:
-        pd.DataFrame: DataFrame containing scraped data or empty DataFrame if unsuccessful.
+        int: Number of rows appended to `buffer`, or 0 if unsuccessful.
     """
+    from row_buffer import scrape_timestamp
+
     max_retries = 3
     for attempt in range(max_retries):
         page = await browser.new_page()
@@ -81,8 +141,10 @@ async def scrape_table_data(url, browser, expected_rows):
             row_count = await rows.count()
             print(f"Attempt {attempt + 1}: Found {row_count} rows in the table for {url}")
 
-            # If row count matches the expected, proceed to scrape
-            if row_count >= 2:
+            # Proceed once the table has most of the set's confirmed rows (the set may genuinely
+            # have shrunk, so the last attempt takes whatever loaded)
+            complete = row_count_complete(row_count - 1, expected_rows) or attempt == max_retries - 1
+            if row_count >= 2 and complete:
                 data = []
                 headers = [await cell.inner_text() for cell in await rows.nth(0).locator("th").all()]
                 
@@ -92,20 +154,21 @@ async def scrape_table_data(url, browser, expected_rows):
                     row_data = [await cell.inner_text() for cell in cells]
                     data.append(row_data)
 
-                df = pd.DataFrame(data, columns=headers)
-
                 # Check for null values in 'Product Type' and retry if any nulls are found
-                if df['Product Name'].isna().any():
+                name_index = headers.index("Product Name")
+                if any(len(row_data) <= name_index for row_data in data):
                     print(f"Null values found in 'Product Type' for {url}. Retrying...")
                 else:
-                    df["source"] = url.split('/')[-1]
-                    df["scrape_date"] = datetime.now().date()
+                    buffer.extend(headers, data, source=url.split('/')[-1], scrape_date=scrape_timestamp(scrape_date))
+                    if movers is not None:
+                        movers.update(url.split('/')[-1], headers, data, scrape_date or datetime.now().date())
 
-                    print(f"Scraped data successfully from {url} - {len(df)} rows")
+                    print(f"Scraped data successfully from {url} - {len(data)} rows")
                     await page.close()
-                    return df
+                    return len(data)
             else:
-                print(f"Row count {row_count} does not match expected {expected_rows} for {url}. Retrying...")
+                expected = "a table" if expected_rows is None else f"the expected {expected_rows}"
+                print(f"Row count {row_count} is short of {expected} for {url}. Retrying...")
 
         except Exception as e:
             print(f"Error on {url}, attempt {attempt + 1}: {e}")
@@ -115,79 +178,93 @@ async def scrape_table_data(url, browser, expected_rows):
             await asyncio.sleep(5)  # Delay before retry
 
     print(f"Failed to scrape complete data from {url} after {max_retries} attempts.")
-    return pd.DataFrame()
+    return 0
 
 # Main Function: Orchestrate the scraping and uploading process
-async def scrape_and_store_data():
+async def scrape_and_store_data(shard_index=0, num_shards=1, shard_dir="shards", warm_browser=False,
+                                browser_cache_dir=".browser_cache", browser=None, scrape_date=None, movers_index=MOVERS_INDEX_FILE):
     """
     Deletes current day's data in BigQuery, scrapes data from URLs in data/card_set_dictionary.csv,
     and uploads the results to BigQuery.
+
+    When `num_shards` > 1 only the sets hashed to `shard_index` are scraped, and the rows are
+    written under `shard_dir` for merge_shards.py to publish instead of being uploaded.
+
+    Args:
+        shard_index (int): Index of the shard to scrape.
+        num_shards (int): Total number of shards.
+        shard_dir (str): Root directory for shard outputs.
+        warm_browser (bool): Reuse one persistent, disk-cached browser context for every set.
+        browser_cache_dir (str): Directory for the warm browser profile and HTTP cache.
+        browser (BrowserSession): Already started session to scrape with instead of launching one.
+        scrape_date (date): Day the rows are stamped with; defaults to SCRAPE_DATE or the day the
+            run starts, and is not re-read as the run goes on.
+        movers_index (str): Top movers index file to update, or None to skip it. Sharded runs leave
+            this to merge_shards.py.
+
+    Returns:
+        int: Rows scraped; 0 means nothing was scraped or uploaded.
     """
-    # Step 1: Delete today's data
-    delete_today_data()
+    import pandas as pd
+    from row_buffer import RowBuffer
+    from card_keys import add_card_keys, update_card_dimension
+    from movers_index import MoversIndex
 
-    # Step 2: Load URLs and expected row counts
-    set_df = pd.read_csv("data/card_set_dictionary.csv")
-    all_data = []
+    sharded = num_shards > 1
+    scrape_date = run_scrape_date(scrape_date)
+    loop = asyncio.get_running_loop()
 
-    # Step 3: Initialize Playwright browser
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
+    # Step 1: Delete today's data (the merge step handles this for sharded runs)
+    if not sharded:
+        await loop.run_in_executor(None, delete_today_data, scrape_date)
 
+    # Step 2: Load URLs and expected row counts for this shard
+    set_df = select_shard(pd.read_csv("data/card_set_dictionary.csv"), shard_index, num_shards)
+    buffer = RowBuffer(upload_schema())
+    movers = MoversIndex.load_or_create(movers_index) if movers_index and not sharded else None
+
+    # Step 3: Initialize Playwright browser
+    async with open_browser_session(warm_browser, browser_cache_dir, shared=browser) as browser:
         for _, row in set_df.iterrows():
             set_extension = row['set']
-            expected_rows = row['cards']
+            expected_rows = trusted_count(row)
             url = f"https://www.tcgplayer.com/categories/trading-and-collectible-card-games/pokemon/price-guides/{set_extension}"
-            print(f"Scraping {url} with expected rows: {expected_rows}")
+            print(f"Scraping {url} with expected rows: {'unconfirmed' if expected_rows is None else expected_rows}")
 
             # Scrape data from the URL
-            df = await scrape_table_data(url, browser, expected_rows)
-            if not df.empty:
-                all_data.append(df)
-
-        await browser.close()
+            await scrape_table_data(url, browser, expected_rows, buffer, movers, scrape_date)
 
-    # Step 4: Combine and upload scraped data
-    if all_data:
-        combined_data = pd.concat(all_data, ignore_index=True)
-        print(f"Total rows scraped across all tables: {len(combined_data)}")
-        upload_to_bigquery(combined_data)
+    # Step 4: Key, combine and upload scraped data
+    table = add_card_keys(buffer.to_arrow())
+    if sharded:
+        write_shard(table, shard_dir, TABLE_NAME, scrape_date, shard_index, num_shards)
+    elif len(buffer):
+        print(f"Total rows scraped across all tables: {len(buffer)}")
+        await loop.run_in_executor(None, upload_to_bigquery, table)
+        await loop.run_in_executor(None, update_card_dimension, table, TABLE_NAME)
+        if movers is not None:
+            movers.save(movers_index)
+    return len(buffer)
 
 # Function: Upload data to BigQuery
-def upload_to_bigquery(df):
+def upload_to_bigquery(table):
     """
-    Uploads the given DataFrame to the BigQuery table.
+    Uploads the given Arrow table to the BigQuery table.
 
     Args:
-        df (pd.DataFrame): DataFrame containing the scraped data to upload.
+        table (pa.Table): Table of scraped data matching upload_schema().
     """
+    from row_buffer import upload_arrow_table
 
-    columns_to_upload = ["Product Name","Printing", "Condition", "Rarity", "Number", "Market Price", "source", "scrape_date"]
-    df = df[columns_to_upload].copy()  # Select only the columns we want to upload
-
-    df['Market Price'] = df['Market Price'].astype(str)
-    df['scrape_date'] = pd.to_datetime(df['scrape_date'], errors='coerce')
-    df.dropna(subset=['scrape_date'], inplace=True)
-    
-    # Convert columns to appropriate data types for BigQuery
-    df = df.astype({
-        'Product Name': 'string',
-        'Printing': 'string',
-        'Condition': 'string',
-        'Rarity': 'string',
-        'Number': 'string',
-        'Market Price': 'string',
-        'source': 'string',
-        'scrape_date': 'datetime64[ns]'
-    })
-
-    client = bigquery.Client()
-    job_config = bigquery.LoadJobConfig(write_disposition=bigquery.WriteDisposition.WRITE_APPEND)
-    
     print("Uploading to BigQuery...")
-    client.load_table_from_dataframe(df, TABLE_ID, job_config=job_config).result()
-    print(f"Uploaded {len(df)} rows to {TABLE_ID}.")
+    upload_arrow_table(table, TABLE_ID)
+    print(f"Uploaded {table.num_rows} rows to {TABLE_ID}.")
 
 # Entry point: Run the asynchronous main function
 if __name__ == "__main__":
-    asyncio.run(scrape_and_store_data())
+    parser = argparse.ArgumentParser(description="Scrape TCGPlayer card prices.")
+    parser.add_argument("--movers-index", default=os.getenv("MOVERS_INDEX", MOVERS_INDEX_FILE),
+                        help="Top movers index file to update; empty to disable.")
+    args = add_browser_arguments(add_shard_arguments(parser)).parse_args()
+    asyncio.run(scrape_and_store_data(args.shard_index, args.num_shards, args.shard_dir,
+                                      args.warm_browser, args.browser_cache_dir, scrape_date=args.scrape_date, movers_index=args.movers_index))
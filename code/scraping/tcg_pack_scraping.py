@@ -11,18 +11,35 @@ Description:
     
 Main Functions:
     - delete_today_data: Deletes today's entries in BigQuery to avoid duplicates.
-    - scrape_sealed_products_table: Navigates to the sealed products table, verifies structure,
-      and extracts 'Product Name' and 'Market Price' data from rows containing 'Booster Pack'.
+    - scrape_sealed_products_table: Opens the sealed products view and extracts 'Product Name' and
+      'Market Price' for rows containing 'Booster Pack'.
+    - extract_booster_packs: Filters the sealed products table inside the page and returns only matching rows.
+    - wait_for_booster_packs: Waits for matching rows to render, then extracts them.
     - scrape_and_store_data: Orchestrates deletion, scraping, and data upload.
     - upload_to_bigquery: Loads the extracted data into BigQuery.
 
+Card Keys:
+    Every row gets a card_key (card_keys.py) before it is written or uploaded, and the keys of an
+    uploaded day are merged into the pokemon_cards dimension table.
+
+Browser:
+    Pass --warm-browser (or set WARM_BROWSER=1) to reuse one persistent browser context with an
+    HTTP disk cache under --browser-cache-dir for every set; see browser_session.py.
+
+Sharding:
+    Pass --shard-index i --num-shards N to scrape only the sets hashed to shard i. Sharded runs
+    skip the BigQuery delete/upload and write their rows under --shard-dir instead; run
+    merge_shards.py --table pokemon_packs --num-shards N once all shards finish.
+
 Environment Variables:
     - BIGQUERY_PROJECT_ID: Google Cloud Project ID used to access BigQuery.
     
 Dependencies:
-    - pandas
+    - pandas (imported by scrape_and_store_data)
+    - pyarrow, numpy (imported with row_buffer.py and card_keys.py by the functions that build or
+      upload rows, so --help stays fast)
     - asyncio
-    - playwright.async_api
+    - playwright.async_api (via browser_session.py)
     - google.cloud.bigquery
     
 Usage:
@@ -30,24 +47,89 @@ Usage:
 """
 # Modules
 import os
-import pandas as pd
+import argparse
 import asyncio
 from datetime import datetime
-from playwright.async_api import async_playwright
-from google.cloud import bigquery
+from clients import get_bigquery_client
+from sharding import add_shard_arguments, select_shard, write_shard, run_scrape_date
+from browser_session import open_browser_session, add_browser_arguments
 
 # Constants for BigQuery configuration
 PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
 DATASET_ID = "pokemon_data"
-TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.pokemon_packs"
+TABLE_NAME = "pokemon_packs"
+TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_NAME}"
 
 
-def delete_today_data():
+# Function: Upload schema; source is dictionary-encoded in the row buffer
+def upload_schema():
+    """
+    Imports pyarrow only when rows are buffered, so importing the script stays fast.
+
+    Returns:
+        pa.Schema: Columns of the pokemon_packs table as buffered by RowBuffer.
+    """
+    import pyarrow as pa
+
+    return pa.schema([
+        ("Product Name", pa.string()),
+        ("Market Price", pa.string()),
+        ("source", pa.dictionary(pa.int32(), pa.string())),
+        ("scrape_date", pa.timestamp("us")),
+    ])
+
+
+# Product names kept from the sealed products table
+BOOSTER_PACK_PATTERN = r"booster\s*pack"
+
+# Query string meant to open the price guide directly on the sealed products view. It has not been
+# checked against the live site; if the site ignores it, the tab click in
+# scrape_sealed_products_table is what reaches the sealed products
+SEALED_PRODUCTS_QUERY = "?productTypeName=Sealed+Products"
+
+# How long to wait for booster pack rows to render after a page load or tab switch, in ms
+SEALED_VIEW_TIMEOUT = 10000
+
+# Runs inside the page: locates columns by header name and returns [name, price] for matching rows only.
+# Returns null if the table or either column is missing, so the caller can fall back to the tab click.
+EXTRACT_ROWS_JS = """
+(pattern) => {
+    const rows = Array.from(document.querySelectorAll("[class*='table'] tr"));
+    if (rows.length === 0) return null;
+    const headers = Array.from(rows[0].querySelectorAll("th")).map(th => th.innerText.trim());
+    const nameIndex = headers.indexOf("Product Name");
+    const priceIndex = headers.indexOf("Market Price");
+    if (nameIndex < 0 || priceIndex < 0) return null;
+    const matcher = new RegExp(pattern, "i");
+    const matches = [];
+    for (const row of rows.slice(1)) {
+        const cells = row.querySelectorAll("td");
+        if (cells.length <= Math.max(nameIndex, priceIndex)) continue;
+        const name = cells[nameIndex].innerText;
+        if (matcher.test(name)) matches.push([name, cells[priceIndex].innerText]);
+    }
+    return matches;
+}
+"""
+
+# Runs inside the page: true once EXTRACT_ROWS_JS finds at least one matching row
+WAIT_FOR_ROWS_JS = f"""
+(pattern) => {{
+    const matches = ({EXTRACT_ROWS_JS.strip()})(pattern);
+    return matches !== null && matches.length > 0;
+}}
+"""
+
+
+def delete_today_data(scrape_date=None):
     """
     Deletes records with today's date from the BigQuery table to prevent duplicate data entries.
+
+    Args:
+        scrape_date (date): Day to delete; defaults to today.
     """
-    client = bigquery.Client()
-    today_date = datetime.now().date().isoformat()
+    client = get_bigquery_client()
+    today_date = (scrape_date or datetime.now().date()).isoformat()
     delete_query = f"""
         DELETE FROM `{TABLE_ID}`
         WHERE scrape_date = '{today_date}'
@@ -57,56 +139,82 @@ def delete_today_data():
     print(f"Data with today's date ({today_date}) has been deleted from BigQuery.")
 
 
-async def scrape_sealed_products_table(url, browser, retries=3):
+async def extract_booster_packs(page):
+    """
+    Filters the sealed products table inside the page, so only booster pack rows are sent back.
+    
+    Args:
+        page (Page): Playwright page showing a price guide table.
+    
+    Returns:
+        list[list[str]]: [Product Name, Market Price] for each matching row, or None if the
+        table or its 'Product Name' / 'Market Price' columns were not found.
+    """
+    return await page.evaluate(EXTRACT_ROWS_JS, BOOSTER_PACK_PATTERN)
+
+
+async def wait_for_booster_packs(page, timeout=SEALED_VIEW_TIMEOUT):
     """
-    Navigates to the specified URL, attempts to locate and click the 'Sealed Products' tab (excluding 'Singles'),
-    then extracts rows with 'Booster Pack' from the table and fetches 'Product Name' and 'Market Price' columns.
+    Waits for booster pack rows to render, then extracts them. A tab switch is client-side and
+    not a navigation, so the page's load state says nothing about when the sealed table is shown.
+
+    Args:
+        page (Page): Playwright page showing, or about to show, a price guide table.
+        timeout (int): Milliseconds to wait for a matching row.
+
+    Returns:
+        list[list[str]]: [Product Name, Market Price] for each matching row, or None if none
+        rendered within `timeout`.
+    """
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    try:
+        await page.wait_for_function(WAIT_FOR_ROWS_JS, arg=BOOSTER_PACK_PATTERN, timeout=timeout)
+    except PlaywrightTimeoutError:
+        return None
+    return await extract_booster_packs(page)
+
+
+async def scrape_sealed_products_table(url, browser, buffer, retries=3, scrape_date=None):
+    """
+    Opens the price guide directly on the sealed products view and extracts 'Product Name' and
+    'Market Price' for rows matching 'Booster Pack', filtering inside the page. If the direct view
+    yields no booster packs, falls back to clicking the non-'Singles' tab and extracting again.
     
     Args:
         url (str): URL to scrape data from.
-        browser (Browser): Playwright browser instance.
+        browser (BrowserSession): Browser session pages are opened from.
+        buffer (RowBuffer): Buffer the matching rows are appended to.
         retries (int): Number of retry attempts if page loading fails.
+        scrape_date (date): Day the rows are stamped with; defaults to today.
     
     Returns:
-        pd.DataFrame: DataFrame containing scraped product names and market prices, or empty if no data.
+        int: Number of rows appended to `buffer`, or 0 if no data.
     """
+    from row_buffer import scrape_timestamp
+
     for attempt in range(retries):
         page = await browser.new_page()
         try:
-            await page.goto(url, timeout=180000)
+            await page.goto(url + SEALED_PRODUCTS_QUERY, timeout=180000)
             await page.wait_for_load_state("networkidle")
-            
-            # Select the non-Singles tab
-            tabs = await page.query_selector_all(".martech-text-capitalize")
-            for tab in tabs:
-                if "Singles" not in await tab.inner_text():
-                    await tab.click()
-                    await page.wait_for_timeout(3000)
-                    break
-
-            # Locate and extract rows from the table
-            rows = page.locator("xpath=//*[contains(@class, 'table')]//tr")
-            row_count = await rows.count()
-            print(f"Found {row_count} rows in the table for {url}")
-
-            table_data = []
-            for i in range(1, row_count):  # Skipping header row
-                cells = await rows.nth(i).locator("td").all()
-                if len(cells) >= 3:  # Ensuring 'Product Name' and 'Market Price' columns are present
-                    product_name = await cells[1].inner_text()
-                    market_price = await cells[2].inner_text()
-                    table_data.append([product_name, market_price])
-
-            # Filter and create DataFrame
-            df = pd.DataFrame(table_data, columns=["Product Name", "Market Price"])
-            df = df[df["Product Name"].str.contains(r"(?i)booster\s*pack", regex=True, na=False)]
-            df["source"] = url.split('/')[-1]
-            df["scrape_date"] = datetime.now().date()
-
-            if not df.empty:
-                print(f"Filtered data successfully for {url} - {len(df)} rows")
+            table_data = await wait_for_booster_packs(page)
+
+            # Fall back to the non-Singles tab if the direct view did not land on sealed products
+            if not table_data:
+                tabs = await page.query_selector_all(".martech-text-capitalize")
+                for tab in tabs:
+                    if "Singles" not in await tab.inner_text():
+                        await tab.click()
+                        table_data = await wait_for_booster_packs(page)
+                        break
+
+            if table_data:
+                buffer.extend(["Product Name", "Market Price"], table_data,
+                              source=url.split('/')[-1], scrape_date=scrape_timestamp(scrape_date))
+                print(f"Filtered data successfully for {url} - {len(table_data)} rows")
                 await page.close()
-                return df
+                return len(table_data)
             else:
                 print(f"No 'Booster Pack' entries found for {url}. Retrying...")
 
@@ -117,61 +225,76 @@ async def scrape_sealed_products_table(url, browser, retries=3):
             await asyncio.sleep(5)
 
     print(f"Failed to scrape complete data from Sealed Products tab for {url} after {retries} attempts.")
-    return pd.DataFrame()
+    return 0
 
 
-async def scrape_and_store_data():
+async def scrape_and_store_data(shard_index=0, num_shards=1, shard_dir="shards", warm_browser=False,
+                                browser_cache_dir=".browser_cache", browser=None, scrape_date=None):
     """
     Main function to manage the workflow of deleting today's data, scraping, and uploading the scraped data.
+
+    When `num_shards` > 1 only the sets hashed to `shard_index` are scraped, and the rows are
+    written under `shard_dir` for merge_shards.py to publish instead of being uploaded.
+
+    Args:
+        shard_index (int): Index of the shard to scrape.
+        num_shards (int): Total number of shards.
+        shard_dir (str): Root directory for shard outputs.
+        warm_browser (bool): Reuse one persistent, disk-cached browser context for every set.
+        browser_cache_dir (str): Directory for the warm browser profile and HTTP cache.
+        browser (BrowserSession): Already started session to scrape with instead of launching one.
+        scrape_date (date): Day the rows are stamped with; defaults to SCRAPE_DATE or the day the
+            run starts, and is not re-read as the run goes on.
+
+    Returns:
+        int: Rows scraped; 0 means nothing was scraped or uploaded.
     """
-    delete_today_data()
+    import pandas as pd
+    from row_buffer import RowBuffer
+    from card_keys import add_card_keys, update_card_dimension
+
+    sharded = num_shards > 1
+    scrape_date = run_scrape_date(scrape_date)
+    loop = asyncio.get_running_loop()
+    if not sharded:
+        await loop.run_in_executor(None, delete_today_data, scrape_date)
     
-    sets_df = pd.read_csv("data/pack_set_dictionary.csv")
-    all_data = []
+    sets_df = select_shard(pd.read_csv("data/pack_set_dictionary.csv"), shard_index, num_shards)
+    buffer = RowBuffer(upload_schema())
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-
+    async with open_browser_session(warm_browser, browser_cache_dir, shared=browser) as browser:
         for _, row in sets_df.iterrows():
             set_extension = row['set']
             url = f"https://www.tcgplayer.com/categories/trading-and-collectible-card-games/pokemon/price-guides/{set_extension}"
             print(f"Scraping {url}")
-            df = await scrape_sealed_products_table(url, browser)
-            if not df.empty:
-                all_data.append(df)
+            await scrape_sealed_products_table(url, browser, buffer, scrape_date=scrape_date)
 
-        await browser.close()
+    table = add_card_keys(buffer.to_arrow())
+    if sharded:
+        write_shard(table, shard_dir, TABLE_NAME, scrape_date, shard_index, num_shards)
+    elif len(buffer):
+        print(f"Total rows scraped across all tables: {len(buffer)}")
+        await loop.run_in_executor(None, upload_to_bigquery, table)
+        await loop.run_in_executor(None, update_card_dimension, table, TABLE_NAME)
+    return len(buffer)
 
-    if all_data:
-        combined_data = pd.concat(all_data, ignore_index=True)
-        print(f"Total rows scraped across all tables: {len(combined_data)}")
-        upload_to_bigquery(combined_data)
 
-
-def upload_to_bigquery(df):
+def upload_to_bigquery(table):
     """
-    Uploads the provided DataFrame to the specified BigQuery table.
+    Uploads the provided Arrow table to the specified BigQuery table.
     
     Args:
-        df (pd.DataFrame): DataFrame containing the scraped data.
+        table (pa.Table): Table of scraped data matching upload_schema().
     """
-    df['Market Price'] = df['Market Price'].astype(str)
-    df['scrape_date'] = pd.to_datetime(df['scrape_date'], errors='coerce')
-    df.dropna(subset=['scrape_date'], inplace=True)
-    
-    df = df.astype({
-        'Product Name': 'string',
-        'Market Price': 'string',
-        'source': 'string',
-        'scrape_date': 'datetime64[ns]'
-    })
-
-    client = bigquery.Client()
-    job_config = bigquery.LoadJobConfig(write_disposition=bigquery.WriteDisposition.WRITE_APPEND)
+    from row_buffer import upload_arrow_table
+
     print("Uploading to BigQuery...")
-    client.load_table_from_dataframe(df, TABLE_ID, job_config=job_config).result()
-    print(f"Uploaded {len(df)} rows to {TABLE_ID}.")
+    upload_arrow_table(table, TABLE_ID)
+    print(f"Uploaded {table.num_rows} rows to {TABLE_ID}.")
 
 
 if __name__ == "__main__":
-    asyncio.run(scrape_and_store_data())
+    parser = argparse.ArgumentParser(description="Scrape TCGPlayer booster pack prices.")
+    args = add_browser_arguments(add_shard_arguments(parser)).parse_args()
+    asyncio.run(scrape_and_store_data(args.shard_index, args.num_shards, args.shard_dir,
+                                      args.warm_browser, args.browser_cache_dir, scrape_date=args.scrape_date))
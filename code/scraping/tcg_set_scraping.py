@@ -1,71 +1,315 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+"""
+Script Name: tcg_set_scraping.py
+Description:
+    This script discovers the Pokémon sets listed on the TCGPlayer price guide and keeps the set
+    files in "data" up to date, using the same async Playwright browser session as the price
+    scrapers.
+
+    The set dropdown on the price guide page is read and each entry converted to its URL
+    extension, which is written to "data/sets.csv" (unless far fewer sets were found than last
+    time, which usually means the dropdown did not finish loading). The discovered list is diffed
+    against the existing files:
+        - Sets missing from "data/card_set_dictionary.csv" are opened once to validate them: a set
+          whose price guide shows a table is added with its observed row count, one without is
+          reported and skipped.
+        - Sets in the dictionary that are no longer listed are reported but kept, so a partial
+          dropdown never drops a set from the daily scrape.
+        - When BIGQUERY_PROJECT_ID is set, the `cards` column of every known set is compared
+          with the row count observed in the latest pokemon_prices day (see reconcile_count).
+
+    The `counted` column holds the day a set's `cards` count was last confirmed by a full page
+    count or a scraped day; counts without it (such as the hand-maintained ones) are not trusted.
+    The card and image scrapers treat a trusted `cards` count as the number of rows they should
+    see, and retry a set whose table comes back noticeably shorter. Sets without one are scraped
+    on the first attempt that finds a table.
+
+Components:
+    - slugify_set: Converts a dropdown entry to its URL extension.
+    - discover_sets: Reads the set dropdown.
+    - count_set_rows: Counts the rows of one set's price guide table.
+    - latest_row_counts: Reads the rows per set of the latest pokemon_prices day.
+    - trusted_count: Returns a set's row count if it has been confirmed.
+    - row_count_complete: Checks a scraped table's rows against a set's trusted count.
+    - reconcile_count: Updates a set's row count from a scraped day and, if lower, a page count.
+    - update_set_catalog: Main function coordinating discovery, diffing and writing the set files.
+
+Browser:
+    Pass --warm-browser (or set WARM_BROWSER=1) to reuse one persistent browser context with an
+    HTTP disk cache under --browser-cache-dir; see browser_session.py.
+
+Environment Variables:
+    - BIGQUERY_PROJECT_ID: Google Cloud Project ID; enables the row count refresh.
+
+Dependencies:
+    - playwright.async_api (via browser_session.py)
+    - google.cloud.bigquery (only for the row count refresh)
+
+Usage:
+    python code/scraping/tcg_set_scraping.py [--warm-browser]
+"""
+
+# Modules
 import os
-import csv
 import re
+import csv
+import asyncio
+import argparse
+from datetime import date
+from clients import get_bigquery_client
+from browser_session import open_browser_session, add_browser_arguments
 
-# Chrome options for headless mode
-options = Options()
-options.add_argument("--headless")
-options.add_argument("--window-size=1920,1080")
-options.add_argument("--disable-gpu")
-
-# Initialize the WebDriver
-driver = webdriver.Chrome(options=options)
-wait = WebDriverWait(driver, 10)
-
-try:
-    # Navigate to the page
-    driver.get("https://www.tcgplayer.com/categories/trading-and-collectible-card-games/pokemon/price-guides")
-    
-    # Locate all dropdown containers
-    dropdowns = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "tcg-input-autocomplete__combobox-container")))
-    
-    # Select the second dropdown by index
-    second_dropdown = dropdowns[1]  # Index 1 for the second dropdown
-    dropdown_button = second_dropdown.find_element(By.CLASS_NAME, "tcg-input-autocomplete__dropdown-toggle-button")
-    driver.execute_script("arguments[0].scrollIntoView();", dropdown_button)
-    dropdown_button.click()
-    
-    # Wait for dropdown items to load
-    dropdown_items = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "tcg-base-dropdown__item-content")))
-    
-    # Extract and clean the dropdown text
-    sets = []
-    for item in dropdown_items:
-        text = item.text.lower()
-        text = re.sub(r'\band\b', 'and', text)
-        text = re.sub(r'[^\w\s]', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        text = text.replace(' ', '-')
-        sets.append(text)
-    
-        # Remove empty rows right before writing to the CSV
-    sets = [s for s in sets if s]  # Filter out empty rows
-
-    # Read the old file if it exists
-    output_file = "data/sets.csv"
-    if os.path.exists(output_file):
-        with open(output_file, "r", newline="") as f:
-            reader = csv.reader(f)
-            old_sets = list(reader)
-    else:
-        old_sets = []
-    
-
-    # Write only if new data has more rows
-    if len(sets) >= len(old_sets)-2:
-        os.makedirs("data", exist_ok=True)
-        with open(output_file, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["set"])  # Add a header row
-            writer.writerows([[s] for s in sets])
-        print("New sets written to file.")
+PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
+PRICES_TABLE_ID = f"{PROJECT_ID}.pokemon_data.pokemon_prices"
+PRICE_GUIDE_URL = "https://www.tcgplayer.com/categories/trading-and-collectible-card-games/pokemon/price-guides"
+SETS_FILE = "data/sets.csv"
+CARD_SETS_FILE = "data/card_set_dictionary.csv"
+CARD_SETS_FIELDS = ["set", "cards", "counted"]
+
+# Share of a set's trusted row count a scraped table must reach; shorter tables are usually still
+# rendering and are retried by the card and image scrapers
+MIN_ROW_FRACTION = 0.9
+
+
+# Function: Convert a dropdown entry to a URL extension
+def slugify_set(name):
+    """
+    Args:
+        name (str): Dropdown text, e.g. "SV: Scarlet & Violet 151".
+
+    Returns:
+        str: URL extension, e.g. "sv-scarlet-and-violet-151".
+    """
+    text = name.lower().replace("&", " and ")
+    text = re.sub(r"[^\w\s-]", "", text)
+    return re.sub(r"[\s-]+", "-", text).strip("-")
+
+
+# Function: Read the set dropdown
+async def discover_sets(browser, retries=3):
+    """
+    Opens the price guide and reads every entry of its set dropdown.
+
+    Args:
+        browser (BrowserSession): Browser session pages are opened from.
+        retries (int): Attempts before giving up.
+
+    Returns:
+        list[str]: Set URL extensions in dropdown order, or an empty list if the dropdown never loaded.
+    """
+    for attempt in range(retries):
+        page = await browser.new_page()
+        try:
+            await page.goto(PRICE_GUIDE_URL, timeout=180000)
+
+            # The set dropdown is the second autocomplete on the page
+            dropdown = page.locator(".tcg-input-autocomplete__combobox-container").nth(1)
+            toggle = dropdown.locator(".tcg-input-autocomplete__dropdown-toggle-button")
+            await toggle.scroll_into_view_if_needed()
+            await toggle.click()
+
+            items = page.locator(".tcg-base-dropdown__item-content")
+            await items.first.wait_for(timeout=10000)
+            sets = [slugify_set(text) for text in await items.all_inner_texts()]
+            return [s for s in dict.fromkeys(sets) if s]
+
+        except Exception as e:
+            print(f"Error reading the set dropdown, attempt {attempt + 1}: {e}")
+
+        finally:
+            await page.close()
+
+    return []
+
+
+# Function: Count the rows of one set's price guide
+async def count_set_rows(browser, set_extension):
+    """
+    Args:
+        browser (BrowserSession): Browser session pages are opened from.
+        set_extension (str): Set URL extension.
+
+    Returns:
+        int: Data rows in the set's price guide table, or 0 if the page has no table.
+    """
+    page = await browser.new_page()
+    try:
+        await page.goto(f"{PRICE_GUIDE_URL}/{set_extension}", timeout=180000)
+        await page.wait_for_load_state("networkidle")
+        return max(await page.locator("table tr").count() - 1, 0)
+    except Exception as e:
+        print(f"Error counting rows for {set_extension}: {e}")
+        return 0
+    finally:
+        await page.close()
+
+
+# Function: Observed rows per set from BigQuery
+def latest_row_counts():
+    """
+    Returns:
+        dict[str, int]: Rows per set in the latest pokemon_prices day, or an empty dict if
+        BigQuery is not configured or the query fails.
+    """
+    if not PROJECT_ID:
+        print("BIGQUERY_PROJECT_ID is not set; keeping the existing row counts.")
+        return {}
+    query = f"""
+        SELECT source, COUNT(*) AS observed
+        FROM `{PRICES_TABLE_ID}`
+        WHERE scrape_date = (SELECT MAX(scrape_date) FROM `{PRICES_TABLE_ID}`)
+        GROUP BY source
+    """
+    try:
+        return {row["source"]: row["observed"] for row in get_bigquery_client().query(query).result()}
+    except Exception as e:
+        print(f"Could not read row counts from BigQuery; keeping the existing row counts: {e}")
+        return {}
+
+
+# Function: Confirmed row count of a set
+def trusted_count(row):
+    """
+    Args:
+        row (Mapping): card_set_dictionary.csv row, as a dict or a pandas row.
+
+    Returns:
+        int: The set's `cards` count, or None if it has no `counted` day and so was never confirmed.
+    """
+    counted = row.get("counted")
+    if not isinstance(counted, str) or not counted:  # pandas reads an empty cell as NaN
+        return None
+    return int(row["cards"])
+
+
+# Function: Check a scraped table against a set's row count
+def row_count_complete(table_rows, expected_rows):
+    """
+    Args:
+        table_rows (int): Data rows found in the set's table.
+        expected_rows (int): The set's trusted_count, or None if it has none.
+
+    Returns:
+        bool: True if the table has most of the expected rows, or there is no count to check against.
+    """
+    return expected_rows is None or table_rows >= expected_rows * MIN_ROW_FRACTION
+
+
+# Function: Update a set's row count
+def reconcile_count(row, observed, page_rows=None, today=None):
+    """
+    A scraped day may raise or confirm the stored count, but a lower one may come from a short
+    table the scrapers kept on their last attempt, and taking it would let the count ratchet down
+    a little with each partial scrape. The count is only lowered once a fresh page count of the
+    set (`page_rows`) agrees with the scraped day exactly; a page count at or above the stored one
+    confirms that instead.
+
+    Args:
+        row (dict): card_set_dictionary.csv row; `cards` and `counted` are updated in place.
+        observed (int): Rows of the set in the latest pokemon_prices day.
+        page_rows (int): Rows just counted on the set's price guide, if it was opened.
+        today (str): Day recorded in `counted`; defaults to today.
+
+    Returns:
+        bool: True if the count was updated or confirmed.
+    """
+    stored = int(row.get("cards") or 0)
+    if observed >= stored:
+        count = observed
+    elif page_rows is not None and page_rows >= stored:
+        count = page_rows
+    elif page_rows == observed:
+        count = observed
     else:
-        print("New data has fewer rows. Keeping the existing file.")
+        return False
+    row["cards"], row["counted"] = count, today or date.today().isoformat()
+    return True
+
+
+# Function: Read a set file
+def read_set_file(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+# Function: Write a set file atomically
+def write_set_file(path, fieldnames, rows):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+# Main Function: Discover sets and update the set files
+async def update_set_catalog(warm_browser=False, browser_cache_dir=".browser_cache", browser=None):
+    """
+    Discovers the listed sets, writes data/sets.csv, validates and adds new sets to
+    data/card_set_dictionary.csv and reconciles its row counts with the latest scraped day.
+
+    Args:
+        warm_browser (bool): Use a persistent, disk-cached browser context.
+        browser_cache_dir (str): Directory for the warm browser profile and HTTP cache.
+        browser (BrowserSession): Already started session to use instead of launching one.
+
+    Returns:
+        dict[str, list[str]]: "added" and "removed" sets relative to data/card_set_dictionary.csv.
+    """
+    async with open_browser_session(warm_browser, browser_cache_dir, shared=browser) as browser:
+        sets = await discover_sets(browser)
+        old_sets = [row["set"] for row in read_set_file(SETS_FILE)]
+        if len(sets) < len(old_sets) - 2:
+            print(f"Found {len(sets)} sets, fewer than the {len(old_sets)} listed before. Keeping the existing files.")
+            return {"added": [], "removed": []}
+
+        write_set_file(SETS_FILE, ["set"], [{"set": s} for s in sets])
+        print(f"Wrote {len(sets)} sets to {SETS_FILE} "
+              f"({len(set(sets) - set(old_sets))} new, {len(set(old_sets) - set(sets))} no longer listed).")
+
+        card_sets = read_set_file(CARD_SETS_FILE)
+        known = {row["set"] for row in card_sets}
+        listed = set(sets)
+        removed = [row["set"] for row in card_sets if row["set"] not in listed]
+        for set_extension in removed:
+            print(f"{set_extension} is no longer listed; keeping it in {CARD_SETS_FILE}.")
+
+        today = date.today().isoformat()
+        added = []
+        for set_extension in (s for s in sets if s not in known):
+            observed = await count_set_rows(browser, set_extension)
+            if observed:
+                card_sets.append({"set": set_extension, "cards": observed, "counted": today})
+                added.append(set_extension)
+                print(f"New set {set_extension}: {observed} rows, added to {CARD_SETS_FILE}.")
+            else:
+                print(f"New set {set_extension} has no price table; not added.")
+
+        # Lower counts are checked against the page, so this stays inside the browser session
+        counts = await asyncio.get_running_loop().run_in_executor(None, latest_row_counts)
+        confirmed = 0
+        for row in card_sets:
+            observed = counts.get(row["set"])
+            if observed is None:
+                continue
+            page_rows = None
+            if observed < int(row.get("cards") or 0):
+                page_rows = await count_set_rows(browser, row["set"])
+            if reconcile_count(row, observed, page_rows, today):
+                confirmed += 1
+            else:
+                print(f"{row['set']}: {observed} rows scraped and {page_rows} on the page, below the stored "
+                      f"{row['cards']}; keeping the stored count.")
+
+    write_set_file(CARD_SETS_FILE, CARD_SETS_FIELDS, card_sets)
+    print(f"Wrote {len(card_sets)} sets to {CARD_SETS_FILE} ({confirmed} row counts confirmed).")
+    return {"added": added, "removed": removed}
+
 
-finally:
-    driver.quit()
+# Entry point: Run the asynchronous main function
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discover TCGPlayer sets and update the set files.")
+    args = add_browser_arguments(parser).parse_args()
+    asyncio.run(update_set_catalog(args.warm_browser, args.browser_cache_dir))
@@ -0,0 +1,269 @@
+"""
+Script Name: name_index.py
+Description:
+    Trigram index over card Product Names for ranked fuzzy search, so partial or misspelled names
+    ("charzard", "umbreon vmax alt") still find the card.
+
+    Names are lower-cased, split on anything that isn't a letter or digit, and each word is padded
+    as "  word " before taking its trigrams, so word starts get their own grams ("  c", " ch") and
+    misspellings still share most grams. Each trigram maps to a posting array of entry ids. A query
+    counts shared trigrams per entry with one bincount over the posting arrays it touches and scores
+    entries by trigram similarity (shared / union). Names are also kept sorted, so the entries that
+    start with the query are found by binary search and ranked first, which makes search-as-you-type
+    prefixes ("charizard (al") work. Reprints share a title (the name without its card number), and
+    the best entry of each title is listed before a second entry of any title, so a short prefix
+    such as "raic" returns Raichu, Raichu ex and Raichu V rather than ten Raichu reprints.
+
+    Entries are keyed by (source, Number, Product Name). `update` only tokenizes keys it hasn't
+    seen and merges them into the sorted names, so a new set or a new day's snapshot extends the
+    index instead of rebuilding it. Posting arrays are replaced rather than modified, so `copy`
+    shares them with the original.
+
+Components:
+    - NameIndex: The in-memory index.
+    - normalize: Lower-cases a name and collapses punctuation to single spaces.
+    - title: A normalized name without its card number.
+
+Dependencies:
+    - numpy
+    - pyarrow (only for the CLI)
+
+Usage:
+    python code/serving/name_index.py "charzard 4/102" --limit 5
+"""
+
+# Modules
+import re
+import time
+import argparse
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+SNAPSHOT_FILE = "data/price_snapshot.arrow"
+NON_WORD = re.compile(r"[^0-9a-z]+")
+# Added to the trigram similarity, so names starting with the query outrank close misspellings
+PREFIX_BONUS = 0.5
+# Entries sharing only a gram or two with the query (e.g. just the first letter) are not matches
+MIN_SCORE = 0.15
+
+
+# Function: Normalize a name for indexing and querying
+def normalize(text):
+    """
+    Args:
+        text (str): Product Name or query, e.g. "Charizard - 4/102".
+
+    Returns:
+        str: Lower-cased words separated by single spaces, e.g. "charizard 4 102".
+    """
+    return NON_WORD.sub(" ", str(text).lower()).strip()
+
+
+# Function: Trigrams of a normalized name
+def trigrams(normalized):
+    """
+    Args:
+        normalized (str): Output of normalize.
+
+    Returns:
+        set[str]: Trigrams of every word, padded with two leading spaces and one trailing space.
+    """
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# Function: Title of a normalized name
+def title(normalized, number):
+    """
+    Args:
+        normalized (str): Output of normalize, e.g. "charizard 4 102".
+        number (str): The entry's card number, e.g. "4/102".
+
+    Returns:
+        str: `normalized` without a trailing card number, e.g. "charizard".
+    """
+    suffix = normalize(number) if number else ""
+    if suffix and normalized.endswith(" " + suffix):
+        return normalized[:-len(suffix) - 1]
+    return normalized
+
+
+class NameIndex:
+    """
+    Trigram posting arrays and a sorted name list over (source, Number, Product Name) entries.
+    """
+
+    def __init__(self):
+        self.sources = []
+        self.numbers = []
+        self.names = []
+        self.normalized = []
+        self.entry_by_key = {}
+        self.posting_arrays = {}
+        self.gram_counts = np.zeros(0, dtype=np.int32)
+        self.source_codes = np.zeros(0, dtype=np.int32)
+        self.code_by_source = {}
+        self.title_codes = np.zeros(0, dtype=np.int32)
+        self.code_by_title = {}
+        self.sorted_names = []
+        self.sorted_entries = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def copy(self):
+        """
+        Returns:
+            NameIndex: An index that can be updated without affecting this one, e.g. while this
+            one is still serving queries. Names and arrays, including the posting arrays, are
+            shared; only the containers are copied.
+        """
+        index = NameIndex()
+        index.sources = list(self.sources)
+        index.numbers = list(self.numbers)
+        index.names = list(self.names)
+        index.normalized = list(self.normalized)
+        index.entry_by_key = dict(self.entry_by_key)
+        index.posting_arrays = dict(self.posting_arrays)
+        index.gram_counts = self.gram_counts
+        index.source_codes = self.source_codes
+        index.code_by_source = dict(self.code_by_source)
+        index.title_codes = self.title_codes
+        index.code_by_title = dict(self.code_by_title)
+        index.sorted_names = self.sorted_names
+        index.sorted_entries = self.sorted_entries
+        return index
+
+    def update(self, sources, numbers, names):
+        """
+        Adds entries for keys not already in the index.
+
+        Args:
+            sources (list[str]): Set URL extension per row.
+            numbers (list[str]): Card number per row.
+            names (list[str]): Product Name per row.
+
+        Returns:
+            int: Number of entries added.
+        """
+        start = len(self.names)
+        new_counts, new_codes, new_titles, added = [], [], [], {}
+        for key in zip(sources, numbers, names):
+            if key in self.entry_by_key or key[2] is None:
+                continue
+            entry = len(self.names)
+            self.entry_by_key[key] = entry
+            source, number, name = key
+            self.sources.append(source)
+            self.numbers.append(number)
+            self.names.append(name)
+            normalized = normalize(name)
+            self.normalized.append(normalized)
+
+            grams = trigrams(normalized)
+            for gram in grams:
+                added.setdefault(gram, []).append(entry)
+            new_counts.append(len(grams))
+            new_codes.append(self.code_by_source.setdefault(source, len(self.code_by_source)))
+            new_titles.append(self.code_by_title.setdefault(title(normalized, number), len(self.code_by_title)))
+
+        if new_counts:
+            # New arrays rather than appends, so copies sharing the old arrays are unaffected
+            for gram, entries in added.items():
+                new_entries = np.array(entries, dtype=np.int32)
+                old_entries = self.posting_arrays.get(gram)
+                if old_entries is not None:
+                    new_entries = np.concatenate([old_entries, new_entries])
+                self.posting_arrays[gram] = new_entries
+            self.gram_counts = np.concatenate([self.gram_counts, np.array(new_counts, dtype=np.int32)])
+            self.source_codes = np.concatenate([self.source_codes, np.array(new_codes, dtype=np.int32)])
+            self.title_codes = np.concatenate([self.title_codes, np.array(new_titles, dtype=np.int32)])
+
+            # Merge the new names into the sorted list instead of re-sorting every name
+            new = sorted(range(start, len(self.names)), key=self.normalized.__getitem__)
+            positions = [bisect_right(self.sorted_names, self.normalized[entry]) for entry in new]
+            self.sorted_entries = np.insert(self.sorted_entries, positions, new).astype(np.int32)
+            self.sorted_names = [self.normalized[entry] for entry in self.sorted_entries.tolist()]
+        return len(self.names) - start
+
+    def update_table(self, table):
+        """
+        Adds entries from a table with source, Number and Product Name columns, such as a price
+        snapshot or a scraped pokemon_prices/pokemon_images day.
+
+        Returns:
+            int: Number of entries added.
+        """
+        return self.update(table.column("source").to_pylist(), table.column("Number").to_pylist(),
+                           table.column("Product Name").to_pylist())
+
+    def _prefixed(self, normalized):
+        # Normalized names only contain [0-9a-z ], all of which sort before "~"
+        low = bisect_left(self.sorted_names, normalized)
+        high = bisect_left(self.sorted_names, normalized + "~", low)
+        return self.sorted_entries[low:high]
+
+    def search(self, query, limit=10, source=None):
+        """
+        Ranks entries by trigram similarity to the query, with names that start with the query first.
+        Each title's best entry is listed before any title's second entry.
+
+        Args:
+            query (str): Partial or misspelled name.
+            limit (int): Maximum results.
+            source (str): If given, only search this set.
+
+        Returns:
+            list[dict]: source, Number, Product Name and score per match, best first.
+        """
+        normalized = normalize(query)
+        query_grams = trigrams(normalized)
+        arrays = [self.posting_arrays[gram] for gram in query_grams if gram in self.posting_arrays]
+        if not arrays:
+            return []
+
+        shared = np.bincount(np.concatenate(arrays), minlength=len(self.gram_counts))
+        scores = shared / (len(query_grams) + self.gram_counts - shared)
+        scores[self._prefixed(normalized)] += PREFIX_BONUS
+        if source is not None:
+            code = self.code_by_source.get(source)
+            if code is None:
+                return []
+            scores[self.source_codes != code] = 0
+
+        candidates = np.flatnonzero(scores >= MIN_SCORE)
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        _, first = np.unique(self.title_codes[candidates], return_index=True)
+        leading = np.zeros(len(candidates), dtype=bool)
+        leading[first] = True
+        candidates = np.concatenate([candidates[leading], candidates[~leading]])[:limit]
+        return [{"source": self.sources[entry], "Number": self.numbers[entry],
+                 "Product Name": self.names[entry], "score": round(float(scores[entry]), 4)}
+                for entry in candidates.tolist()]
+
+
+if __name__ == "__main__":
+    import pyarrow as pa
+
+    parser = argparse.ArgumentParser(description="Fuzzy search card names in a price snapshot.")
+    parser.add_argument("query", help="Partial or misspelled name.")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="Snapshot file written by price_service.py --export.")
+    parser.add_argument("--set", dest="source", help="Restrict to one set.")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    with pa.memory_map(args.snapshot) as source:
+        table = pa.ipc.open_file(source).read_all()
+    started = time.perf_counter()
+    index = NameIndex()
+    index.update_table(table)
+    print(f"Indexed {len(index)} names in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    results = index.search(args.query, args.limit, args.source)
+    print(f"{len(results)} results in {(time.perf_counter() - started) * 1000:.2f}ms")
+    for result in results:
+        print(f"{result['score']:.3f}  {result['Product Name']} ({result['source']} {result['Number']})")
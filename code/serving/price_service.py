@@ -0,0 +1,354 @@
+"""
+Script Name: price_service.py
+Description:
+    Small read-only HTTP service answering "what is card X worth today" from a local snapshot,
+    so internal tools don't have to query BigQuery for single lookups.
+
+    `--export` writes the latest day of pokemon_prices, joined on card_key to the latest
+    pokemon_images row for each card, to an Arrow IPC file sorted by set and number. The service
+    memory-maps that file, builds a (set, number) lookup table and a trigram name index
+    (name_index.py) for fuzzy search, and caches encoded JSON responses in an LRU cache. A
+    background thread checks the file's modification time every few seconds and, when a new day
+    has been exported, builds the new snapshot (with a fresh cache) and swaps it in; requests keep
+    using the current snapshot meanwhile. The name index is carried over and only the new cards
+    are tokenized.
+
+Endpoints:
+    - GET  /card?set=<set>&number=<number>   All printings/conditions of one card.
+    - GET  /set?set=<set>                    Every card in a set.
+    - GET  /search?name=<text>[&set=<set>]   Cards whose Product Name best matches <text>, best first; tolerates typos.
+    - POST /batch                            JSON list of {"set", "number"} or {"name"} queries; returns a list of results.
+    - GET  /health                           Snapshot day, row count and cache statistics.
+
+Environment Variables:
+    - BIGQUERY_PROJECT_ID: Google Cloud Project ID, used by --export.
+
+Dependencies:
+    - pyarrow
+    - google.cloud.bigquery (only for --export)
+
+Usage:
+    python code/serving/price_service.py --export
+    python code/serving/price_service.py --port 8080
+"""
+
+# Modules
+import os
+import sys
+import json
+import argparse
+import threading
+import pyarrow as pa
+import pyarrow.compute as pc
+from name_index import NameIndex
+from functools import lru_cache
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SNAPSHOT_FILE = "data/price_snapshot.arrow"
+PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
+DATASET_ID = "pokemon_data"
+LABEL_COLUMNS = ["source", "Printing", "Condition", "Rarity"]
+
+
+# Function: Export the latest day from BigQuery to a snapshot file
+def export_snapshot(path=SNAPSHOT_FILE):
+    """
+    Writes the latest pokemon_prices day, joined to the latest pokemon_images day, to an Arrow IPC
+    file. The file is written under a temporary name and renamed into place, so a running service
+    never reads a partial snapshot.
+
+    Args:
+        path (str): Destination file.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraping"))
+    from clients import get_bigquery_client
+
+    prices_id = f"{PROJECT_ID}.{DATASET_ID}.pokemon_prices"
+    images_id = f"{PROJECT_ID}.{DATASET_ID}.pokemon_images"
+    query = f"""
+        WITH prices AS (
+            SELECT * FROM `{prices_id}`
+            WHERE scrape_date = (SELECT MAX(scrape_date) FROM `{prices_id}`)
+        ),
+        images AS (
+            SELECT card_key, Image, gcs_uri
+            FROM `{images_id}`
+            WHERE scrape_date = (SELECT MAX(scrape_date) FROM `{images_id}`)
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY card_key) = 1
+        )
+        SELECT p.card_key, p.source, p.Number, p.`Product Name`, p.Printing, p.Condition, p.Rarity,
+               p.`Market Price`, i.Image, i.gcs_uri, p.scrape_date
+        FROM prices p
+        LEFT JOIN images i USING (card_key)
+        ORDER BY source, Number
+    """
+    table = get_bigquery_client().query(query).result().to_arrow()
+    for column in LABEL_COLUMNS:
+        index = table.schema.get_field_index(column)
+        table = table.set_column(index, column, pc.dictionary_encode(table.column(column)))
+
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    print(f"Exported {table.num_rows} rows to {path}")
+
+
+# Function: Check one /batch query
+def is_valid_query(query):
+    """
+    Returns:
+        bool: Whether `query` is an object whose "set", "number" and "name" fields, where present,
+        are strings.
+    """
+    return isinstance(query, dict) and all(isinstance(query.get(field, ""), str) for field in ("set", "number", "name"))
+
+
+class Snapshot:
+    """
+    One memory-mapped snapshot file with its lookup tables and response cache.
+
+    Args:
+        path (str): Snapshot file written by export_snapshot.
+        cache_size (int): Maximum number of cached responses.
+        name_index (NameIndex): Index of the previous snapshot to extend instead of building one.
+    """
+
+    def __init__(self, path, cache_size=4096, name_index=None):
+        self.mtime = os.stat(path).st_mtime
+        with pa.memory_map(path) as source:
+            self.table = pa.ipc.open_file(source).read_all()
+        self.rows_by_card = {}
+        self.rows_by_set = {}
+        sources = self.table.column("source").to_pylist()
+        numbers = self.table.column("Number").to_pylist()
+        for row, (source, number) in enumerate(zip(sources, numbers)):
+            self.rows_by_card.setdefault((source, number), []).append(row)
+            self.rows_by_set.setdefault(source, []).append(row)
+        self.product_names = self.table.column("Product Name").to_pylist()
+        self.name_index = name_index.copy() if name_index is not None else NameIndex()
+        self.name_index.update(sources, numbers, self.product_names)
+        self.respond = lru_cache(maxsize=cache_size)(self._respond)
+
+    @property
+    def scrape_date(self):
+        if not self.table.num_rows:
+            return None
+        return str(self.table.column("scrape_date")[0].as_py())
+
+    def _rows(self, indices):
+        return self.table.take(pa.array(indices, pa.int64())).drop(["scrape_date"]).to_pylist()
+
+    def _indices(self, kind, set_name=None, number=None, name=None, limit=20):
+        if kind == "card":
+            return self.rows_by_card.get((set_name, number), [])
+        if kind == "set":
+            return self.rows_by_set.get(set_name, [])
+        if kind == "search":
+            rows = []
+            for hit in self.name_index.search(name or "", limit, source=set_name or None):
+                rows.extend(row for row in self.rows_by_card.get((hit["source"], hit["Number"]), [])
+                            if self.product_names[row] == hit["Product Name"])
+            return rows
+        raise ValueError(f"Unknown query kind: {kind}")
+
+    def query(self, kind, set_name=None, number=None, name=None, limit=20):
+        """
+        Answers one lookup.
+
+        Args:
+            kind (str): "card", "set" or "search".
+            set_name (str): Set URL extension.
+            number (str): Card number, e.g. "4/102".
+            name (str): Partial or misspelled Product Name.
+            limit (int): Maximum cards returned by "search".
+
+        Returns:
+            list[dict]: Matching rows.
+        """
+        return self._rows(self._indices(kind, set_name, number, name, limit))
+
+    def query_batch(self, queries):
+        """
+        Answers several lookups with a single gather from the snapshot.
+
+        Args:
+            queries (list[tuple]): (kind, set_name, number, name) per lookup.
+
+        Returns:
+            list[list[dict]]: Matching rows per lookup, in order.
+        """
+        groups = [self._indices(*query) for query in queries]
+        rows = self._rows([index for group in groups for index in group])
+        results, start = [], 0
+        for group in groups:
+            results.append(rows[start:start + len(group)])
+            start += len(group)
+        return results
+
+    def _respond(self, kind, set_name=None, number=None, name=None):
+        return json.dumps({"scrape_date": self.scrape_date,
+                           "rows": self.query(kind, set_name, number, name)}, default=str).encode("utf-8")
+
+
+class PriceService:
+    """
+    Holds the current snapshot and, from a background thread, swaps in a new one when the file
+    changes on disk. Call `close` to stop the thread.
+
+    Args:
+        path (str): Snapshot file.
+        cache_size (int): Maximum number of cached responses per snapshot.
+        reload_interval (float): Seconds between modification time checks.
+    """
+
+    def __init__(self, path=SNAPSHOT_FILE, cache_size=4096, reload_interval=5.0):
+        self.path = path
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.snapshot = Snapshot(path, cache_size)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, name="snapshot-reload", daemon=True)
+        self._watcher.start()
+
+    def current(self):
+        """
+        Returns:
+            Snapshot: The latest loaded snapshot; never waits for a reload.
+        """
+        return self.snapshot
+
+    def reload(self):
+        """
+        Loads the snapshot file and swaps it in if it changed since the current snapshot was loaded.
+
+        Returns:
+            bool: Whether a new snapshot was swapped in.
+        """
+        with self._lock:
+            try:
+                if os.stat(self.path).st_mtime == self.snapshot.mtime:
+                    return False
+                snapshot = Snapshot(self.path, self.cache_size, self.snapshot.name_index)
+            except (OSError, pa.ArrowException) as e:
+                print(f"Keeping the current snapshot, reload failed: {e}")
+                return False
+            self.snapshot = snapshot
+        print(f"Reloaded snapshot for {snapshot.scrape_date} ({snapshot.table.num_rows} rows)")
+        return True
+
+    def _watch(self):
+        while not self._stopped.wait(self.reload_interval):
+            self.reload()
+
+    def close(self):
+        """
+        Stops the reload thread.
+        """
+        self._stopped.set()
+        self._watcher.join()
+
+
+class PriceRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes HTTP requests to the PriceService attached to the server.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY keep-alive clients stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        snapshot = self.server.service.current()
+
+        if url.path == "/health":
+            info = snapshot.respond.cache_info()
+            body = {"scrape_date": snapshot.scrape_date, "rows": snapshot.table.num_rows,
+                    "cache_hits": info.hits, "cache_misses": info.misses, "cache_size": info.currsize}
+            self._send(200, json.dumps(body).encode("utf-8"))
+        elif url.path == "/card" and "set" in params and "number" in params:
+            self._send(200, snapshot.respond("card", params["set"], params["number"]))
+        elif url.path == "/set" and "set" in params:
+            self._send(200, snapshot.respond("set", params["set"]))
+        elif url.path == "/search" and params.get("name"):
+            self._send(200, snapshot.respond("search", params.get("set"), None, params["name"]))
+        else:
+            self._error(404, "Use /card?set=&number=, /set?set=, /search?name= or /health")
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/batch":
+            self._error(404, "Only /batch accepts POST")
+            return
+        try:
+            queries = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            queries = None
+        if not isinstance(queries, list) or not all(map(is_valid_query, queries)):
+            self.send_error(400, "Body must be a JSON list of {set, number} or {name} objects with string values")
+            return
+
+        snapshot = self.server.service.current()
+        lookups = []
+        for query in queries:
+            if "number" in query:
+                lookups.append(("card", query.get("set"), query["number"], None))
+            elif "name" in query:
+                lookups.append(("search", query.get("set"), None, query["name"]))
+            else:
+                lookups.append(("set", query.get("set"), None, None))
+        results = snapshot.query_batch(lookups)
+        self._send(200, json.dumps({"scrape_date": snapshot.scrape_date, "results": results},
+                                   default=str).encode("utf-8"))
+
+    def log_message(self, format, *args):
+        # Per-request logging dominates latency under load
+        pass
+
+
+# Function: Start the service
+def serve(path=SNAPSHOT_FILE, host="127.0.0.1", port=8080, cache_size=4096, reload_interval=5.0):
+    """
+    Serves price lookups from the snapshot at `path` until interrupted.
+    """
+    server = ThreadingHTTPServer((host, port), PriceRequestHandler)
+    server.service = PriceService(path, cache_size, reload_interval)
+    print(f"Serving {server.service.snapshot.table.num_rows} rows for {server.service.snapshot.scrape_date} "
+          f"on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve card prices from a local snapshot.")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="Snapshot file.")
+    parser.add_argument("--export", action="store_true", help="Export the latest day from BigQuery and exit.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--cache-size", type=int, default=4096, help="Cached responses per snapshot.")
+    parser.add_argument("--reload-interval", type=float, default=5.0, help="Seconds between snapshot checks.")
+    args = parser.parse_args()
+
+    if args.export:
+        export_snapshot(args.snapshot)
+    else:
+        serve(args.snapshot, args.host, args.port, args.cache_size, args.reload_interval)
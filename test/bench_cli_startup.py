@@ -0,0 +1,86 @@
+"""
+Script Name: bench_cli_startup.py
+Description:
+    Startup time benchmark for code/cli.py and the scripts it runs.
+
+    Each case is started as a fresh Python process `--runs` times and the median and max wall
+    time are printed, next to a bare interpreter start and the cost of importing the heavy
+    libraries the scripts used to load at import time (pandas, pyarrow, google.cloud.bigquery,
+    playwright). For the module imports, the heavy libraries each import pulled in are listed too,
+    so a script that starts loading google.cloud or Playwright at import time again shows up here.
+
+Usage:
+    python test/bench_cli_startup.py [--runs 10]
+"""
+
+# Modules
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+CLI = os.path.join("code", "cli.py")
+HEAVY_MODULES = ["pandas", "pyarrow", "numpy", "google.cloud.bigquery", "google.cloud.storage", "playwright"]
+
+sys.path.insert(0, "code")
+from cli import COMMANDS  # noqa: E402  (cli imports only the standard library)
+
+CASES = [
+    ("python (bare interpreter)", [sys.executable, "-c", "pass"]),
+    ("heavy imports (old import-time cost)", [sys.executable, "-c",
+     "import importlib, importlib.util\n"
+     "for name in ('pandas', 'pyarrow', 'google.cloud.bigquery', 'playwright.async_api'):\n"
+     "    if importlib.util.find_spec(name.split('.')[0]): importlib.import_module(name)"]),
+    ("cli.py --help", [sys.executable, CLI, "--help"]),
+    ("cli.py --dry-run cards", [sys.executable, CLI, "--dry-run", "cards", "--num-shards", "4"]),
+    ("cli.py cards --dry-run", [sys.executable, CLI, "cards", "--dry-run", "--num-shards", "4"]),
+] + [(f"cli.py {command.name} --help", [sys.executable, CLI, command.name, "--help"]) for command in COMMANDS]
+MODULES = [
+    ("scraping", "tcg_card_scraping"),
+    ("scraping", "tcg_card_image_upload"),
+    ("scraping", "tcg_set_scraping"),
+    ("scraping", "merge_shards"),
+    ("analytics", "best_value_set"),
+    ("analytics", "set_screener"),
+    ("serving", "price_service"),
+]
+
+
+# Function: Median and max wall time of a command
+def time_command(command, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), max(timings)
+
+
+# Function: Command importing one module and printing the heavy libraries it loaded
+def import_command(folder, module):
+    return [sys.executable, "-c",
+            f"import sys; sys.path.insert(0, {os.path.join('code', folder)!r}); import {module}; "
+            f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CLI and script startup time.")
+    parser.add_argument("--runs", type=int, default=10, help="Process starts per case.")
+    args = parser.parse_args()
+
+    for label, command in CASES:
+        median, worst = time_command(command, args.runs)
+        print(f"{label:<40} median={median * 1000:7.0f}ms  max={worst * 1000:7.0f}ms")
+
+    print()
+    for folder, module in MODULES:
+        command = import_command(folder, module)
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode:
+            print(f"import {module:<34} failed: {result.stderr.strip().splitlines()[-1]}")
+            continue
+        median, worst = time_command(command, args.runs)
+        print(f"import {module:<33} median={median * 1000:7.0f}ms  max={worst * 1000:7.0f}ms  "
+              f"loads: {result.stdout.strip() or '-'}")
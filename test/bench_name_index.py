@@ -0,0 +1,125 @@
+"""
+Script Name: bench_name_index.py
+Description:
+    Latency and recall benchmark for name_index.py against a naive pandas str.contains scan.
+
+    The catalog is the Product Name column of a price snapshot if one exists (see
+    price_service.py --export), otherwise a synthetic catalog the size of
+    "data/card_set_dictionary.csv" built from Pokémon names, suffixes and card numbers. Queries are
+    sampled names turned into what users type: a leading prefix, the name without its number, and
+    the name with one typo. Each query is timed against the trigram index and against
+    `df["Product Name"].str.contains(query, case=False, regex=False)`. Recall counts how often a
+    card with the sampled name (ignoring its number, since reprints share names, and its case,
+    since both searches ignore it) is among the results: the top 10 for the index, any match for
+    the scan.
+
+Usage:
+    python test/bench_name_index.py [--queries 500] [--snapshot data/price_snapshot.arrow]
+"""
+
+# Modules
+import os
+import sys
+import time
+import random
+import argparse
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "code", "serving"))
+from name_index import NameIndex
+
+POKEMON = ["Bulbasaur", "Ivysaur", "Venusaur", "Charmander", "Charmeleon", "Charizard", "Squirtle",
+           "Wartortle", "Blastoise", "Pikachu", "Raichu", "Clefairy", "Jigglypuff", "Gengar", "Gyarados",
+           "Lapras", "Eevee", "Vaporeon", "Jolteon", "Flareon", "Espeon", "Umbreon", "Leafeon", "Glaceon",
+           "Sylveon", "Mewtwo", "Mew", "Lugia", "Ho-Oh", "Rayquaza", "Gardevoir", "Lucario", "Garchomp",
+           "Greninja", "Dragonite", "Snorlax", "Giratina", "Arceus", "Dialga", "Palkia", "Zacian",
+           "Zamazenta", "Mimikyu", "Tyranitar", "Machamp", "Alakazam", "Ninetales", "Arcanine", "Scizor",
+           "Metagross", "Salamence", "Darkrai", "Cresselia", "Iono", "Professor's Research", "Boss's Orders"]
+SUFFIXES = ["", "", "", " ex", " V", " VMAX", " VSTAR", " GX", " EX", " (Full Art)", " (Secret)",
+            " (Alternate Art)", " [Delta Species]"]
+
+
+# Function: Load or generate the catalog
+def load_catalog(snapshot_path, rng):
+    if snapshot_path and os.path.exists(snapshot_path):
+        with pa.memory_map(snapshot_path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        df = table.select(["source", "Number", "Product Name"]).to_pandas()
+        return df.drop_duplicates().reset_index(drop=True), snapshot_path
+
+    set_df = pd.read_csv("data/card_set_dictionary.csv")
+    rows = []
+    for _, row in set_df.iterrows():
+        for i in range(1, int(row["cards"]) + 1):
+            number = f"{i:03d}/{row['cards']}"
+            rows.append((row["set"], number, f"{rng.choice(POKEMON)}{rng.choice(SUFFIXES)} - {number}"))
+    return pd.DataFrame(rows, columns=["source", "Number", "Product Name"]), "synthetic catalog"
+
+
+# Function: One typo (drop, swap or replace a letter)
+def add_typo(text, rng):
+    if len(text) < 4:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    kind = rng.choice(["drop", "swap", "replace"])
+    if kind == "drop":
+        return text[:i] + text[i + 1:]
+    if kind == "swap":
+        return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+    return text[:i] + rng.choice("aeiourstn") + text[i + 1:]
+
+
+# Function: Build (kind, query, target row) triples
+def make_queries(df, count, rng):
+    queries = []
+    for row in rng.sample(range(len(df)), min(count, len(df))):
+        name = df.at[row, "Product Name"]
+        base = name.split(" - ")[0]
+        queries.append(("prefix", base[:max(3, len(base) // 2)], row))
+        queries.append(("no number", base, row))
+        queries.append(("typo", add_typo(base, rng), row))
+    return queries
+
+
+# Function: Time a search function over the queries
+def run(label, queries, search, base_names):
+    timings, found = {}, {}
+    for kind, query, row in queries:
+        started = time.perf_counter()
+        matches = search(query)
+        timings.setdefault(kind, []).append(time.perf_counter() - started)
+        found.setdefault(kind, []).append(any(base_names[match] == base_names[row] for match in matches))
+
+    print(label)
+    for kind in timings:
+        values = sorted(timings[kind])
+        print(f"  {kind:<10} p50={values[len(values) // 2] * 1000:8.3f}ms  "
+              f"p99={values[int(0.99 * (len(values) - 1))] * 1000:8.3f}ms  "
+              f"recall={sum(found[kind]) / len(found[kind]):6.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy name search against a pandas scan.")
+    parser.add_argument("--snapshot", default="data/price_snapshot.arrow", help="Snapshot to take names from.")
+    parser.add_argument("--queries", type=int, default=500, help="Cards to sample queries from.")
+    parser.add_argument("--limit", type=int, default=10, help="Results per index query.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    df, origin = load_catalog(args.snapshot, rng)
+    queries = make_queries(df, args.queries, rng)
+
+    started = time.perf_counter()
+    index = NameIndex()
+    index.update(df["source"].tolist(), df["Number"].tolist(), df["Product Name"].tolist())
+    print(f"{len(df):,} names from {origin}; index built in {time.perf_counter() - started:.2f}s")
+
+    names = df["Product Name"]
+    base_names = [name.split(" - ")[0].lower() for name in names]
+    # Entries are added in catalog order, so entry ids are row numbers
+    run(f"NameIndex.search (top {args.limit})", queries,
+        lambda query: [index.entry_by_key[(hit["source"], hit["Number"], hit["Product Name"])]
+                       for hit in index.search(query, args.limit)], base_names)
+    run("pandas str.contains (all matches)", queries,
+        lambda query: names.index[names.str.contains(query, case=False, regex=False)], base_names)
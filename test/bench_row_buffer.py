@@ -0,0 +1,124 @@
+"""
+Script Name: bench_row_buffer.py
+Description:
+    Memory benchmark for the scrapers' row storage at 10x the current catalog size.
+
+    The catalog size is the sum of the expected card counts in "data/card_set_dictionary.csv".
+    Synthetic price-guide rows (Product Name, Printing, Condition, Rarity, Number, Market Price)
+    are generated for ten times that many cards and stored two ways, each in a fresh subprocess:
+        - list of lists -> pd.DataFrame -> column selection/copy -> astype('string'),
+          as the scrapers did before RowBuffer.
+        - RowBuffer -> pyarrow.Table, as the scrapers do now.
+    Peak resident memory above the post-import baseline and the size of the final upload object
+    are printed for each.
+
+Usage:
+    python test/bench_row_buffer.py [--scale 10]
+"""
+
+# Modules
+import os
+import sys
+import argparse
+import random
+import resource
+import subprocess
+import pandas as pd
+import pyarrow as pa
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "code", "scraping"))
+from row_buffer import RowBuffer, scrape_timestamp
+
+LABEL = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema([
+    ("Product Name", pa.string()),
+    ("Printing", LABEL),
+    ("Condition", LABEL),
+    ("Rarity", LABEL),
+    ("Number", pa.string()),
+    ("Market Price", pa.string()),
+    ("source", LABEL),
+    ("scrape_date", pa.timestamp("us")),
+])
+HEADERS = ["Image", "Product Name", "Printing", "Condition", "Rarity", "Number", "Market Price", "Listed Median"]
+PRINTINGS = ["Normal", "Holofoil", "Reverse Holofoil", "1st Edition", "Unlimited"]
+CONDITIONS = ["Near Mint", "Lightly Played", "Moderately Played", "Heavily Played", "Damaged"]
+RARITIES = ["Common", "Uncommon", "Rare", "Holo Rare", "Double Rare", "Ultra Rare", "Illustration Rare"]
+
+
+# Function: Generate synthetic scraped rows for one set
+def generate_set(cards, rng):
+    """
+    Generates rows shaped like a scraped price-guide table. Labels are copied so every row
+    holds its own string objects, as inner_text() returns.
+    """
+    return [[
+        "",
+        f"Card {i} - {i}/{cards}",
+        (rng.choice(PRINTINGS) + " ")[:-1],
+        (rng.choice(CONDITIONS) + " ")[:-1],
+        (rng.choice(RARITIES) + " ")[:-1],
+        f"{i}/{cards}",
+        f"${rng.uniform(0.05, 500):.2f}",
+        f"${rng.uniform(0.05, 500):.2f}",
+    ] for i in range(1, cards + 1)]
+
+
+# Function: Previous list-of-lists + DataFrame path
+def build_dataframe(sets, rng):
+    frames = []
+    for set_extension, cards in sets:
+        df = pd.DataFrame(generate_set(cards, rng), columns=HEADERS)
+        df["source"] = set_extension
+        df["scrape_date"] = datetime.now().date()
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df = df[[field.name for field in SCHEMA]].copy()
+    df["scrape_date"] = pd.to_datetime(df["scrape_date"], errors="coerce")
+    return df.astype({field.name: "string" for field in SCHEMA if field.name != "scrape_date"})
+
+
+# Function: RowBuffer path
+def build_row_buffer(sets, rng):
+    buffer = RowBuffer(SCHEMA)
+    for set_extension, cards in sets:
+        buffer.extend(HEADERS, generate_set(cards, rng), source=set_extension, scrape_date=scrape_timestamp())
+    return buffer.to_arrow()
+
+
+PATHS = {
+    "dataframe": ("DataFrame + astype(string)", build_dataframe),
+    "row_buffer": ("RowBuffer -> pyarrow.Table", build_row_buffer),
+}
+
+
+# Function: Measure one storage path in the current process
+def measure(path, sets):
+    label, build = PATHS[path]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = build(sets, random.Random(0))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    if isinstance(result, pa.Table):
+        rows, size = result.num_rows, result.nbytes
+    else:
+        rows, size = len(result), result.memory_usage(deep=True).sum()
+    # ru_maxrss is reported in KiB on Linux
+    print(f"{label:<28} rows={rows:>9,}  peak={peak / 2**10:>8.1f} MiB  result={size / 2**20:>8.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare scraped row storage memory use.")
+    parser.add_argument("--scale", type=int, default=10, help="Multiple of the current catalog size.")
+    parser.add_argument("--only", choices=sorted(PATHS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    set_df = pd.read_csv("data/card_set_dictionary.csv")
+    sets = [(f"{row['set']}-{copy}", int(row["cards"])) for copy in range(args.scale) for _, row in set_df.iterrows()]
+
+    if args.only:
+        measure(args.only, sets)
+    else:
+        print(f"Catalog: {set_df['cards'].sum():,} cards in {len(set_df)} sets, benchmarking at {args.scale}x")
+        for path in PATHS:
+            subprocess.run([sys.executable, __file__, "--scale", str(args.scale), "--only", path], check=True)
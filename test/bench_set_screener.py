@@ -0,0 +1,129 @@
+"""
+Script Name: bench_set_screener.py
+Description:
+    Benchmark for code/analytics/set_screener.py on a synthetic price history.
+
+    Generates `--sets` sets with pull rates, `--cards` cards per set across their rarities (each
+    listed in two conditions) and a booster pack per set, for `--days` scrape days. It then times:
+        - screen: The vectorized pass over all days and sets, for each statistic.
+        - per-day loop: The same expected value computed one day at a time with pandas groupby
+          and merge, as best_value_set.py used to do for a single day (mean only).
+        - cached: Reading every day back from the per-day cache.
+    The loop and the vectorized mean are checked to agree.
+
+Usage:
+    python test/bench_set_screener.py [--sets 60] [--cards 250] [--days 365]
+"""
+
+# Modules
+import os
+import sys
+import time
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code", "analytics"))
+import set_screener
+
+RARITIES = [("Double Rare", 0.14), ("Ultra Rare", 0.066), ("Illustration Rare", 0.077),
+            ("Special Illustration Rare", 0.032), ("Hyper Rare", 0.018)]
+CONDITIONS = ["Near Mint", "Lightly Played"]
+
+
+# Function: Build a synthetic history
+def synthetic_history(n_sets, n_cards, n_days, seed=0):
+    """
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: Card prices, pack prices and pull rates.
+    """
+    rng = np.random.default_rng(seed)
+    sets = [f"set-{i:03d}" for i in range(n_sets)]
+    days = np.datetime64("2025-01-01") + np.arange(n_days)
+    pull_rates = pd.DataFrame([(s, rarity, rate) for s in sets for rarity, rate in RARITIES],
+                              columns=["set", "Rarity", "Probability"])
+
+    # Heavy-tailed base prices per card, drifting by a small random walk per day
+    card_set = np.repeat(np.arange(n_sets), n_cards)
+    card_rarity = rng.integers(0, len(RARITIES), n_sets * n_cards)
+    base = rng.lognormal(1.0 + card_rarity * 0.6, 1.0)
+    drift = np.exp(np.cumsum(rng.normal(0, 0.01, (n_days, 1)), axis=0))
+    prices = (base[None, :] * drift).ravel()
+
+    n_rows = n_days * len(base)
+    rows = np.tile(np.arange(len(base)), n_days)
+    cards = pd.DataFrame({
+        "scrape_date": np.repeat(days, len(base)),
+        "source": pd.Categorical.from_codes(card_set[rows], sets),
+        "Rarity": pd.Categorical.from_codes(card_rarity[rows], [rarity for rarity, _ in RARITIES]),
+        "card_key": rows.astype(np.int64),
+        "price": prices,
+    })
+    # A second condition for every card, slightly cheaper
+    cards = pd.concat([cards, cards.assign(price=cards["price"] * 0.8)], ignore_index=True)
+    cards["Condition"] = np.repeat(CONDITIONS, n_rows)
+
+    packs = pd.DataFrame({
+        "scrape_date": np.repeat(days, n_sets),
+        "source": np.tile(sets, n_days),
+        "Product Name": "Booster Pack",
+        "price": rng.uniform(3, 8, n_days * n_sets),
+    })
+    return cards, packs, pull_rates
+
+
+# Function: Expected value computed day by day
+def per_day_loop(cards, pull_rates):
+    frames = []
+    for scrape_date, day in cards.groupby("scrape_date", sort=True):
+        per_card = day.groupby(["source", "Rarity", "card_key"], observed=True)["price"].mean().reset_index()
+        grouped = per_card.groupby(["source", "Rarity"], observed=True)["price"].mean().reset_index()
+        merged = grouped.rename(columns={"source": "set"}).astype({"set": str, "Rarity": str})
+        merged = merged.merge(pull_rates, on=["set", "Rarity"], how="inner")
+        merged["value"] = merged["Probability"] * merged["price"]
+        frames.append(merged.groupby("set")["value"].sum().reset_index().assign(scrape_date=pd.Timestamp(scrape_date).date()))
+    return pd.concat(frames, ignore_index=True)
+
+
+# Function: Best wall time of a callable
+def best_time(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized set screener.")
+    parser.add_argument("--sets", type=int, default=60, help="Synthetic sets.")
+    parser.add_argument("--cards", type=int, default=250, help="Cards per set.")
+    parser.add_argument("--days", type=int, default=365, help="Scrape days.")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per case; the best is reported.")
+    args = parser.parse_args()
+
+    cards, packs, pull_rates = synthetic_history(args.sets, args.cards, args.days)
+    print(f"{len(cards):,} card price rows, {args.sets} sets, {args.days} days")
+
+    for stat in set_screener.STATS:
+        seconds, results = best_time(lambda: set_screener.screen(cards, packs, pull_rates, stat), args.repeats)
+        print(f"screen --stat {stat:<8} {seconds:7.2f}s  ({len(results):,} set-days)")
+    mean_results = set_screener.screen(cards, packs, pull_rates, "mean")
+
+    seconds, looped = best_time(lambda: per_day_loop(cards, pull_rates), 1)
+    print(f"per-day loop (mean)     {seconds:7.2f}s")
+    merged = mean_results.merge(looped, on=["scrape_date", "set"])
+    assert len(merged) == len(mean_results) and np.allclose(merged["ev"], merged["value"]), "results differ"
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for scrape_date, rows in mean_results.groupby("scrape_date"):
+            set_screener.write_cached_day(set_screener.cache_path(cache_dir, scrape_date, "mean"), rows, "bench")
+        days = sorted(mean_results["scrape_date"].unique())
+        paths = [set_screener.cache_path(cache_dir, day, "mean") for day in days]
+        seconds, _ = best_time(lambda: [set_screener.read_cached_day(path, "bench") for path in paths], args.repeats)
+        print(f"cached ({len(days)} days)      {seconds:7.2f}s")
+
+    latest = mean_results[mean_results["scrape_date"] == mean_results["scrape_date"].max()]
+    print(latest.sort_values("ev_ratio", ascending=False).head(5).to_string(index=False, float_format="%.3f"))
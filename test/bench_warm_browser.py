@@ -0,0 +1,64 @@
+"""
+Script Name: bench_warm_browser.py
+Description:
+    Compares cold and warm browser sessions on the first few price guide pages.
+
+    Three passes load the same pages and report browser startup time and bytes transferred per page:
+        - cold: a fresh context per page, as the scrapers did before BrowserSession.
+        - warm (first run): persistent context with an empty disk cache.
+        - warm (cached): persistent context reusing the cache written by the previous pass,
+          as a CI run that restores .browser_cache would.
+
+Usage:
+    python test/bench_warm_browser.py [--sets 5]
+"""
+
+# Modules
+import os
+import sys
+import shutil
+import asyncio
+import argparse
+import tempfile
+import pandas as pd
+from playwright.async_api import async_playwright
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "code", "scraping"))
+from browser_session import BrowserSession
+
+BASE_URL = "https://www.tcgplayer.com/categories/trading-and-collectible-card-games/pokemon/price-guides"
+
+
+# Function: Load each URL once in a session
+async def load_pages(p, urls, warm, cache_dir):
+    session = await BrowserSession(p, warm, cache_dir).start()
+    for url in urls:
+        page = await session.new_page()
+        try:
+            await page.goto(url, timeout=180000)
+            await page.wait_for_load_state("networkidle")
+        finally:
+            await page.close()
+    await session.close()
+
+
+async def main(set_count):
+    sets = pd.read_csv("data/card_set_dictionary.csv")["set"].head(set_count)
+    urls = [f"{BASE_URL}/{set_extension}" for set_extension in sets]
+    cache_dir = tempfile.mkdtemp(prefix="browser_cache_")
+    try:
+        async with async_playwright() as p:
+            print("Cold:")
+            await load_pages(p, urls, False, cache_dir)
+            print("Warm (first run):")
+            await load_pages(p, urls, True, cache_dir)
+            print("Warm (cached):")
+            await load_pages(p, urls, True, cache_dir)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare cold and warm browser sessions.")
+    parser.add_argument("--sets", type=int, default=5, help="Number of price guide pages to load.")
+    asyncio.run(main(parser.parse_args().sets))
@@ -0,0 +1,14 @@
+"""
+Shared pytest setup: puts the code folders on sys.path so tests import modules the same way the
+scripts import their siblings.
+"""
+
+# Modules
+import os
+import sys
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code")
+sys.path[:0] = [os.path.join(CODE_DIR, folder) for folder in ("scraping", "analytics", "serving")] + [CODE_DIR]
+
+# A manual scraping run against the live site, not a unit test
+collect_ignore = ["test_tcg_card_scraping.py"]
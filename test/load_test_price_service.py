@@ -0,0 +1,106 @@
+"""
+Script Name: load_test_price_service.py
+Description:
+    Load test for price_service.py. Picks random (set, number) pairs and name fragments from the
+    snapshot file, then hammers a running service from several keep-alive client threads for a
+    fixed duration and reports throughput and p50/p95/p99/max latency per endpoint.
+
+Usage:
+    python code/serving/price_service.py &
+    python test/load_test_price_service.py --threads 8 --seconds 20
+"""
+
+# Modules
+import time
+import json
+import random
+import argparse
+import threading
+import http.client
+import pyarrow as pa
+from urllib.parse import urlencode
+
+
+# Function: Sample query targets from the snapshot
+def sample_targets(snapshot_path, count, rng):
+    with pa.memory_map(snapshot_path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    rows = rng.sample(range(table.num_rows), min(count, table.num_rows))
+    sources = table.column("source").take(rows).to_pylist()
+    numbers = table.column("Number").take(rows).to_pylist()
+    names = table.column("Product Name").take(rows).to_pylist()
+    return list(zip(sources, numbers)), [name.split(" - ")[0][:6] for name in names]
+
+
+# Function: Build one random request
+def make_request(cards, names, rng):
+    kind = rng.choices(["card", "search", "batch"], weights=[80, 15, 5])[0]
+    if kind == "card":
+        set_name, number = rng.choice(cards)
+        return kind, "GET", "/card?" + urlencode({"set": set_name, "number": number}), None
+    if kind == "search":
+        return kind, "GET", "/search?" + urlencode({"name": rng.choice(names)}), None
+    body = json.dumps([{"set": s, "number": n} for s, n in rng.sample(cards, min(20, len(cards)))])
+    return kind, "POST", "/batch", body
+
+
+# Function: One client thread
+def worker(host, port, deadline, cards, names, seed, latencies, errors):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(host, port)
+    while time.perf_counter() < deadline:
+        kind, method, path, body = make_request(cards, names, rng)
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+            connection = http.client.HTTPConnection(host, port)
+            continue
+        latencies.setdefault(kind, []).append(time.perf_counter() - started)
+    connection.close()
+
+
+# Function: Percentile of a sorted list
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the price lookup service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--snapshot", default="data/price_snapshot.arrow", help="Snapshot to sample queries from.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cards, names = sample_targets(args.snapshot, 2000, rng)
+    deadline = time.perf_counter() + args.seconds
+    results = [({}, []) for _ in range(args.threads)]
+    threads = [threading.Thread(target=worker, args=(args.host, args.port, deadline, cards, names, i) + results[i])
+               for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = {}
+    for thread_latencies, _ in results:
+        for kind, values in thread_latencies.items():
+            latencies.setdefault(kind, []).extend(values)
+    errors = [error for _, thread_errors in results for error in thread_errors]
+    total = sum(len(values) for values in latencies.values())
+
+    print(f"{total} requests in {args.seconds:.0f}s ({total / args.seconds:.0f} req/s), {len(errors)} errors")
+    for kind, values in sorted(latencies.items()) + [("all", sorted(v for vs in latencies.values() for v in vs))]:
+        values = sorted(values)
+        print(f"{kind:<7} n={len(values):>7}  p50={percentile(values, 0.50) * 1000:7.2f}ms  "
+              f"p95={percentile(values, 0.95) * 1000:7.2f}ms  p99={percentile(values, 0.99) * 1000:7.2f}ms  "
+              f"max={values[-1] * 1000:7.2f}ms")
@@ -0,0 +1,82 @@
+"""
+Tests for the byte counting in browser_session.py, with stand-ins for Playwright's page and
+request objects.
+"""
+
+# Modules
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+from playwright.async_api import Error
+
+from browser_session import BrowserSession
+
+
+class FakeRequest:
+    def __init__(self, body, headers, delay=0.01, fail=False):
+        self.body, self.headers, self.delay, self.fail = body, headers, delay, fail
+
+    async def sizes(self):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise Error("Target page, context or browser has been closed")
+        return {"responseBodySize": self.body, "responseHeadersSize": self.headers}
+
+
+class FakePage:
+    def __init__(self):
+        self.handlers = {}
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def finish(self, request):
+        self.handlers["requestfinished"](request)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    async def new_page(self):
+        return FakePage()
+
+
+def open_session():
+    session = BrowserSession(playwright=None)
+    session._browser = FakeBrowser()
+    return session
+
+
+def test_close_waits_for_sizes_still_in_flight():
+    async def scenario():
+        session = open_session()
+        page = await session.new_page()
+        page.finish(FakeRequest(1000, 200))
+        page.finish(FakeRequest(500, 100, delay=0.05))
+        # Closing straight away used to drop both sizes
+        await page.close()
+        return session, page
+
+    session, page = asyncio.run(scenario())
+    assert page.closed
+    assert session.page_bytes == [1800]
+    assert session.unsized_requests == 0
+
+
+def test_failed_size_lookups_are_counted():
+    async def scenario():
+        session = open_session()
+        first, second = await session.new_page(), await session.new_page()
+        first.finish(FakeRequest(1000, 200))
+        second.finish(FakeRequest(1000, 200, fail=True))
+        await first.close()
+        await second.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.page_bytes == [1200, 0]
+    assert session.unsized_requests == 1
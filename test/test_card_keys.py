@@ -0,0 +1,122 @@
+"""
+Tests for card_keys.py and merge_shards.publish_day's card_key handling.
+"""
+
+# Modules
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import merge_shards
+from card_keys import card_key, add_card_keys, normalize_name, update_card_dimension, assign_card_keys
+
+
+class FakeClient:
+    """
+    Records queries and loads; `rows` is what every SELECT returns.
+    """
+
+    def __init__(self, rows=None, schema=("source", "Number", "Printing", "Product Name", "scrape_date")):
+        self.rows = rows if rows is not None else pa.table({})
+        self.schema = [type("Field", (), {"name": name}) for name in schema]
+        self.queries, self.loads, self.deleted = [], {}, []
+
+    def query(self, sql):
+        self.queries.append(" ".join(sql.split()))
+        return self
+
+    def result(self):
+        return self
+
+    def to_arrow(self):
+        return self.rows
+
+    def get_table(self, table_id):
+        return self
+
+    def load_table_from_file(self, buffer, table_id, job_config):
+        self.loads[table_id] = (pq.read_table(buffer), job_config)
+        return self
+
+    def delete_table(self, table_id, not_found_ok=False):
+        self.deleted.append(table_id)
+
+
+def test_normalize_name_folds_accents_case_and_punctuation():
+    assert normalize_name("Flabébé - 083/182") == "flabebe 083 182"
+    assert normalize_name(None) == ""
+
+
+def test_card_key_is_a_stable_signed_int64():
+    key = card_key("base-set", "4/102", "Holofoil", "Charizard - 4/102")
+    assert key == card_key(" base-set ", "4/102", "holofoil", "CHARIZARD — 4/102")
+    assert -2 ** 63 <= key < 2 ** 63
+    assert key != card_key("base-set", "4/102", "Unlimited", "Charizard - 4/102")
+    assert card_key("base-set", None, None, "Booster Pack") == card_key("base-set", "", "", "booster pack")
+
+
+def test_add_card_keys_ignores_condition_and_replaces_an_existing_column():
+    table = pa.table({
+        "source": ["base-set"] * 3, "Number": ["4/102", "4/102", "2/102"], "Printing": ["Holofoil"] * 3,
+        "Product Name": ["Charizard", "Charizard", "Blastoise"], "Condition": ["Near Mint", "Damaged", "Near Mint"],
+    })
+    keyed = add_card_keys(add_card_keys(table))
+    keys = keyed.column("card_key").to_pylist()
+    assert keyed.column_names.count("card_key") == 1 and keyed.schema.field("card_key").type == pa.int64()
+    assert keys[0] == keys[1] == card_key("base-set", "4/102", "Holofoil", "Charizard") != keys[2]
+
+
+def test_add_card_keys_treats_missing_identity_columns_as_empty():
+    keyed = add_card_keys(pa.table({"source": ["base-set"], "Product Name": ["Booster Pack"]}))
+    assert keyed.column("card_key").to_pylist() == [card_key("base-set", None, None, "Booster Pack")]
+
+
+def test_update_card_dimension_stages_one_datetime_row_per_key():
+    day = datetime(2025, 3, 1)
+    table = add_card_keys(pa.table({
+        "source": ["base-set"] * 3, "Number": ["4/102", "4/102", "2/102"], "Printing": ["Holofoil"] * 3,
+        "Product Name": ["Charizard", "Charizard", "Blastoise"], "Rarity": ["Rare Holo"] * 3,
+        "scrape_date": pa.array([day] * 3, pa.timestamp("us")),
+    }))
+    client = FakeClient()
+    update_card_dimension(table, "pokemon_prices", client)
+
+    (staging_id, (staged, job_config)), = client.loads.items()
+    assert staged.num_rows == 2 and staging_id in client.deleted
+    assert {field.name: field.field_type for field in job_config.schema}["first_seen"] == "DATETIME"
+    merge = client.queries[-1]
+    assert "first_seen DATETIME, last_seen DATETIME" in merge
+    assert "CAST(first_seen AS DATETIME) AS first_seen" in merge and "TIMESTAMP" not in merge
+
+
+def test_assign_card_keys_adds_the_column_and_keys_rows_without_one():
+    missing = pa.table({"source": ["base-set"], "Number": ["4/102"], "Printing": ["Holofoil"],
+                        "Product Name": ["Charizard"]})
+    client = FakeClient(missing)
+    assert assign_card_keys("pokemon_images", client) == 1
+    assert client.queries[0].startswith("ALTER TABLE") and "ADD COLUMN IF NOT EXISTS card_key INT64" in client.queries[0]
+    assert client.queries[-1].startswith("UPDATE") and "t.card_key IS NULL" in client.queries[-1]
+    (mapping, _), = client.loads.values()
+    assert mapping.column("card_key").to_pylist() == [card_key("base-set", "4/102", "Holofoil", "Charizard")]
+
+    keyed = FakeClient(missing.slice(0, 0))
+    assert assign_card_keys("pokemon_images", keyed) == 0
+    assert len(keyed.queries) == 2 and not keyed.loads
+
+
+@pytest.mark.parametrize("keyed", [True, False])
+def test_publish_day_adds_card_key_before_the_transaction(monkeypatch, keyed):
+    client = FakeClient()
+    monkeypatch.setattr(merge_shards, "get_bigquery_client", lambda: client)
+    table = pa.table({"source": ["base-set"], "scrape_date": pa.array([datetime(2025, 3, 1)], pa.timestamp("us"))})
+    if keyed:
+        table = add_card_keys(table)
+    merge_shards.publish_day(table, "project.pokemon_data.pokemon_prices", "2025-03-01")
+
+    publish = client.queries[-1]
+    alter = "ALTER TABLE `project.pokemon_data.pokemon_prices` ADD COLUMN IF NOT EXISTS card_key INT64;"
+    assert (alter in publish) == keyed
+    if keyed:
+        assert publish.index(alter) < publish.index("BEGIN TRANSACTION")
@@ -0,0 +1,51 @@
+"""
+Tests for cli.py's argument parsing and the scrapers' import-time cost.
+"""
+
+# Modules
+import os
+import sys
+import subprocess
+
+import pytest
+
+from cli import parse_args
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("argv", [
+    ["--dry-run", "cards", "--num-shards", "4"],
+    ["cards", "--dry-run", "--num-shards", "4"],
+    ["cards", "--num-shards", "4", "--dry-run"],
+])
+def test_dry_run_is_accepted_before_or_after_the_command(argv):
+    command, check_only, script_args = parse_args(argv)
+    assert command.name == "cards" and check_only
+    assert script_args == ["--num-shards", "4"]
+
+
+def test_script_options_pass_through():
+    command, check_only, script_args = parse_args(["cards", "--help"])
+    assert command.name == "cards" and not check_only
+    assert script_args == ["--help"]
+
+
+@pytest.mark.parametrize("module", ["tcg_card_scraping", "tcg_card_image_scraping", "tcg_pack_scraping",
+                                    "tcg_card_image_upload", "best_value_set", "pipeline"])
+def test_importing_a_script_loads_no_heavy_libraries(module):
+    # A fresh interpreter, since this one has already imported pandas and pyarrow for other tests
+    check = (
+        "import sys; sys.path[:0] = ['code', 'code/scraping', 'code/analytics', 'code/serving']\n"
+        f"import {module}\n"
+        "print(sorted(name for name in ('pandas', 'pyarrow', 'numpy') if name in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True,
+                            check=True, cwd=REPO)
+    assert result.stdout.strip() == "[]"
+
+
+def test_best_value_set_offers_the_screener_statistics():
+    import best_value_set
+    import set_screener
+    assert best_value_set.STATS == set_screener.STATS
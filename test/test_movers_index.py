@@ -0,0 +1,104 @@
+"""
+Tests for movers_index.MoversIndex.
+"""
+
+# Modules
+import math
+from datetime import date, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from movers_index import MoversIndex, parse_price
+
+HEADERS = ["Product Name", "Printing", "Condition", "Rarity", "Number", "Market Price"]
+DAY = date(2025, 3, 1)
+
+
+def card(name, number, price, rarity="Rare"):
+    return [name, "Holofoil", "Near Mint", rarity, number, price]
+
+
+def two_day_index():
+    index = MoversIndex(top_n=5)
+    index.update("base-set", HEADERS, [
+        card("Charizard", "4", "$100.00"),
+        card("Blastoise", "2", "$50.00"),
+        card("Venusaur", "15", "$40.00"),
+        card("Pikachu", "58", "$5.00", rarity="Common"),
+    ], DAY - timedelta(days=1))
+    index.update("base-set", HEADERS, [
+        card("Charizard", "4", "$130.00"),
+        card("Blastoise", "2", "$35.00"),
+        card("Venusaur", "15", "$40.00"),
+        card("Pikachu", "58", "-", rarity="Common"),
+    ], DAY)
+    return index
+
+
+def names(movers):
+    return [mover["Product Name"] for mover in movers]
+
+
+def test_parse_price():
+    assert parse_price("$1,234.56") == 1234.56
+    assert math.isnan(parse_price("-"))
+
+
+def test_gainers_and_losers_only_hold_moves_in_their_direction():
+    index = two_day_index()
+    index.refresh()
+    assert names(index.top_movers(1, source="base-set")) == ["Charizard"]
+    assert names(index.top_movers(1, source="base-set", losers=True)) == ["Blastoise"]
+    assert index.top_movers(1, source="base-set")[0]["change"] == pytest.approx(30.0)
+    assert index.top_movers(1, rarity="Common") == []
+
+
+def test_windows_without_history_are_empty():
+    index = two_day_index()
+    index.refresh()
+    assert index.top_movers(7) == []
+    with pytest.raises(ValueError):
+        index.top_movers(2)
+
+
+def test_repeated_keys_keep_the_first_row(capsys):
+    index = MoversIndex()
+    index.update("base-set", HEADERS, [card("Energy", "", "$1.00"), card("Trainer", "", "$9.00")], DAY)
+    assert len(index) == 1
+    assert index.prices[0, DAY.toordinal() % index.history_days] == 1.0
+    assert "skipped 1 rows" in capsys.readouterr().out
+
+
+def test_save_and_load_keep_boards_and_view_the_mapped_prices(tmp_path):
+    path = str(tmp_path / "movers.arrow")
+    index = two_day_index()
+    index.save(path)
+
+    loaded = MoversIndex.load(path)
+    assert len(loaded) == 4 and loaded.latest_day == DAY
+    assert not loaded.prices.flags.writeable and not loaded.prices.flags.owndata
+    for losers in (False, True):
+        assert loaded.top_movers(1, losers=losers) == index.top_movers(1, losers=losers)
+    np.testing.assert_array_equal(loaded.prices, index.prices[:len(index)])
+
+    # Updating a loaded index copies it out of the mapping first
+    loaded.update("base-set", HEADERS, [card("Charizard", "4", "$90.00")], DAY + timedelta(days=1))
+    loaded.refresh()
+    assert names(loaded.top_movers(1, losers=True)) == ["Charizard"]
+    assert len(loaded) == 4
+
+
+def test_update_table_matches_per_set_updates():
+    index = two_day_index()
+    index.refresh()
+    rows = []
+    for day, prices in ((DAY - timedelta(days=1), ["$100.00", "$50.00"]), (DAY, ["$130.00", "$35.00"])):
+        for (name, number), price in zip([("Charizard", "4"), ("Blastoise", "2")], prices):
+            rows.append({"source": "base-set", "Number": number, "Printing": "Holofoil", "Condition": "Near Mint",
+                         "Product Name": name, "Rarity": "Rare", "Market Price": price, "scrape_date": day})
+    from_table = MoversIndex(top_n=5)
+    from_table.update_table(pa.Table.from_pylist(rows))
+    assert from_table.top_movers(1) == index.top_movers(1)
+    assert from_table.top_movers(1, losers=True) == index.top_movers(1, losers=True)
@@ -0,0 +1,72 @@
+"""
+Tests for name_index.py.
+"""
+
+# Modules
+import numpy as np
+
+from name_index import NameIndex, normalize, trigrams, title
+
+CARDS = [
+    ("base-set", "4/102", "Charizard - 4/102"),
+    ("base-set", "2/102", "Blastoise - 2/102"),
+    ("base-set", "14/102", "Raichu - 14/102"),
+    ("jungle", "14/64", "Raichu - 14/64"),
+    ("fossil", "14/62", "Raichu - 14/62"),
+    ("evolving-skies", "24/203", "Raichu V - 024/203"),
+    ("surging-sparks", "239/191", "Raichu ex - 239/191"),
+    ("darkness-ablaze", "20/189", "Charizard VMAX - 020/189"),
+]
+
+
+def build(cards=CARDS):
+    index = NameIndex()
+    index.update(*zip(*cards))
+    return index
+
+
+def found(results):
+    return [result["Product Name"] for result in results]
+
+
+def test_normalize_trigrams_and_title():
+    assert normalize("Charizard - 4/102") == "charizard 4 102"
+    assert trigrams("ex") == {"  e", " ex", "ex "}
+    assert title("charizard 4 102", "4/102") == "charizard"
+    assert title("raichu v 024 203", "024/203") == "raichu v"
+    assert title("professor s research", None) == "professor s research"
+
+
+def test_search_tolerates_typos_and_filters_by_set():
+    index = build()
+    assert found(index.search("charzard", 1)) == ["Charizard - 4/102"]
+    assert found(index.search("raichu", 10, source="jungle")) == ["Raichu - 14/64"]
+    assert index.search("raichu", source="unknown-set") == []
+    assert index.search("zzzz") == []
+
+
+def test_prefix_lists_each_title_before_reprints():
+    results = found(build().search("raic", 3))
+    assert sorted(name.split(" - ")[0] for name in results) == ["Raichu", "Raichu V", "Raichu ex"]
+
+
+def test_update_only_adds_new_keys_and_keeps_names_sorted():
+    index = build(CARDS[:4])
+    assert index.update(*zip(*CARDS)) == len(CARDS) - 4
+    assert index.update(*zip(*CARDS)) == 0
+    full = build()
+    assert index.sorted_names == sorted(index.normalized) == full.sorted_names
+    assert [index.normalized[entry] for entry in index.sorted_entries] == index.sorted_names
+
+
+def test_copy_leaves_the_original_unchanged():
+    original = build(CARDS[:4])
+    postings = {gram: entries.copy() for gram, entries in original.posting_arrays.items()}
+    copy = original.copy()
+    copy.update(*zip(*CARDS))
+
+    assert len(original) == 4 and len(copy) == len(CARDS)
+    assert original.posting_arrays.keys() == postings.keys()
+    assert all(np.array_equal(original.posting_arrays[gram], entries) for gram, entries in postings.items())
+    assert found(original.search("charizard vmax", 1)) == ["Charizard - 4/102"]
+    assert found(copy.search("charizard vmax", 1)) == ["Charizard VMAX - 020/189"]
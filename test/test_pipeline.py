@@ -0,0 +1,83 @@
+"""
+Tests for pipeline.py's step ordering and run bookkeeping.
+"""
+
+# Modules
+import json
+import asyncio
+from datetime import date
+
+import pytest
+
+from pipeline import Step, STEPS, topological_order, run_pipeline
+
+
+def noop(ctx):
+    return None
+
+
+def test_topological_order_puts_dependencies_first():
+    steps = [Step("c", noop, deps=("b",)), Step("b", noop, deps=("a",)), Step("a", noop)]
+    assert [step.name for step in topological_order(steps)] == ["a", "b", "c"]
+
+
+def test_topological_order_of_the_daily_graph():
+    position = {step.name: i for i, step in enumerate(topological_order(STEPS))}
+    for step in STEPS:
+        assert all(position[dep] < position[step.name] for dep in step.deps)
+
+
+def test_set_values_does_not_wait_for_todays_scrape():
+    set_values = next(step for step in STEPS if step.name == "set_values")
+    assert set_values.deps == ()
+
+
+def test_topological_order_rejects_a_cycle():
+    steps = [Step("a", noop, deps=("b",)), Step("b", noop, deps=("a",))]
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order(steps)
+
+
+def test_topological_order_rejects_an_unknown_dependency():
+    with pytest.raises(ValueError, match="unknown step 'missing'"):
+        topological_order([Step("a", noop, deps=("missing",))])
+
+
+def run(steps, state_path, context=None, **kwargs):
+    return asyncio.run(run_pipeline(steps, context or {}, state_path=str(state_path), **kwargs))
+
+
+def test_a_step_with_no_rows_runs_again(tmp_path):
+    state_path = tmp_path / "state.json"
+    calls = []
+
+    async def scrape(ctx):
+        calls.append("scrape")
+        return 0
+
+    steps = [Step("cards", scrape), Step("packs", lambda ctx: 12, blocking=True)]
+    assert run(steps, state_path) == {"cards": "done", "packs": "done"}
+    assert set(json.loads(state_path.read_text())) == {"packs"}
+
+    assert run(steps, state_path) == {"cards": "done", "packs": "unchanged"}
+    assert calls == ["scrape", "scrape"]
+
+
+def test_failed_steps_block_their_dependents(tmp_path):
+    def fail(ctx):
+        raise RuntimeError("boom")
+
+    steps = [Step("a", fail), Step("b", noop, deps=("a",)), Step("c", noop)]
+    outcomes = run(steps, tmp_path / "state.json")
+    assert outcomes == {"a": "failed", "b": "blocked", "c": "done"}
+
+
+def test_daily_steps_are_fingerprinted_with_the_scrape_date(tmp_path):
+    state_path = tmp_path / "state.json"
+    steps = [Step("cards", lambda ctx: 12)]
+    first_day, next_day = {"scrape_date": date(2025, 3, 1)}, {"scrape_date": date(2025, 3, 2)}
+
+    assert run(steps, state_path, first_day) == {"cards": "done"}
+    assert run(steps, state_path, first_day) == {"cards": "unchanged"}
+    assert run(steps, state_path, next_day) == {"cards": "done"}
+    assert steps[0].fingerprint(date(2025, 3, 2)) != steps[0].fingerprint(date(2025, 3, 1))
@@ -0,0 +1,87 @@
+"""
+Tests for price_service.py's /batch validation and snapshot reloading.
+"""
+
+# Modules
+import os
+import json
+import threading
+import http.client
+from datetime import datetime
+from http.server import ThreadingHTTPServer
+
+import pyarrow as pa
+import pytest
+
+from price_service import PriceService, PriceRequestHandler, is_valid_query
+
+
+def write_snapshot(path, day, cards):
+    table = pa.Table.from_pylist([
+        {"card_key": i, "source": "base-set", "Number": number, "Product Name": name, "Printing": "Holofoil",
+         "Condition": "Near Mint", "Rarity": "Rare", "Market Price": price, "Image": None, "gcs_uri": None,
+         "scrape_date": day}
+        for i, (number, name, price) in enumerate(cards)
+    ])
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "snapshot.arrow")
+    write_snapshot(path, datetime(2025, 3, 1), [("4", "Charizard", "$100.00"), ("2", "Blastoise", "$50.00")])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PriceRequestHandler)
+    server.service = PriceService(path, reload_interval=3600)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.service.close()
+
+
+def post(server, body):
+    connection = http.client.HTTPConnection(*server.server_address)
+    connection.request("POST", "/batch", body=body, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    payload = response.read()
+    connection.close()
+    return response.status, payload
+
+
+def test_is_valid_query():
+    assert is_valid_query({"set": "base-set", "number": "4"})
+    assert is_valid_query({"name": "charzard"})
+    assert not is_valid_query({"set": ["base-set"]})
+    assert not is_valid_query("base-set")
+
+
+@pytest.mark.parametrize("body", [b"not json", b'{"set": "base-set"}', b'["base-set"]', b'[{"name": 4}]'])
+def test_batch_rejects_bodies_that_are_not_lists_of_queries(server, body):
+    status, _ = post(server, body)
+    assert status == 400
+
+
+def test_batch_answers_each_query(server):
+    status, payload = post(server, json.dumps([{"set": "base-set", "number": "4"}, {"name": "blastoise"}]))
+    results = json.loads(payload)["results"]
+    assert status == 200
+    assert [rows[0]["Product Name"] for rows in results] == ["Charizard", "Blastoise"]
+
+
+def test_reload_swaps_in_a_new_snapshot(server, tmp_path):
+    service = server.service
+    old = service.current()
+    assert not service.reload()
+
+    path = str(tmp_path / "snapshot.arrow")
+    write_snapshot(path, datetime(2025, 3, 2), [("4", "Charizard", "$130.00")])
+    os.utime(path, (old.mtime + 10, old.mtime + 10))
+    assert service.reload()
+    assert service.current() is not old
+    assert service.current().scrape_date.startswith("2025-03-02")
+    assert service.current().query("card", "base-set", "4")[0]["Market Price"] == "$130.00"
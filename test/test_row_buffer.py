@@ -0,0 +1,105 @@
+"""
+Tests for row_buffer.py.
+"""
+
+# Modules
+from datetime import date, datetime
+
+import pyarrow as pa
+
+from row_buffer import RowBuffer, WRITE_APPEND, bigquery_schema, scrape_timestamp, upload_arrow_table
+
+LABEL = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema([
+    ("Product Name", pa.string()),
+    ("Rarity", LABEL),
+    ("Market Price", pa.string()),
+    ("source", LABEL),
+    ("scrape_date", pa.timestamp("us")),
+])
+HEADERS = ["Product Name", "Rarity", "Market Price"]
+DAY = datetime(2024, 3, 1)
+
+
+def test_extend_and_to_arrow_round_trip():
+    buffer = RowBuffer(SCHEMA)
+    buffer.extend(HEADERS, [["Pikachu", "Common", "$0.25"], ["Charizard", "Rare", "$300.00"]],
+                  source="base-set", scrape_date=DAY)
+    buffer.extend(HEADERS, [["Eevee", "Common", "$0.10"]], source="jungle", scrape_date=DAY)
+
+    table = buffer.to_arrow()
+    assert len(buffer) == table.num_rows == 3
+    assert table.schema == SCHEMA
+    assert table.to_pydict() == {
+        "Product Name": ["Pikachu", "Charizard", "Eevee"],
+        "Rarity": ["Common", "Rare", "Common"],
+        "Market Price": ["$0.25", "$300.00", "$0.10"],
+        "source": ["base-set", "base-set", "jungle"],
+        "scrape_date": [DAY] * 3,
+    }
+
+
+def test_dictionary_columns_keep_one_copy_of_each_value():
+    buffer = RowBuffer(SCHEMA)
+    rows = [["Card", "Common" if i % 3 else "Rare", "$1.00"] for i in range(30)]
+    buffer.extend(HEADERS, rows, source="base-set", scrape_date=DAY)
+
+    rarity = buffer.to_arrow().column("Rarity").combine_chunks()
+    assert sorted(rarity.dictionary.to_pylist()) == ["Common", "Rare"]
+    assert rarity.to_pylist() == [row[1] for row in rows]
+
+
+def test_short_rows_become_nulls():
+    buffer = RowBuffer(SCHEMA)
+    buffer.extend(HEADERS, [["Pikachu"], ["Eevee", "Common"], ["Mew", "Rare", "$5.00"]],
+                  source="base-set", scrape_date=DAY)
+
+    table = buffer.to_arrow()
+    assert table.column("Rarity").to_pylist() == [None, "Common", "Rare"]
+    assert table.column("Market Price").to_pylist() == [None, None, "$5.00"]
+    assert table.column("Rarity").null_count == 1
+
+
+def test_a_missing_header_becomes_nulls_for_that_set_only():
+    buffer = RowBuffer(SCHEMA)
+    buffer.extend(HEADERS, [["Pikachu", "Common", "$0.25"]], source="base-set", scrape_date=DAY)
+    buffer.extend(["Product Name", "Market Price"], [["Booster Pack", "$4.00"], ["Tin", "$20.00"]],
+                  source="jungle", scrape_date=DAY)
+
+    table = buffer.to_arrow()
+    assert table.num_rows == len(buffer) == 3
+    assert table.column("Rarity").to_pylist() == ["Common", None, None]
+    assert table.column("Market Price").to_pylist() == ["$0.25", "$4.00", "$20.00"]
+
+
+def test_empty_buffer_gives_an_empty_typed_table():
+    table = RowBuffer(SCHEMA).to_arrow()
+    assert table.num_rows == 0
+    assert table.schema == SCHEMA
+
+
+def test_scrape_timestamp_is_midnight_of_the_day():
+    assert scrape_timestamp(date(2024, 3, 1)) == DAY
+    assert scrape_timestamp().time() == datetime.min.time()
+
+
+def test_bigquery_schema_keeps_scrape_date_a_datetime():
+    schema = SCHEMA.append(pa.field("card_key", pa.int64()))
+    fields = {field.name: field.field_type for field in bigquery_schema(schema)}
+    assert fields == {"Product Name": "STRING", "Rarity": "STRING", "Market Price": "STRING",
+                      "source": "STRING", "scrape_date": "DATETIME", "card_key": "INT64"}
+
+
+def test_upload_passes_the_destination_schema():
+    class Client:
+        def load_table_from_file(self, buffer, table_id, job_config):
+            self.table_id, self.job_config = table_id, job_config
+            return self
+
+        def result(self):
+            return None
+
+    client = Client()
+    upload_arrow_table(RowBuffer(SCHEMA).to_arrow(), "project.dataset.table", WRITE_APPEND, client=client)
+    assert [field.name for field in client.job_config.schema] == SCHEMA.names
+    assert client.job_config.write_disposition == WRITE_APPEND
@@ -0,0 +1,186 @@
+"""
+Tests for set_screener.py's vectorized screen and its per-day cache.
+"""
+
+# Modules
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from set_screener import sort_groups, group_statistic, screen, screen_sets, parse_prices
+
+DAY = date(2025, 3, 1)
+NEXT_DAY = date(2025, 3, 2)
+PULL_RATES = pd.DataFrame({
+    "set": ["base-set", "base-set", "jungle"],
+    "Rarity": ["Rare", "Holo Rare", "Rare"],
+    "Probability": [0.5, 0.1, 1.0],
+})
+# (day, set, rarity, card_key, price)
+CARDS = [
+    (DAY, "base-set", "Rare", 1, 10.0),
+    (DAY, "base-set", "Rare", 1, 6.0),  # the same card in a second condition
+    (DAY, "base-set", "Rare", 2, 4.0),
+    (DAY, "base-set", "Holo Rare", 3, 100.0),
+    (DAY, "base-set", "Rare", None, 1000.0),  # no key
+    (DAY, "base-set", "Rare", 5, np.nan),  # no price
+    (DAY, "base-set", "Secret Rare", 6, 500.0),  # no pull rate
+    (DAY, "jungle", "Rare", 4, 2.0),
+    (NEXT_DAY, "base-set", "Rare", 1, 12.0),
+]
+# (day, set, product name, price)
+PACKS = [
+    (DAY, "base-set", "Base Set Booster Pack", 5.0),
+    (DAY, "base-set", "Base Set Booster Pack [1st Edition]", 4.0),
+    (DAY, "base-set", "Base Set Booster Pack Code Card", 0.5),
+]
+
+
+def frames():
+    cards = pd.DataFrame(CARDS, columns=["scrape_date", "source", "Rarity", "card_key", "price"])
+    packs = pd.DataFrame(PACKS, columns=["scrape_date", "source", "Product Name", "price"])
+    return cards, packs
+
+
+def test_sort_groups_orders_by_group_then_value():
+    codes = np.array([2, 0, 1, 0, 2, 1])
+    values = np.array([5.0, -3.0, 7.5, 1.0, 0.25, 7.5])
+    order = sort_groups(codes, values)
+    assert list(zip(codes[order], values[order])) == sorted(zip(codes, values))
+
+
+@pytest.mark.parametrize("stat", ["median", "trimmed", "mean"])
+def test_group_statistic_matches_a_per_group_loop(stat):
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 40, 2000)
+    values = rng.lognormal(size=2000)
+    order = sort_groups(codes, values)
+    result = group_statistic(values[order], np.bincount(codes), stat, trim=0.1)
+
+    for group in range(40):
+        group_values = np.sort(values[codes == group])
+        if stat == "median":
+            expected = np.median(group_values)
+        elif stat == "trimmed":
+            cut = int(len(group_values) * 0.1)
+            expected = group_values[cut:len(group_values) - cut].mean()
+        else:
+            expected = group_values.mean()
+        assert result[group] == pytest.approx(expected)
+
+
+def test_group_statistic_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        group_statistic(np.array([1.0]), np.array([1]), "max")
+    with pytest.raises(ValueError):
+        group_statistic(np.array([1.0]), np.array([1]), "trimmed", trim=0.5)
+
+
+def test_screen_counts_each_card_once_and_skips_unusable_rows():
+    results = screen(*frames(), PULL_RATES, stat="mean", top_n=1)
+    assert list(zip(results["scrape_date"], results["set"])) == [
+        (DAY, "base-set"), (DAY, "jungle"), (NEXT_DAY, "base-set")]
+    base, jungle, next_day = (row for _, row in results.iterrows())
+
+    # Rare is the mean of card 1 (mean of 10 and 6) and card 2, not of the three rows
+    assert base["ev"] == pytest.approx(0.5 * (8 + 4) / 2 + 0.1 * 100)
+    assert (base["cards"], base["rarities"]) == (3, 2)
+    # The Holo Rare is worth 0.1 x 100 of the pack's 13
+    assert base["chase_share"] == pytest.approx(10 / 13)
+    # The code card is not a pack
+    assert base["pack_price"] == 4.0 and base["ev_ratio"] == pytest.approx(13 / 4)
+
+    assert jungle["ev"] == pytest.approx(2.0) and np.isnan(jungle["pack_price"])
+    assert next_day["ev"] == pytest.approx(6.0) and next_day["rarities"] == 1
+
+
+def test_screen_without_usable_rows_is_empty():
+    cards, packs = frames()
+    assert screen(cards[cards["Rarity"] == "Secret Rare"], packs, PULL_RATES).empty
+
+
+class FakeClient:
+    """
+    Answers query_fingerprints' and query_history's queries with Arrow tables and records them.
+    `packs` can be changed between runs, as a republished day would change it.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.packs = list(PACKS)
+
+    def query(self, sql):
+        self.queries.append(sql)
+        return self
+
+    def result(self):
+        return self
+
+    def to_arrow(self):
+        as_price = lambda price: None if np.isnan(price) else f"${price:,.2f}"
+        # Only DAY is ever queried below
+        cards = [row for row in CARDS if row[0] == DAY]
+        if "row_count" in self.queries[-1]:
+            return pa.table({
+                "source_table": ["prices", "packs"], "scrape_date": [DAY, DAY],
+                "row_count": [len(cards), len(self.packs)],
+                "digest": [len(cards), hash(tuple(self.packs))],
+            })
+        if "Rarity" in self.queries[-1]:
+            return pa.table({
+                "scrape_date": [row[0] for row in cards], "source": [row[1] for row in cards],
+                "Rarity": [row[2] for row in cards], "Market Price": [as_price(row[4]) for row in cards],
+                "card_key": pa.array([row[3] for row in cards], pa.int64()),
+            })
+        return pa.table({
+            "scrape_date": [row[0] for row in self.packs], "source": [row[1] for row in self.packs],
+            "Product Name": [row[2] for row in self.packs],
+            "Market Price": [as_price(row[3]) for row in self.packs],
+        })
+
+
+def test_screen_sets_caches_days_until_their_rows_change(tmp_path):
+    pull_rates_path = str(tmp_path / "pull_rates.csv")
+    PULL_RATES.to_csv(pull_rates_path, index=False)
+    cache_dir = str(tmp_path / "set_screener")
+    client = FakeClient()
+
+    def run():
+        return screen_sets(days=1, end=DAY, stat="mean", top_n=1, client=client,
+                           pull_rates_path=pull_rates_path, cache_dir=cache_dir)
+
+    first = run()
+    assert len(client.queries) == 3
+    assert "row_count" in client.queries[0]
+    assert "IFNULL(`Product Name`, '')" in client.queries[1]
+    assert first["ev"].tolist() == pytest.approx([13.0, 2.0])
+
+    # Unchanged rows only cost the fingerprint query
+    pd.testing.assert_frame_equal(run(), first)
+    assert len(client.queries) == 4
+
+    # A pack price that lands later changes the fingerprint, so the day is screened again
+    client.packs.append((DAY, "jungle", "Jungle Booster Pack", 1.0))
+    second = run()
+    assert len(client.queries) == 7
+    assert second["ev_ratio"].tolist() == pytest.approx([13 / 4, 2.0])
+    pd.testing.assert_frame_equal(run(), second)
+    assert len(client.queries) == 8
+
+
+def test_screen_sets_skips_days_without_rows(tmp_path):
+    pull_rates_path = str(tmp_path / "pull_rates.csv")
+    PULL_RATES.to_csv(pull_rates_path, index=False)
+    client = FakeClient()
+    results = screen_sets(days=1, end=NEXT_DAY + timedelta(days=30), client=client,
+                          pull_rates_path=pull_rates_path, cache_dir=str(tmp_path / "set_screener"))
+    assert results.empty
+    assert len(client.queries) == 1
+
+
+def test_parse_prices():
+    prices = parse_prices(pd.Series(["$1,234.56", "-", None]))
+    assert prices[0] == 1234.56 and prices[1:].isna().all()
@@ -0,0 +1,72 @@
+"""
+Tests for sharding.py and merge_shards.load_shards.
+"""
+
+# Modules
+import zlib
+import argparse
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from sharding import shard_for, select_shard, shard_path, write_shard, run_scrape_date, add_shard_arguments
+from merge_shards import load_shards
+
+SETS = pd.DataFrame({"set": [f"set-{i}" for i in range(50)], "cards": range(50)})
+
+
+def test_shard_for_is_a_stable_crc32():
+    assert shard_for("base-set", 4) == zlib.crc32(b"base-set") % 4
+    assert all(0 <= shard_for(s, 7) < 7 for s in SETS["set"])
+
+
+def test_select_shard_partitions_the_sets_in_order():
+    shards = [select_shard(SETS, i, 4) for i in range(4)]
+    combined = pd.concat(shards).sort_index()
+    assert combined["set"].tolist() == SETS["set"].tolist()
+    for shard in shards:
+        assert shard.index.is_monotonic_increasing
+    assert all(len(shard) for shard in shards)
+
+
+def test_select_shard_single_shard_keeps_everything():
+    assert select_shard(SETS, 0, 1) is SETS
+
+
+@pytest.mark.parametrize("shard_index, num_shards", [(4, 4), (-1, 4), (0, 0)])
+def test_select_shard_rejects_invalid_shards(shard_index, num_shards):
+    with pytest.raises(ValueError):
+        select_shard(SETS, shard_index, num_shards)
+
+
+def test_run_scrape_date_prefers_explicit_then_environment(monkeypatch):
+    monkeypatch.setenv("SCRAPE_DATE", "2024-03-01")
+    assert run_scrape_date() == date(2024, 3, 1)
+    assert run_scrape_date("2024-02-29") == date(2024, 2, 29)
+    monkeypatch.delenv("SCRAPE_DATE")
+    assert run_scrape_date() == date.today()
+
+
+def test_scrape_date_argument_defaults_to_environment(monkeypatch):
+    monkeypatch.setenv("SCRAPE_DATE", "2024-03-01")
+    args = add_shard_arguments(argparse.ArgumentParser()).parse_args([])
+    assert args.scrape_date == date(2024, 3, 1)
+
+
+def test_shards_round_trip_through_load_shards(tmp_path):
+    day = date(2024, 3, 1)
+    for i in range(3):
+        table = pa.table({"source": [f"set-{i}"] * (i + 1), "value": list(range(i + 1))})
+        path = write_shard(table, str(tmp_path), "pokemon_prices", day, i, 3)
+        assert path == shard_path(str(tmp_path), "pokemon_prices", day, i, 3)
+
+    combined = load_shards(str(tmp_path), "pokemon_prices", day, 3)
+    assert combined.num_rows == 6
+    assert sorted(set(combined.column("source").to_pylist())) == ["set-0", "set-1", "set-2"]
+
+
+def test_load_shards_waits_for_missing_shards(tmp_path):
+    write_shard(pa.table({"value": [1]}), str(tmp_path), "pokemon_prices", "2024-03-01", 0, 2)
+    assert load_shards(str(tmp_path), "pokemon_prices", "2024-03-01", 2) is None
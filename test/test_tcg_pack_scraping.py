@@ -0,0 +1,106 @@
+"""
+Tests for tcg_pack_scraping.py's sealed products fallback, with a stand-in for Playwright's page.
+"""
+
+# Modules
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import tcg_pack_scraping
+from row_buffer import RowBuffer
+
+PACKS = [["Base Set Booster Pack", "$400.00"]]
+
+
+class FakeTab:
+    def __init__(self, page, text):
+        self.page, self.text = page, text
+
+    async def inner_text(self):
+        return self.text
+
+    async def click(self):
+        # The sealed table renders some time after the click, as a client-side tab switch does
+        self.page.clicked = True
+
+
+class FakePage:
+    """
+    Shows booster packs only once the Sealed Products tab is clicked and, if `render_polls` is
+    set, only after that many polls of wait_for_function.
+    """
+
+    def __init__(self, render_polls=2, sealed_tab=True):
+        self.render_polls, self.sealed_tab = render_polls, sealed_tab
+        self.clicked, self.polls, self.waits = False, 0, []
+
+    def rendered(self):
+        return self.clicked and self.polls >= self.render_polls
+
+    async def goto(self, url, timeout=None):
+        self.url = url
+
+    async def wait_for_load_state(self, state):
+        pass
+
+    async def wait_for_function(self, expression, arg=None, timeout=None):
+        self.waits.append(timeout)
+        while not self.rendered():
+            if not self.clicked:
+                raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded.")
+            self.polls += 1
+
+    async def evaluate(self, expression, arg=None):
+        return PACKS if self.rendered() else []
+
+    async def query_selector_all(self, selector):
+        return [FakeTab(self, "Singles")] + ([FakeTab(self, "Sealed Products")] if self.sealed_tab else [])
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, **page_options):
+        self.page_options, self.pages = page_options, []
+
+    async def new_page(self):
+        self.pages.append(FakePage(**self.page_options))
+        return self.pages[-1]
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    async def sleep(seconds):
+        pass
+    monkeypatch.setattr(tcg_pack_scraping.asyncio, "sleep", sleep)
+
+
+def scrape(browser):
+    buffer = RowBuffer(tcg_pack_scraping.upload_schema())
+    url = "https://example.test/price-guides/base-set"
+    rows = asyncio.run(tcg_pack_scraping.scrape_sealed_products_table(url, browser, buffer))
+    return rows, buffer
+
+
+def test_tab_fallback_waits_for_the_sealed_table():
+    browser = FakeBrowser()
+    rows, buffer = scrape(browser)
+
+    assert rows == len(buffer) == 1
+    assert buffer.to_arrow().column("Product Name").to_pylist() == ["Base Set Booster Pack"]
+    page, = browser.pages
+    assert page.url.endswith(tcg_pack_scraping.SEALED_PRODUCTS_QUERY)
+    # The direct view timed out, then the wait after the click saw the table render
+    assert page.waits == [tcg_pack_scraping.SEALED_VIEW_TIMEOUT] * 2 and page.polls == 2
+
+
+def test_no_sealed_table_gives_up_after_the_retries():
+    browser = FakeBrowser(sealed_tab=False)
+    rows, buffer = scrape(browser)
+    assert rows == len(buffer) == 0
+    assert len(browser.pages) == 3
@@ -0,0 +1,100 @@
+"""
+Tests for tcg_set_scraping.py's set slugs and row count bookkeeping.
+"""
+
+# Modules
+import asyncio
+from contextlib import asynccontextmanager
+
+import pandas as pd
+import pytest
+
+import tcg_set_scraping
+from tcg_set_scraping import (slugify_set, trusted_count, row_count_complete, reconcile_count,
+                              read_set_file, write_set_file)
+
+TODAY = "2025-03-01"
+
+
+def test_slugify_set():
+    assert slugify_set("SV: Scarlet & Violet 151") == "sv-scarlet-and-violet-151"
+    assert slugify_set("Base Set 2") == "base-set-2"
+    assert slugify_set("  Pokémon GO - ") == "pokémon-go"
+
+
+def test_only_counted_sets_have_a_trusted_count():
+    assert trusted_count({"set": "base-set", "cards": "101", "counted": TODAY}) == 101
+    assert trusted_count({"set": "base-set", "cards": "101", "counted": ""}) is None
+    assert trusted_count({"set": "base-set", "cards": "101"}) is None
+
+    # pandas reads the dictionary with NaN for empty cells
+    df = pd.DataFrame({"set": ["a", "b"], "cards": [10, 20], "counted": [TODAY, None]})
+    assert [trusted_count(row) for _, row in df.iterrows()] == [10, None]
+
+
+def test_row_count_complete():
+    assert row_count_complete(90, 100)
+    assert not row_count_complete(89, 100)
+    assert row_count_complete(1, None)
+
+
+@pytest.mark.parametrize("observed, page_rows, expected", [
+    (110, None, 110),  # a scraped day may raise the count
+    (100, None, 100),  # or confirm it
+    (60, None, None),  # a short day alone never lowers it
+    (60, 100, 100),  # the page still shows every row, so the day was short
+    (60, 70, None),  # the page disagrees with the day
+    (60, 60, 60),  # the page agrees the set shrank
+])
+def test_reconcile_count_only_lowers_on_an_agreeing_page_count(observed, page_rows, expected):
+    row = {"set": "base-set", "cards": "100", "counted": ""}
+    assert reconcile_count(row, observed, page_rows, TODAY) == (expected is not None)
+    if expected is None:
+        assert row == {"set": "base-set", "cards": "100", "counted": ""}
+    else:
+        assert row == {"set": "base-set", "cards": expected, "counted": TODAY}
+
+
+def test_update_set_catalog_confirms_counts_without_ratcheting(monkeypatch, tmp_path):
+    sets_file, card_sets_file = str(tmp_path / "sets.csv"), str(tmp_path / "card_set_dictionary.csv")
+    write_set_file(card_sets_file, ["set", "cards"], [
+        {"set": "base-set", "cards": 101}, {"set": "jungle", "cards": 64}, {"set": "fossil", "cards": 62},
+    ])
+    page_counts = {"new-set": 150, "jungle": 64, "fossil": 40}
+    opened = []
+    browser_open = False
+
+    @asynccontextmanager
+    async def fake_session(*args, **kwargs):
+        nonlocal browser_open
+        browser_open = True
+        yield object()
+        browser_open = False
+
+    async def discover_sets(browser):
+        return ["base-set", "jungle", "fossil", "new-set"]
+
+    async def count_set_rows(browser, set_extension):
+        assert browser_open
+        opened.append(set_extension)
+        return page_counts[set_extension]
+
+    monkeypatch.setattr(tcg_set_scraping, "SETS_FILE", sets_file)
+    monkeypatch.setattr(tcg_set_scraping, "CARD_SETS_FILE", card_sets_file)
+    monkeypatch.setattr(tcg_set_scraping, "open_browser_session", fake_session)
+    monkeypatch.setattr(tcg_set_scraping, "discover_sets", discover_sets)
+    monkeypatch.setattr(tcg_set_scraping, "count_set_rows", count_set_rows)
+    # base-set grew, jungle's day was short, fossil's day was short and the page disagrees
+    monkeypatch.setattr(tcg_set_scraping, "latest_row_counts", lambda: {"base-set": 102, "jungle": 30, "fossil": 35})
+
+    result = asyncio.run(tcg_set_scraping.update_set_catalog())
+    assert result == {"added": ["new-set"], "removed": []}
+    assert opened == ["new-set", "jungle", "fossil"]
+
+    rows = {row["set"]: row for row in read_set_file(card_sets_file)}
+    assert (rows["base-set"]["cards"], bool(rows["base-set"]["counted"])) == ("102", True)
+    assert (rows["jungle"]["cards"], bool(rows["jungle"]["counted"])) == ("64", True)
+    assert (rows["fossil"]["cards"], rows["fossil"]["counted"]) == ("62", "")
+    assert (rows["new-set"]["cards"], bool(rows["new-set"]["counted"])) == ("150", True)
+    with open(card_sets_file, "rb") as f:
+        assert b"\r" not in f.read()